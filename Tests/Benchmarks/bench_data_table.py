@@ -0,0 +1,88 @@
+"""
+Benchmark: /api/data-table page latency against page depth.
+
+Fills a temporary database with synthetic CDRs, flags a share of them in
+FraudFinding, and walks the keyset-paginated table for every sort order,
+printing the time of the first page, a page deep in the table and the
+last page. With the (column, CDR_ID) indexes the numbers should be the
+same at any depth and grow very little with --rows.
+
+Run from the project root:
+    python -m Tests.Benchmarks.bench_data_table --rows 1000000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from backend.data.DbContext import DbContext
+from backend.data.data_table import DataTableFilters, SORT_COLUMNS, count_cache, fetch_page
+from backend.data.fraud_findings import create_fraud_finding_tables
+
+
+def fill(db: DbContext, rows: int, fraud_share: float, seed: int = 5):
+    rng = random.Random(seed)
+    conn = db.connection
+    create_fraud_finding_tables(conn.cursor())
+    base = 1_704_067_200
+    batch, cases = [], []
+    for i in range(rows):
+        epoch = base + rng.randint(0, 365 * 86400)
+        batch.append((f"CDR{i:09d}", time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(epoch)), epoch,
+                      round(rng.uniform(0, 60), 3), round(rng.uniform(1, 40), 2),
+                      f"AUTH{i % 20000}", f"CP{i % 5000}"))
+        if rng.random() < fraud_share:
+            cases.append((f"CDR{i:09d}", "flagged"))
+        if len(batch) == 50_000 or i == rows - 1:
+            conn.executemany(
+                "INSERT INTO CDR (CDR_ID, Start_datetime, Start_epoch, Volume, Calculated_Cost, "
+                "Authentication_ID, Charge_Point_ID) VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+            conn.executemany("INSERT INTO FraudFinding (CDR_ID, Rule_ID, Severity, Reason) VALUES (?, 1, 2, ?)", cases)
+            conn.commit()
+            batch, cases = [], []
+
+
+def timed(call):
+    started = time.perf_counter()
+    result = call()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--fraud-share", type=float, default=0.05)
+    parser.add_argument("--page-size", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = DbContext()
+        db.db_name = os.path.join(tmp_dir, "bench.db")
+        db.initialize_database()
+        db.connect()
+        fill(db, args.rows, args.fraud_share)
+        cursor = db.connection.cursor()
+        filters = DataTableFilters()
+
+        print(f"{args.rows:,} CDRs, page size {args.page_size}")
+        print(f"{'sort':<24}{'first':>10}{'middle':>10}{'last':>10}{'pages':>8}  (ms, count cached after first)")
+        for sort_by in SORT_COLUMNS:
+            for sort_dir in ("desc", "asc"):
+                count_cache.clear()
+                after, pages, times = None, 0, []
+                while True:
+                    page, ms = timed(lambda: fetch_page(cursor, db.db_name, filters, sort_by, sort_dir,
+                                                        args.page_size, after))
+                    times.append(ms)
+                    pages += 1
+                    after = page["nextCursor"]
+                    if after is None:
+                        break
+                print(f"{sort_by + ' ' + sort_dir:<24}{times[0]:>10.2f}{times[len(times) // 2]:>10.2f}"
+                      f"{times[-1]:>10.2f}{pages:>8,}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
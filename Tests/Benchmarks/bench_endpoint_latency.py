@@ -0,0 +1,113 @@
+"""
+Load test: endpoint latency under concurrent requests.
+
+Fires `--requests` GETs per endpoint with `--concurrency` requests in flight
+and reports p50/p99 latency per endpoint. A cheap probe endpoint is mixed in
+with the heavy ones: when a handler blocks the event loop, the probe's p99
+climbs to the duration of the slowest query. Run it once on the old and once
+on the new code to compare.
+
+Start the backend first (python -m backend.program), or let the harness do it:
+    python -m Tests.Benchmarks.bench_endpoint_latency --serve --concurrency 32 --requests 200
+"""
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+HEAVY_ENDPOINTS = (
+    "/tabel/all",
+    "/api/data-table?page=1&page_size=20",
+    "/api/charge-point-stats?page=1&page_size=20",
+    "/api/user-stats",
+    "/api/overlapping-stats",
+)
+PROBE_ENDPOINT = "/api/db-pool-stats"
+
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_load(base_url, endpoints, requests_per_endpoint, concurrency, timeout):
+    latencies = {endpoint: [] for endpoint in endpoints}
+    errors = {endpoint: 0 for endpoint in endpoints}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout) as client:
+        async def hit(endpoint):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(endpoint)
+                    if response.status_code >= 400:
+                        errors[endpoint] += 1
+                except httpx.HTTPError:
+                    errors[endpoint] += 1
+                latencies[endpoint].append((time.perf_counter() - started) * 1000)
+
+        # Interleave endpoints so heavy and probe requests are in flight together
+        jobs = [hit(endpoint) for _ in range(requests_per_endpoint) for endpoint in endpoints]
+        started = time.perf_counter()
+        await asyncio.gather(*jobs)
+        elapsed = time.perf_counter() - started
+
+    return latencies, errors, elapsed
+
+
+def wait_until_up(base_url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(base_url + PROBE_ENDPOINT, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.5)
+    raise RuntimeError(f"Backend at {base_url} did not come up within {timeout}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--requests", type=int, default=100, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--endpoint", action="append", help="override the heavy endpoint list")
+    parser.add_argument("--serve", action="store_true", help="start uvicorn for the duration of the test")
+    args = parser.parse_args()
+
+    server = None
+    if args.serve:
+        port = httpx.URL(args.base_url).port or 8000
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.program:app", "--port", str(port), "--log-level", "warning"]
+        )
+    try:
+        wait_until_up(args.base_url)
+        endpoints = list(args.endpoint or HEAVY_ENDPOINTS) + [PROBE_ENDPOINT]
+        latencies, errors, elapsed = asyncio.run(
+            run_load(args.base_url, endpoints, args.requests, args.concurrency, args.timeout)
+        )
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"{total:,} requests, concurrency {args.concurrency}, {elapsed:.2f}s ({total / elapsed:,.1f} req/s)")
+    print(f"{'endpoint':<48} {'p50 ms':>10} {'p99 ms':>10} {'mean ms':>10} {'errors':>7}")
+    for endpoint, values in latencies.items():
+        print(f"{endpoint:<48} {percentile(values, 50):>10.1f} {percentile(values, 99):>10.1f} "
+              f"{statistics.fmean(values):>10.1f} {errors[endpoint]:>7}")
+
+
+if __name__ == "__main__":
+    main()
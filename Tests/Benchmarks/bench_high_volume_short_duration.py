@@ -0,0 +1,108 @@
+"""
+Benchmark: columnar detect_high_volume_short_duration vs. the old N+1 loop.
+
+Run from the project root:
+    python -m Tests.Benchmarks.bench_high_volume_short_duration --rows 200000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from Tests.synthetic_cdrs import insert_cdr_rows
+from backend.data.cdr_features import ensure_cdr_features
+from backend.fraude_detectie.Fraude_detectie import FraudDetector
+
+
+def build_db(db_path: str, rows: int, seed: int = 42):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    data = []
+    for i in range(rows):
+        minutes = rng.randint(1, 240)
+        volume = f"{rng.uniform(0, 60):.3f}".replace(".", ",")
+        duration = f"{minutes // 60:02d}:{minutes % 60:02d}:{rng.randint(0, 59):02d}"
+        data.append((str(i), f"AUTH{i % 5000}", f"CP{i % 2000}", None, volume, duration, 10.0,
+                     "2024-01-01 10:00:00", "2024-01-01 11:00:00", None))
+    insert_cdr_rows(conn, data)
+    conn.commit()
+    conn.close()
+
+
+def legacy_safe_float(value):
+    """The old FraudDetector._safe_float, kept here as part of the reference implementation."""
+    if value is None:
+        return None
+    try:
+        return float(str(value).replace(",", "."))
+    except (ValueError, TypeError):
+        return None
+
+
+def legacy_loop(detector: FraudDetector, cursor) -> list:
+    """The per-row implementation this benchmark replaces (one extra SELECT per CDR)."""
+    max_vol = detector.thresholds["MAX_VOLUME_KWH"]
+    max_dur = detector.thresholds["MAX_DURATION_MINUTES"]
+    cursor.execute("""
+    SELECT CDR_ID
+    FROM CDR
+    WHERE Volume IS NOT NULL AND Volume != '' AND Duration IS NOT NULL AND Duration != ''
+    """)
+    fraud_ids = []
+    for (cdr_id,) in cursor.fetchall():
+        cursor.execute("SELECT Volume, Duration FROM CDR WHERE CDR_ID = ?", (cdr_id,))
+        volume_str, duration = cursor.fetchone()
+        try:
+            volume = legacy_safe_float(volume_str)
+            if volume is None:
+                continue
+            h, m, s = map(int, duration.split(":"))
+            if volume > max_vol and h * 60 + m + s / 60 < max_dur:
+                fraud_ids.append(cdr_id)
+        except (ValueError, AttributeError):
+            continue
+    return fraud_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        build_db(db_path, args.rows)
+        detector = FraudDetector(db_path)
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        detector._create_fraud_table(cursor)
+        # Computed once at import, not per detection run
+        start = time.perf_counter()
+        ensure_cdr_features(cursor)
+        features_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        expected = legacy_loop(detector, cursor)
+        legacy_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        detector.detect_high_volume_short_duration(cursor)
+        columnar_seconds = time.perf_counter() - start
+
+        cursor.execute("SELECT COUNT(*) FROM FraudCase WHERE Reason1 IS NOT NULL")
+        flagged = cursor.fetchone()[0]
+        conn.close()
+
+    print(f"rows:             {args.rows}")
+    print(f"flagged (legacy): {len(expected)}")
+    print(f"flagged (new):    {flagged}")
+    print(f"legacy loop:      {legacy_seconds:.3f}s ({args.rows / legacy_seconds:,.0f} rows/s)")
+    print(f"indexed rule:     {columnar_seconds:.3f}s ({args.rows / columnar_seconds:,.0f} rows/s)")
+    print(f"CdrFeatures:      {features_seconds:.3f}s, once per import")
+    print(f"speed-up:         {legacy_seconds / columnar_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Benchmark: vectorized impossible-travel detection.
+
+Measures the NumPy kernel on --sessions synthetic in-memory sessions, then
+detect_impossible_travel end to end against the old per-pair Python loop on
+a database of --db-rows CDRs.
+
+Run from the project root:
+    python -m Tests.Benchmarks.bench_impossible_travel --sessions 10000000 --db-rows 20000
+"""
+import argparse
+import math
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from Tests.synthetic_cdrs import insert_cdr_rows
+from backend.fraude_detectie.columnar import impossible_travel_mask
+from backend.data.cdr_features import ensure_cdr_features
+from backend.fraude_detectie.Fraude_detectie import FraudDetector
+
+USERS = 50_000
+CHARGE_POINTS = 5_000
+
+
+def synthetic_sessions(sessions: int, seed: int = 42):
+    """Sorted (user, start, end, latitude, longitude) arrays with about 20 km between charge points."""
+    rng = np.random.default_rng(seed)
+    user = np.sort(rng.integers(0, USERS, sessions))
+    start = np.cumsum(rng.integers(600, 4 * 3600, sessions))
+    end = start + rng.integers(300, 3600, sessions)
+    charge_point = rng.integers(0, CHARGE_POINTS, sessions)
+    latitude = 51.5 + (charge_point % 100) * 0.02
+    longitude = 4.0 + (charge_point // 100) * 0.03
+    return user, start, end, latitude, longitude
+
+
+def build_db(db_path: str, rows: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE ChargePoint (Charge_Point_ID TEXT PRIMARY KEY, Latitude REAL, Longitude REAL)")
+    conn.executemany("INSERT INTO ChargePoint VALUES (?, ?, ?)", [
+        (f"CP{i}", 51.5 + (i % 100) * 0.02, 4.0 + (i // 100) * 0.03) for i in range(CHARGE_POINTS)
+    ])
+    base = pd.Timestamp("2024-01-01")
+    starts = base + pd.to_timedelta(rng.integers(0, 90 * 24 * 3600, rows), unit="s")
+    durations = rng.integers(300, 3600, rows)
+    data = []
+    for i in range(rows):
+        start = starts[i].strftime("%Y-%m-%d %H:%M:%S")
+        end = (starts[i] + pd.Timedelta(seconds=int(durations[i]))).strftime("%Y-%m-%d %H:%M:%S")
+        data.append((str(i), f"AUTH{i % (rows // 20 or 1)}", f"CP{rng.integers(CHARGE_POINTS)}", None, "10", "00:30:00", 10.0,
+                     start, end, None))
+    insert_cdr_rows(conn, data)
+    conn.execute("CREATE INDEX idx_cdr_auth_start ON CDR(Authentication_ID, Start_epoch, End_epoch)")
+    conn.commit()
+    conn.close()
+
+
+def legacy_distance_km(lat1, lon1, lat2, lon2):
+    """The old FraudDetector._calculate_distance_km, kept here as part of the reference implementation."""
+    R = 6371
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = (
+        math.sin(dlat / 2) ** 2
+        + math.cos(math.radians(lat1))
+        * math.cos(math.radians(lat2))
+        * math.sin(dlon / 2) ** 2
+    )
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    return R * c
+
+
+def legacy_loop(detector: FraudDetector, cursor) -> int:
+    """The per-pair implementation this benchmark replaces, with the coordinates it never loaded."""
+    cursor.execute("""
+    SELECT CDR_ID, Authentication_ID, Start_datetime, End_datetime, Charge_Point_ID
+    FROM CDR
+    WHERE Start_datetime IS NOT NULL AND End_datetime IS NOT NULL
+    ORDER BY Authentication_ID, Start_datetime
+    """)
+    sessions = cursor.fetchall()
+    cursor.execute("SELECT Charge_Point_ID, Latitude, Longitude FROM ChargePoint")
+    location_dict = {cp: (lat, lon) for cp, lat, lon in cursor.fetchall()}
+    prev_session = {}
+    flagged = 0
+    for cdr_id, auth_id, start_dt, end_dt, charge_point_id in sessions:
+        if auth_id in prev_session:
+            _, prev_end_dt, prev_point = prev_session[auth_id]
+            lat1, lon1 = location_dict[prev_point]
+            lat2, lon2 = location_dict[charge_point_id]
+            distance = legacy_distance_km(lat1, lon1, lat2, lon2)
+            time_diff = (pd.to_datetime(start_dt) - pd.to_datetime(prev_end_dt)).total_seconds() / 60
+            if distance >= detector.thresholds["MIN_DISTANCE_KM"] and time_diff < detector.thresholds["MIN_TRAVEL_TIME_MINUTES"]:
+                flagged += 1
+        prev_session[auth_id] = (cdr_id, end_dt, charge_point_id)
+    return flagged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=10_000_000)
+    parser.add_argument("--db-rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    arrays = synthetic_sessions(args.sessions)
+    start = time.perf_counter()
+    mask, _, _ = impossible_travel_mask(*arrays, 10, 15)
+    kernel_seconds = time.perf_counter() - start
+    print(f"kernel sessions:  {args.sessions:,}")
+    print(f"kernel flagged:   {int(mask.sum()):,}")
+    print(f"kernel time:      {kernel_seconds:.3f}s ({args.sessions / kernel_seconds:,.0f} sessions/s)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        build_db(db_path, args.db_rows)
+        detector = FraudDetector(db_path)
+        conn = sqlite3.connect(db_path)
+        cursor = conn.cursor()
+        detector._create_fraud_table(cursor)
+        # Computed once at import, not per detection run
+        start = time.perf_counter()
+        ensure_cdr_features(cursor)
+        features_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        expected = legacy_loop(detector, cursor)
+        legacy_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        detector.detect_impossible_travel(cursor)
+        vectorized_seconds = time.perf_counter() - start
+
+        cursor.execute("SELECT COUNT(*) FROM FraudCase WHERE Reason7 IS NOT NULL")
+        flagged = cursor.fetchone()[0]
+        conn.close()
+
+    print(f"db rows:          {args.db_rows:,}")
+    print(f"flagged (legacy): {expected}")
+    print(f"flagged (new):    {flagged}")
+    print(f"legacy loop:      {legacy_seconds:.3f}s ({args.db_rows / legacy_seconds:,.0f} rows/s)")
+    print(f"indexed rule:     {vectorized_seconds:.3f}s ({args.db_rows / vectorized_seconds:,.0f} rows/s)")
+    print(f"CdrFeatures:      {features_seconds:.3f}s, once per import")
+    print(f"speed-up:         {legacy_seconds / vectorized_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark: map views from the FraudLocationIndex R*Tree vs. reading every fraud location.
+
+Run from the project root:
+    python -m Tests.Benchmarks.bench_map_view --locations 300000
+"""
+import argparse
+import sqlite3
+import time
+
+import numpy as np
+
+from backend.fraud_locations.location_refresh import create_fraud_location_tables
+from backend.fraud_locations.map_view import BoundingBox, fraud_locations_in_view
+
+VIEWS = [
+    ("Europe, zoom 4", "-15,35,30,65", 4),
+    ("Netherlands, zoom 7", "3,50.5,7.5,53.7", 7),
+    ("Amsterdam, zoom 12", "4.75,52.3,5.05,52.43", 12),
+    ("street, zoom 16", "4.88,52.365,4.9,52.375", 16),
+]
+
+
+def build_db(locations: int, seed: int = 42) -> sqlite3.Connection:
+    rng = np.random.default_rng(seed)
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE CDR (CDR_ID TEXT PRIMARY KEY, Charge_Point_ID TEXT)")
+    create_fraud_location_tables(cursor)
+    # Most charge points in the Benelux, the rest spread over Europe
+    near = locations * 3 // 4
+    latitude = np.concatenate([rng.normal(52.0, 0.8, near), rng.uniform(36, 64, locations - near)])
+    longitude = np.concatenate([rng.normal(5.0, 0.8, near), rng.uniform(-10, 28, locations - near)])
+    cursor.executemany(
+        "INSERT INTO FraudLocations (Location_ID, Charge_Point_ID, Latitude, Longitude, Fraud_Count) VALUES (?, ?, ?, ?, ?)",
+        ((f"LOC_CP{i}", f"CP{i}", float(latitude[i]), float(longitude[i]), int(rng.integers(1, 20))) for i in range(locations)),
+    )
+    cursor.execute("""
+        INSERT INTO FraudLocationIndex (id, Min_Lon, Max_Lon, Min_Lat, Max_Lat)
+        SELECT rowid, Longitude, Longitude, Latitude, Latitude FROM FraudLocations
+    """)
+    conn.commit()
+    return conn
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--locations", type=int, default=300_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    conn = build_db(args.locations)
+    cursor = conn.cursor()
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        cursor.execute("SELECT * FROM FraudLocations ORDER BY Fraud_Count DESC")
+        rows = cursor.fetchall()
+    full_ms = (time.perf_counter() - start) / args.repeat * 1000
+    print(f"locations:            {args.locations:,}")
+    print(f"all locations:        {full_ms:8.1f} ms, {len(rows):,} rows")
+
+    for name, bbox, zoom in VIEWS:
+        view_box = BoundingBox.parse(bbox)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            view = fraud_locations_in_view(cursor, view_box, zoom)
+        view_ms = (time.perf_counter() - start) / args.repeat * 1000
+        print(f"{name + ':':<22}{view_ms:8.1f} ms, {len(view['points']):,} points, {len(view['clusters']):,} clusters")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
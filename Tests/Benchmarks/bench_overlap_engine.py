@@ -0,0 +1,103 @@
+"""
+Benchmark: sweep-line overlap engine vs. the old datetime() self-join.
+
+Generates a synthetic CDR set where a few heavy users own most sessions
+(Zipf-like skew), runs the sweep over the full set and the SQL self-join
+over a smaller slice (it is quadratic per user), and checks that both agree
+on the slice.
+
+Run from the project root:
+    python -m Tests.Benchmarks.bench_overlap_engine --rows 1000000 --sql-rows 20000
+"""
+import argparse
+import random
+import sqlite3
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from backend.overlapping.overlap_engine import overlap_counts
+
+ISO = "%Y-%m-%d %H:%M:%S"
+EPOCH_BASE = datetime(2024, 1, 1)
+
+SELF_JOIN = """
+WITH Overlaps AS (
+    SELECT a.CDR_ID
+    FROM CDR a
+    JOIN CDR b ON a.Authentication_ID = b.Authentication_ID AND a.CDR_ID != b.CDR_ID
+    AND (
+        datetime(a.Start_datetime) BETWEEN datetime(b.Start_datetime) AND datetime(b.End_datetime)
+        OR datetime(a.End_datetime) BETWEEN datetime(b.Start_datetime) AND datetime(b.End_datetime)
+        OR datetime(b.Start_datetime) BETWEEN datetime(a.Start_datetime) AND datetime(a.End_datetime)
+    )
+)
+SELECT CDR_ID FROM Overlaps GROUP BY CDR_ID
+"""
+
+
+def generate_sessions(rows: int, users: int, seed: int = 1):
+    """(CDR_ID, Authentication_ID, start, end) with epoch seconds over one year."""
+    rng = random.Random(seed)
+    # Zipf-like weights: user k gets weight 1/k, so the top users dominate
+    weights = [1 / (k + 1) for k in range(users)]
+    auth_ids = rng.choices(range(users), weights=weights, k=rows)
+    year = 365 * 24 * 3600
+    sessions = []
+    for i, user in enumerate(auth_ids):
+        start = rng.randrange(year)
+        sessions.append((str(i), f"AUTH{user}", start, start + rng.randint(5 * 60, 4 * 3600)))
+    return sessions
+
+
+def run_sql(sessions):
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE CDR (CDR_ID TEXT PRIMARY KEY, Authentication_ID TEXT, Start_datetime TEXT, End_datetime TEXT)")
+    conn.executemany(
+        "INSERT INTO CDR VALUES (?, ?, ?, ?)",
+        [
+            (cdr_id, auth_id,
+             (EPOCH_BASE + timedelta(seconds=start)).strftime(ISO),
+             (EPOCH_BASE + timedelta(seconds=end)).strftime(ISO))
+            for cdr_id, auth_id, start, end in sessions
+        ],
+    )
+    start_time = time.perf_counter()
+    ids = {row[0] for row in conn.execute(SELF_JOIN)}
+    elapsed = time.perf_counter() - start_time
+    conn.close()
+    return ids, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--sql-rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    sessions = generate_sessions(args.rows, args.users)
+    heaviest_user, heaviest_count = Counter(s[1] for s in sessions).most_common(1)[0]
+
+    start_time = time.perf_counter()
+    counts = overlap_counts(sessions, inclusive=True)
+    sweep_seconds = time.perf_counter() - start_time
+
+    sample = sessions[: args.sql_rows]
+    sql_ids, sql_seconds = run_sql(sample)
+    sample_counts = overlap_counts(sample, inclusive=True)
+    start_time = time.perf_counter()
+    overlap_counts(sample, inclusive=True)
+    sample_sweep_seconds = time.perf_counter() - start_time
+
+    print(f"rows:                 {args.rows:,} ({args.users:,} users, heaviest {heaviest_user} has {heaviest_count:,})")
+    print(f"sweep, full set:      {sweep_seconds:.2f}s, {len(counts):,} overlapping CDRs "
+          f"({args.rows / sweep_seconds:,.0f} rows/s)")
+    print(f"slice of {args.sql_rows:,} rows:")
+    print(f"  SQL self-join:      {sql_seconds:.2f}s, {len(sql_ids):,} overlapping CDRs")
+    print(f"  sweep:              {sample_sweep_seconds:.3f}s, {len(sample_counts):,} overlapping CDRs")
+    print(f"  results match:      {sql_ids == set(sample_counts)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark: a full detect_fraud run, serial vs. parallel rule execution.
+
+Both runs start from copies of the same synthetic database and must end
+with the same FraudCase rows. Prints the wall time per rule of each run.
+
+Run from the project root:
+    python -m Tests.Benchmarks.bench_parallel_detection --rows 300000
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from Tests.synthetic_cdrs import insert_cdr_rows
+from backend.fraude_detectie.Fraude_detectie import RULES, FraudDetector
+
+
+def build_db(db_path: str, rows: int, seed: int = 42):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    base = 1_704_067_200
+    data = []
+    for i in range(rows):
+        start = base + rng.randint(0, 180 * 86400)
+        minutes = rng.randint(5, 240)
+        start_text = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(start))
+        end_text = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(start + minutes * 60))
+        data.append((
+            f"CDR{i:09d}", f"AUTH{i % 20000}", f"CP{i % 5000}", None,
+            f"{rng.uniform(0, 60):.3f}".replace(".", ","),
+            f"{minutes // 60:02d}:{minutes % 60:02d}:00", rng.uniform(1, 40), start_text, end_text, None,
+        ))
+    insert_cdr_rows(conn, data)
+    conn.commit()
+    conn.close()
+
+
+def fraud_cases(db_path: str) -> list:
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT * FROM FraudCase ORDER BY CDR_ID").fetchall()
+    conn.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=300_000)
+    parser.add_argument("--workers", type=int, default=None, help="default: one per CPU")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        serial_db = os.path.join(tmp_dir, "serial.db")
+        build_db(serial_db, args.rows)
+        parallel_db = os.path.join(tmp_dir, "parallel.db")
+        shutil.copyfile(serial_db, parallel_db)
+
+        timings = {}
+        for name, db_path, parallel in (("serial", serial_db, False), ("parallel", parallel_db, True)):
+            detector = FraudDetector(db_path)
+            started = time.perf_counter()
+            detector.detect_fraud(parallel=parallel, max_workers=args.workers)
+            timings[name] = (time.perf_counter() - started, detector.rule_timings)
+
+        cases = fraud_cases(serial_db)
+        assert cases == fraud_cases(parallel_db), "parallel run differs from serial run"
+
+        print(f"rows:         {args.rows:,}")
+        print(f"cpus:         {os.cpu_count()}")
+        print(f"fraud cases:  {len(cases):,}")
+        print(f"{'rule':<36}{'serial':>10}{'parallel':>10}")
+        for rule in RULES:
+            print(f"{rule:<36}{timings['serial'][1][rule]:>9.3f}s{timings['parallel'][1][rule]:>9.3f}s")
+        print(f"{'detect_fraud total':<36}{timings['serial'][0]:>9.3f}s{timings['parallel'][0]:>9.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark: streaming CDR import, throughput and peak memory.
+
+Writes a synthetic CDR export (CSV, or .xlsx with --xlsx) and imports it with
+DbContext.import_excel_to_database into a temporary database, printing the
+progress phases and the peak resident memory. Peak memory should stay flat
+as --rows grows; compare with the old pd.read_excel + single executemany
+import by running the same command on the previous version.
+
+Run from the project root:
+    python -m Tests.Benchmarks.bench_streaming_import --rows 2000000
+"""
+import argparse
+import csv
+import os
+import random
+import resource
+import tempfile
+import time
+
+from backend.data.DbContext import DbContext
+from backend.data.cdr_reader import CDR_COLUMNS
+
+
+def synthetic_rows(rows: int, seed: int = 3):
+    rng = random.Random(seed)
+    for i in range(rows):
+        start = f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} {rng.randint(0, 22):02d}:{rng.randint(0, 59):02d}:00"
+        end = start[:11] + f"{int(start[11:13]) + 1:02d}" + start[13:]
+        values = {col: f"{col[:4]}{i % 997}" for col in CDR_COLUMNS}
+        values.update(
+            CDR_ID=f"CDR{i:09d}", Start_datetime=start, End_datetime=end, Duration="01:00:00",
+            Volume=round(rng.uniform(0, 60), 3), Calculated_Cost=round(rng.uniform(1, 40), 2),
+            Authentication_ID=f"AUTH{i % 20000}", Charge_Point_ID=f"CP{i % 5000}",
+        )
+        yield [values[col] for col in CDR_COLUMNS]
+
+
+def write_file(path: str, rows: int, xlsx: bool):
+    if xlsx:
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(CDR_COLUMNS)
+        for row in synthetic_rows(rows):
+            sheet.append(row)
+        workbook.save(path)
+    else:
+        with open(path, "w", newline="") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(CDR_COLUMNS)
+            writer.writerows(synthetic_rows(rows))
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--xlsx", action="store_true", help="import an .xlsx file instead of CSV")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "cdr_export.xlsx" if args.xlsx else "cdr_export.csv")
+        write_file(path, args.rows, args.xlsx)
+        print(f"file:        {os.path.getsize(path) / 1e6:,.1f} MB, {args.rows:,} rows")
+        print(f"rss before:  {peak_rss_mb():,.0f} MB")
+
+        db = DbContext()
+        db.db_name = os.path.join(tmp_dir, "bench.db")
+        db.initialize_database()
+
+        started = time.perf_counter()
+        timings = {}
+
+        def progress(phase, rows_done):
+            if phase not in timings:
+                timings[phase] = time.perf_counter() - started
+            if phase == "inserting" and rows_done % (args.batch_size * 40) == 0:
+                print(f"  {rows_done:>12,} rows  {time.perf_counter() - started:7.1f}s  peak rss {peak_rss_mb():,.0f} MB")
+
+        imported, error = db.import_excel_to_database(path, batch_size=args.batch_size, progress=progress)
+        total = time.perf_counter() - started
+        insert_seconds = timings.get("detecting", total)
+
+    print(f"imported:    {imported:,} rows{f' (error: {error})' if error else ''}")
+    print(f"insert:      {insert_seconds:.1f}s ({imported / insert_seconds:,.0f} rows/s)")
+    print(f"detection:   {total - insert_seconds:.1f}s")
+    print(f"peak rss:    {peak_rss_mb():,.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
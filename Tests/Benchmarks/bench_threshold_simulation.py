@@ -0,0 +1,83 @@
+"""
+Benchmark: threshold what-if simulation vs. the detection run a threshold change triggers.
+
+The simulation must report the same number of findings per rule as the
+detection run with the same thresholds.
+
+Run from the project root:
+    python -m Tests.Benchmarks.bench_threshold_simulation --rows 300000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from Tests.Benchmarks.bench_parallel_detection import build_db
+from backend.fraude_detectie.Fraude_detectie import FraudDetector
+from backend.fraude_detectie.threshold_simulation import simulate_thresholds
+
+THRESHOLDS = {
+    "MAX_VOLUME_KWH": 30,
+    "MAX_DURATION_MINUTES": 45,
+    "MIN_COST_THRESHOLD": 15,
+    "MIN_TIME_GAP_MINUTES": 60,
+    "THRESHOLD": 3,
+    "MIN_DISTANCE_KM": 20,
+    "MIN_TRAVEL_TIME_MINUTES": 30,
+}
+
+
+def add_charge_points(db_path: str, charge_points: int = 5000, seed: int = 42):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE ChargePoint (Charge_Point_ID TEXT PRIMARY KEY, Latitude REAL, Longitude REAL)")
+    conn.executemany(
+        "INSERT INTO ChargePoint VALUES (?, ?, ?)",
+        ((f"CP{i}", rng.uniform(50.8, 53.5), rng.uniform(3.4, 7.2)) for i in range(charge_points)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=300_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "simulate.db")
+        build_db(db_path, args.rows)
+        add_charge_points(db_path)
+
+        started = time.perf_counter()
+        cold = simulate_thresholds(db_path, THRESHOLDS)
+        cold_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            warm = simulate_thresholds(db_path, THRESHOLDS)
+        warm_ms = (time.perf_counter() - started) / args.repeat * 1000
+        assert warm["cachedFeatures"]
+
+        started = time.perf_counter()
+        FraudDetector(db_path, thresholds=THRESHOLDS).detect_fraud()
+        detect_seconds = time.perf_counter() - started
+
+        conn = sqlite3.connect(db_path)
+        detected = dict(conn.execute("SELECT Rule_ID, COUNT(*) FROM FraudFinding GROUP BY Rule_ID").fetchall())
+        conn.close()
+        for rule in cold["rules"]:
+            assert rule["flagged"] == detected.get(rule["ruleId"], 0), f"{rule['rule']} differs from detection"
+
+    print(f"rows:                      {args.rows:,}")
+    print(f"flagged CDRs:              {cold['flaggedCdrs']:,}")
+    print(f"simulation, cold features: {cold_seconds * 1000:9.1f} ms")
+    print(f"simulation, cached:        {warm_ms:9.1f} ms")
+    print(f"detect_fraud:              {detect_seconds * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,7 @@ from datetime import datetime, timedelta
 from fastapi.testclient import TestClient
 from backend.program import app
 from backend.data.DbContext import DbContext  # original class
+from backend.data.DbPool import close_all_pools
 
 ISO = "%Y-%m-%d %H:%M:%S"
 
@@ -159,6 +160,9 @@ class TestOverlappingBackend(unittest.TestCase):
         from backend.data import DbContext as db_mod
         db_mod.DbContext.__init__ = cls._orig_init
 
+        # Close the pooled connections that still point at the temp DB
+        close_all_pools()
+
         # Garbage-collect to ensure sqlite releases file handles
         gc.collect()
 
@@ -1,4 +1,5 @@
 import unittest
+from unittest.mock import patch
 from fastapi.testclient import TestClient
 from backend.program import app
 
@@ -75,5 +76,12 @@ class TestChargePointStats(unittest.TestCase):
             self.assertIsInstance(first_item["total_volume"], (int, float))
             self.assertIsInstance(first_item["total_cost"], (int, float))
 
+    @patch("backend.fraud_charge_point.fraud_charge_point.DbContext")
+    def test_get_specific_fraud_unknown_reason(self, mock_db):
+        response = self.client.get("/api/all-charge-point-ids-with-specific-fraud/NoSuchReason")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["detail"], "Unknown reason: NoSuchReason")
+        mock_db.assert_not_called()
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,89 @@
+import os
+import random
+import sqlite3
+
+import pytest
+
+from backend.data.aggregates import rebuild_aggregates, refresh_aggregates
+from backend.fraude_detectie.Fraude_detectie import FraudDetector
+
+
+@pytest.fixture
+def db_path(tmp_dir):
+    return os.path.join(tmp_dir, "aggregates.db")
+
+
+def _stats(db_path):
+    conn = sqlite3.connect(db_path)
+    users = conn.execute("SELECT * FROM UserStats ORDER BY Authentication_ID").fetchall()
+    charge_points = conn.execute(
+        "SELECT * FROM ChargePointStats ORDER BY Charge_Point_ID, Charge_Point_Country"
+    ).fetchall()
+    conn.close()
+    return users, charge_points
+
+
+def _rebuilt(db_path):
+    conn = sqlite3.connect(db_path)
+    rebuild_aggregates(conn.cursor())
+    conn.commit()
+    conn.close()
+    return _stats(db_path)
+
+
+def test_incremental_refresh_matches_rebuild(db_path, insert_cdrs):
+    rng = random.Random(8)
+    insert_cdrs(db_path, "history.xlsx", 0, 300, rng, charge_points=("CP1", "CP2", "CP3", None))
+    FraudDetector(db_path).detect_fraud()
+    users, charge_points = _stats(db_path)
+    assert sum(row[1] for row in users) == 300
+    assert any(row[0] is None for row in users)
+    assert any(row[4] for row in charge_points)
+
+    insert_cdrs(db_path, "new.xlsx", 300, 60, rng, charge_points=("CP1", "CP2", "CP3", None))
+    # The import counts its own CDRs, detection the ones whose fraud case changed
+    conn = sqlite3.connect(db_path)
+    refresh_aggregates(conn.cursor(), "SELECT CDR_ID FROM CDR WHERE import_filename = ?", ("new.xlsx",))
+    conn.commit()
+    conn.close()
+    assert sum(row[1] for row in _stats(db_path)[0]) == 360
+    FraudDetector(db_path).detect_fraud(import_filename="new.xlsx")
+    refreshed = _stats(db_path)
+
+    assert sum(row[1] for row in refreshed[0]) == 360
+    assert refreshed == _rebuilt(db_path)
+
+
+def test_per_reason_counts(db_path, insert_cdrs):
+    insert_cdrs(db_path, "history.xlsx", 0, 50, random.Random(2))
+    FraudDetector(db_path).detect_fraud()
+
+    conn = sqlite3.connect(db_path)
+    expected = conn.execute("""
+        SELECT c.Authentication_ID, COUNT(f.Reason3)
+        FROM CDR c LEFT JOIN FraudCase f ON f.CDR_ID = c.CDR_ID
+        GROUP BY c.Authentication_ID ORDER BY c.Authentication_ID
+    """).fetchall()
+    actual = conn.execute("SELECT Authentication_ID, Reason3_count FROM UserStats ORDER BY Authentication_ID").fetchall()
+    conn.close()
+    assert actual == expected
+
+
+def test_cleaned_ids_leave_no_stale_totals(db_path, insert_cdrs):
+    rng = random.Random(4)
+    insert_cdrs(db_path, "history.xlsx", 0, 100, rng)
+    FraudDetector(db_path).detect_fraud()
+
+    insert_cdrs(db_path, "new.xlsx", 100, 20, rng)
+    conn = sqlite3.connect(db_path)
+    # Padded IDs, counted as they are by the import and cleaned by detection
+    conn.execute("UPDATE CDR SET Authentication_ID = ' A1', Charge_Point_ID = 'CP1 ' WHERE CDR_ID IN ('CDR0100', 'CDR0101')")
+    refresh_aggregates(conn.cursor(), "SELECT CDR_ID FROM CDR WHERE import_filename = ?", ("new.xlsx",))
+    conn.commit()
+    conn.close()
+    FraudDetector(db_path).detect_fraud(import_filename="new.xlsx")
+
+    users, charge_points = _stats(db_path)
+    assert " A1" not in [row[0] for row in users]
+    assert "CP1 " not in [row[0] for row in charge_points]
+    assert (users, charge_points) == _rebuilt(db_path)
@@ -0,0 +1,85 @@
+"""
+Unit tests for the paged CDR export and the CSV/XLSX writers behind /api/export.
+"""
+
+import csv
+import gzip
+import io
+import os
+import tempfile
+import unittest
+
+from openpyxl import load_workbook
+
+from backend.data.DbContext import DbContext
+from backend.data.DbPool import close_all_pools
+from backend.data.cdr_reader import CDR_COLUMNS
+from backend.data.cdr_writer import csv_chunks
+
+
+class CdrExportTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db = DbContext()
+        self.db.db_name = os.path.join(self.tmp_dir.name, "export.db")
+        self.db.initialize_database()
+        self.db.connect()
+        rows = []
+        for i in range(7):
+            values = {col: f"{col}-{i}" for col in CDR_COLUMNS}
+            values.update(CDR_ID=f"CDR{i:03d}", Start_datetime=f"2024-01-0{i + 1} 10:00:00",
+                          End_datetime=f"2024-01-0{i + 1} 11:00:00", Volume=1.5, Calculated_Cost=2.0)
+            rows.append(values)
+        for values in rows:
+            self.db.insert_cdr(values)
+        self.db.connection.commit()
+        self.db.close()
+
+    def tearDown(self):
+        close_all_pools()
+        self.tmp_dir.cleanup()
+
+    def test_pages_are_bounded_and_filtered(self):
+        header, pages = self.db.iter_cdr_export("CDR_ID, Volume", start_date="2024-01-02", page_size=4)
+        pages = list(pages)
+        self.assertEqual(header, ["CDR_ID", "Volume"])
+        self.assertEqual([len(page) for page in pages], [4, 2])
+        self.assertEqual(pages[0][0], ("CDR001", 1.5))
+        # The connection went back to the pool with the last page
+        self.assertIsNone(self.db.connection)
+
+    def test_default_columns_leave_out_derived_time_columns(self):
+        header, pages = self.db.iter_cdr_export()
+        next(pages)
+        pages.close()
+        self.assertEqual(header[:len(CDR_COLUMNS)], CDR_COLUMNS)
+        self.assertNotIn("Start_epoch", header)
+        self.assertIsNone(self.db.connection)
+
+    def test_unknown_columns_are_rejected(self):
+        with self.assertRaises(ValueError):
+            self.db.iter_cdr_export("CDR_ID, Volume FROM CDR; DROP TABLE CDR --")
+        self.assertIsNone(self.db.connection)
+
+    def test_gzip_chunks_form_one_stream(self):
+        header, pages = self.db.iter_cdr_export("CDR_ID", page_size=3)
+        chunks = list(csv_chunks(header, pages, compress=True))
+        self.assertGreater(len(chunks), 1)
+        rows = list(csv.reader(io.StringIO(gzip.decompress(b"".join(chunks)).decode("utf-8"))))
+        self.assertEqual(rows, [["CDR_ID"]] + [[f"CDR{i:03d}"] for i in range(7)])
+
+    def test_export_to_file(self):
+        xlsx_path = os.path.join(self.tmp_dir.name, "out.xlsx")
+        self.assertEqual(self.db.export_cdr_to_file(xlsx_path, "CDR_ID,Volume"), (True, 7))
+        sheet = load_workbook(xlsx_path, read_only=True).active
+        values = list(sheet.values)
+        self.assertEqual(values[0], ("CDR_ID", "Volume"))
+        self.assertEqual(len(values), 8)
+
+        csv_path = os.path.join(self.tmp_dir.name, "out.csv")
+        self.assertEqual(self.db.export_cdr_to_file(csv_path, start_date="2025-01-01"), (False, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import sqlite3
+
+import pytest
+
+from Tests.synthetic_cdrs import CDR_TEST_SCHEMA, insert_cdr_rows
+from backend.data.cdr_features import (
+    CDR_FEATURE_COLUMNS,
+    cdr_features_complete,
+    compute_cdr_features,
+    ensure_cdr_features,
+    refresh_cdr_features,
+)
+
+
+@pytest.fixture
+def cursor():
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    cursor.execute(CDR_TEST_SCHEMA)
+    yield cursor
+    conn.close()
+
+
+def _insert(cursor, rows):
+    # Without Charge_Point_Country and import_filename
+    insert_cdr_rows(cursor.connection, [row[:3] + (None,) + row[3:] + (None,) for row in rows])
+
+
+def _stored(cursor):
+    cursor.execute(f"SELECT {', '.join(CDR_FEATURE_COLUMNS)} FROM CdrFeatures ORDER BY CDR_ID")
+    return cursor.fetchall()
+
+
+def _recomputed(cursor):
+    features = compute_cdr_features(cursor).sort_values("CDR_ID")
+    return [
+        tuple(None if value != value else value for value in row)
+        for row in features.astype(object).itertuples(index=False, name=None)
+    ]
+
+
+def test_parsed_and_windowed_values(cursor):
+    _insert(cursor, [
+        ("C1", "A1", "CP1", "30,5", "00:20:00", 15.25, "2024-01-01 10:00:00", "2024-01-01 10:20:00"),
+        ("C2", "A1", "CP1", "0", "bad", 5.0, "2024-01-01 10:30:00", "2024-01-01 11:00:00"),
+        ("C3", "A1", "CP2", "", "01:00:00", None, "2024-01-01 11:05:00", "2024-01-01 12:05:00"),
+        ("C4", None, "CP1", "10", "00:10:00", 20.0, "2024-01-01 10:00:00", "2024-01-01 10:10:00"),
+    ])
+    refresh_cdr_features(cursor)
+
+    assert _stored(cursor) == [
+        ("C1", 30.5, 20.0, 15.25, 0.5, None, None, None, None),
+        # A zero volume has no cost per kWh
+        ("C2", 0.0, None, 5.0, None, "C1", 600, "C1", 10.0),
+        ("C3", None, 60.0, None, None, None, None, "C2", 5.0),
+        # Sessions without a user are compared per charge point, but never travel
+        ("C4", 10.0, 10.0, 20.0, 2.0, None, None, None, None),
+    ]
+    assert cdr_features_complete(cursor)
+
+
+def test_new_sessions_refresh_their_users(cursor):
+    _insert(cursor, [
+        ("C1", "A1", "CP1", "10", "00:10:00", 1.0, "2024-01-01 10:00:00", "2024-01-01 10:10:00"),
+        ("C3", "A1", "CP1", "10", "00:10:00", 1.0, "2024-01-01 12:00:00", "2024-01-01 12:10:00"),
+        ("C9", "A2", "CP1", "10", "00:10:00", 1.0, "2024-01-01 11:00:00", "2024-01-01 11:10:00"),
+    ])
+    ensure_cdr_features(cursor)
+    # C2 lands between C1 and C3, so C3 gets a new predecessor
+    _insert(cursor, [("C2", "A1", "CP1", "10", "00:10:00", 1.0, "2024-01-01 11:00:00", "2024-01-01 11:10:00")])
+    assert not cdr_features_complete(cursor)
+
+    ensure_cdr_features(cursor)
+    assert _stored(cursor) == _recomputed(cursor)
+    cursor.execute("SELECT Prev_CDR_ID, Prev_Gap_Seconds FROM CdrFeatures WHERE CDR_ID = 'C3'")
+    assert cursor.fetchone() == ("C2", 3000)
+
+
+def test_changed_ids_refresh_old_and_new_user(cursor):
+    _insert(cursor, [
+        ("C1", " A1", "CP1", "10", "00:10:00", 1.0, "2024-01-01 10:00:00", "2024-01-01 10:10:00"),
+        ("C2", "A1", "CP1", "10", "00:10:00", 1.0, "2024-01-01 10:30:00", "2024-01-01 10:40:00"),
+        ("C3", " A1", "CP1", "10", "00:10:00", 1.0, "2024-01-01 11:00:00", "2024-01-01 11:10:00"),
+    ])
+    refresh_cdr_features(cursor)
+    cursor.execute("UPDATE CDR SET Authentication_ID = 'A1' WHERE CDR_ID = 'C1'")
+    refresh_cdr_features(cursor, [" A1", "A1"])
+
+    assert _stored(cursor) == _recomputed(cursor)
+    cursor.execute("SELECT CDR_ID, Prev_CDR_ID FROM CdrFeatures ORDER BY CDR_ID")
+    assert cursor.fetchall() == [("C1", None), ("C2", "C1"), ("C3", None)]
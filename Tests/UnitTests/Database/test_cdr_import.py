@@ -0,0 +1,88 @@
+"""
+Unit tests for DbContext.import_excel_to_database and the post-processing of imported rows.
+"""
+
+import csv
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from backend.data.DbContext import DbContext
+from backend.data.DbPool import close_all_pools
+from backend.data.cdr_reader import CDR_COLUMNS
+from backend.fraude_detectie.Fraude_detectie import FraudDetector
+
+
+def _row(cdr_id):
+    values = {col: f"{col}-{cdr_id}" for col in CDR_COLUMNS}
+    values.update(CDR_ID=cdr_id, Start_datetime="2024-01-01 10:00:00", End_datetime="2024-01-01 11:00:00",
+                  Duration="01:00:00", Volume=10.5, Calculated_Cost=5.25)
+    return values
+
+
+class CdrImportTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db = DbContext()
+        self.db.db_name = os.path.join(self.tmp_dir.name, "import.db")
+        self.db.initialize_database()
+
+    def tearDown(self):
+        self.db.close()
+        close_all_pools()
+        self.tmp_dir.cleanup()
+
+    def _write_csv(self, cdr_ids):
+        path = os.path.join(self.tmp_dir.name, "cdrs.csv")
+        with open(path, "w", newline="") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(CDR_COLUMNS)
+            for cdr_id in cdr_ids:
+                values = _row(cdr_id)
+                writer.writerow([values[col] for col in CDR_COLUMNS])
+        return path
+
+    def test_failed_batch_keeps_earlier_batches_processed(self):
+        # The second batch repeats CDR001 and fails on the primary key
+        path = self._write_csv(["CDR001", "CDR002", "CDR003", "CDR001"])
+
+        imported, error = self.db.import_excel_to_database(path, batch_size=2)
+        self.assertEqual(imported, 2)
+        self.assertIn("the first 2 records were imported", error)
+
+        with self.db:
+            cursor = self.db.connection.cursor()
+            cursor.execute("SELECT CDR_ID FROM CdrFeatures ORDER BY CDR_ID")
+            self.assertEqual(cursor.fetchall(), [("CDR001",), ("CDR002",)])
+            cursor.execute("SELECT Charge_Point_ID FROM ChargePoint ORDER BY Charge_Point_ID")
+            self.assertEqual(cursor.fetchall(), [("Charge_Point_ID-CDR001",), ("Charge_Point_ID-CDR002",)])
+            cursor.execute("SELECT Status FROM FraudRun")
+            self.assertEqual(cursor.fetchall(), [("completed",)])
+
+
+    def _user_stats(self):
+        with self.db:
+            cursor = self.db.connection.cursor()
+            cursor.execute("SELECT Authentication_ID, TransactionCount FROM UserStats ORDER BY Authentication_ID")
+            return cursor.fetchall()
+
+    def test_failed_detection_keeps_imported_rows_in_aggregates(self):
+        path = self._write_csv(["CDR001", "CDR002"])
+
+        with patch.object(FraudDetector, "detect_fraud", side_effect=RuntimeError("detection failed")):
+            self.db.import_excel_to_database(path)
+
+        self.assertEqual(self._user_stats(), [("Authentication_ID-CDR001", 1), ("Authentication_ID-CDR002", 1)])
+
+    def test_insert_cdr_updates_aggregates(self):
+        with self.db:
+            self.db.insert_cdr(_row("CDR001"))
+            self.db.insert_cdr(dict(_row("CDR002"), Authentication_ID="Authentication_ID-CDR001"))
+
+        self.assertEqual(self._user_stats(), [("Authentication_ID-CDR001", 2)])
+
+
+if __name__ == "__main__":
+    unittest.main()
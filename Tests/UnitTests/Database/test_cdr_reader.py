@@ -0,0 +1,84 @@
+"""
+Unit tests for the streaming CDR file reader used by the importer.
+"""
+
+import csv
+import os
+import tempfile
+import unittest
+from datetime import datetime, time
+
+from openpyxl import Workbook
+
+from backend.data.cdr_reader import CDR_COLUMNS, iter_batches, read_cdr_rows
+
+
+def _row(cdr_id, start, end, duration):
+    values = {col: f"{col}-{cdr_id}" for col in CDR_COLUMNS}
+    values.update(CDR_ID=cdr_id, Start_datetime=start, End_datetime=end, Duration=duration,
+                  Volume=10.5, Calculated_Cost=5.25)
+    return values
+
+
+class CdrReaderTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        # Extra column and shuffled order, the reader must pick by name
+        self.header = ["Extra"] + list(reversed(CDR_COLUMNS))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write_xlsx(self, rows):
+        path = os.path.join(self.tmp_dir.name, "cdrs.xlsx")
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(self.header)
+        for row in rows:
+            sheet.append(["x"] + [row[col] for col in reversed(CDR_COLUMNS)])
+        sheet.append([None] * len(self.header))  # blank trailing row
+        workbook.save(path)
+        return path
+
+    def test_xlsx_cells_are_converted(self):
+        path = self._write_xlsx([
+            _row("CDR001", datetime(2024, 1, 1, 10, 0), datetime(2024, 1, 1, 11, 0), time(1, 0)),
+            _row("CDR002", "2024-01-01 11:00:00", "2024-01-01 12:00:00", "01:00:00"),
+        ])
+        rows = list(read_cdr_rows(path))
+
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0][:4], ("CDR001", "2024-01-01 10:00:00", "2024-01-01 11:00:00", "01:00:00"))
+        self.assertEqual(rows[1][:4], ("CDR002", "2024-01-01 11:00:00", "2024-01-01 12:00:00", "01:00:00"))
+        for row in rows:
+            self.assertEqual(row[CDR_COLUMNS.index("Volume")], 10.5)
+            self.assertEqual(row[CDR_COLUMNS.index("Charge_Point_City")], f"Charge_Point_City-{row[0]}")
+
+    def test_csv_matches_column_order(self):
+        path = os.path.join(self.tmp_dir.name, "cdrs.csv")
+        with open(path, "w", newline="") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(self.header)
+            writer.writerow(["x"] + [_row("CDR001", "2024-01-01 10:00:00", "", "00:30:00")[col]
+                                     for col in reversed(CDR_COLUMNS)])
+
+        [row] = list(read_cdr_rows(path))
+        self.assertEqual(row[:4], ("CDR001", "2024-01-01 10:00:00", None, "00:30:00"))
+        self.assertEqual(len(row), len(CDR_COLUMNS))
+
+    def test_missing_columns(self):
+        path = os.path.join(self.tmp_dir.name, "cdrs.csv")
+        with open(path, "w", newline="") as handle:
+            csv.writer(handle).writerow(CDR_COLUMNS[1:])
+
+        with self.assertRaisesRegex(ValueError, r"Missing required columns.*'CDR_ID'"):
+            list(read_cdr_rows(path))
+
+    def test_iter_batches(self):
+        batches = list(iter_batches(iter(range(7)), 3))
+        self.assertEqual(batches, [[0, 1, 2], [3, 4, 5], [6]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import sqlite3
+
+import pytest
+
+from backend.data.charge_points import (
+    FOUND,
+    PENDING,
+    charge_point_coordinates,
+    create_charge_point_table,
+    sync_charge_points,
+)
+
+
+@pytest.fixture
+def cursor():
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE CDR (
+            CDR_ID TEXT PRIMARY KEY, Charge_Point_ID TEXT, Charge_Point_Address TEXT,
+            Charge_Point_ZIP TEXT, Charge_Point_City TEXT, Charge_Point_Country TEXT,
+            Start_epoch INTEGER, import_filename TEXT
+        )
+    """)
+    yield cursor
+    conn.close()
+
+
+def _charge_points(cursor):
+    cursor.execute("SELECT Charge_Point_ID, Address, Latitude, Geocode_Status FROM ChargePoint ORDER BY Charge_Point_ID")
+    return cursor.fetchall()
+
+
+def test_address_comes_from_the_latest_session(cursor):
+    cursor.executemany("INSERT INTO CDR VALUES (?, ?, ?, '1000AA', 'Amsterdam', 'NLD', ?, 'a.csv')", [
+        ("C1", "CP1", "Oud 1", 100),
+        ("C2", "CP1", "Nieuw 1", 200),
+        ("C3", "CP2", "Plein 2", 150),
+    ])
+    create_charge_point_table(cursor)
+    assert _charge_points(cursor) == [("CP1", "Nieuw 1", None, PENDING), ("CP2", "Plein 2", None, PENDING)]
+
+
+def test_sync_keeps_coordinates_unless_the_address_changes(cursor):
+    cursor.execute("INSERT INTO CDR VALUES ('C1', 'CP1', 'Kade 1', '1000AA', 'Amsterdam', 'NLD', 100, 'a.csv')")
+    cursor.execute("INSERT INTO CDR VALUES ('C2', 'CP2', 'Plein 2', '1000AA', 'Amsterdam', 'NLD', 100, 'a.csv')")
+    create_charge_point_table(cursor)
+    cursor.execute(f"UPDATE ChargePoint SET Latitude = 52.0, Longitude = 4.0, Geocode_Status = '{FOUND}'")
+
+    # A later import: same address for CP1, a move for CP2 and a new CP3
+    cursor.executemany("INSERT INTO CDR VALUES (?, ?, ?, '1000AA', 'Amsterdam', 'NLD', 200, 'b.csv')", [
+        ("C3", "CP1", "Kade 1"),
+        ("C4", "CP2", "Dam 3"),
+        ("C5", "CP3", "Weg 4"),
+    ])
+    sync_charge_points(cursor, "import_filename = ?", ("b.csv",))
+
+    assert _charge_points(cursor) == [
+        ("CP1", "Kade 1", 52.0, FOUND),
+        ("CP2", "Dam 3", None, PENDING),
+        ("CP3", "Weg 4", None, PENDING),
+    ]
+    assert charge_point_coordinates(cursor, "CP1") == (52.0, 4.0)
+    assert charge_point_coordinates(cursor, "CP9") == (None, None)
+
+
+def test_coordinates_stored_on_cdr_are_carried_over(cursor):
+    cursor.execute("ALTER TABLE CDR ADD COLUMN Latitude REAL")
+    cursor.execute("ALTER TABLE CDR ADD COLUMN Longitude REAL")
+    cursor.execute("INSERT INTO CDR VALUES ('C1', 'CP1', 'Kade 1', '1000AA', 'Amsterdam', 'NLD', 100, 'a.csv', NULL, NULL)")
+    cursor.execute("INSERT INTO CDR VALUES ('C2', 'CP1', 'Kade 1', '1000AA', 'Amsterdam', 'NLD', 50, 'a.csv', 52.0, 4.0)")
+    create_charge_point_table(cursor)
+    assert _charge_points(cursor) == [("CP1", "Kade 1", 52.0, FOUND)]
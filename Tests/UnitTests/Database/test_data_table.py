@@ -0,0 +1,120 @@
+"""
+Unit tests for the keyset-paginated query behind /api/data-table.
+"""
+
+import os
+import random
+import tempfile
+import unittest
+
+from backend.data.DbContext import DbContext
+from backend.data.DbPool import close_all_pools
+from backend.data.data_table import DataTableFilters, count_cache, fetch_page
+from backend.data.fraud_findings import create_fraud_finding_tables
+
+
+class DataTableTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db = DbContext()
+        self.db.db_name = os.path.join(self.tmp_dir.name, "table.db")
+        self.db.initialize_database()
+        self.db.connect()
+        conn = self.db.connection
+        create_fraud_finding_tables(conn.cursor())
+
+        rng = random.Random(11)
+        for i in range(60):
+            # Repeated and missing sort keys, the seek has to break ties on CDR_ID
+            start = f"2024-01-{rng.randint(1, 5):02d} 10:00:00" if i % 13 else None
+            volume = rng.choice([None, 1.5, 2.0, 7.25])
+            conn.execute(
+                "INSERT INTO CDR (CDR_ID, Start_datetime, Volume, Calculated_Cost, Authentication_ID, "
+                "Charge_Point_ID, Start_epoch) VALUES (?, ?, ?, ?, ?, ?, strftime('%s', ?))",
+                (f"CDR{i:03d}", start, volume, rng.randint(1, 4), f"AUTH{i % 3}", f"CP{i % 4}", start),
+            )
+            if i % 4:
+                conn.execute("INSERT INTO FraudCase (CDR_ID, Reason1, Reason3) VALUES (?, ?, ?)",
+                             (f"CDR{i:03d}", "r1", "r3" if i % 2 else None))
+        conn.commit()
+        self.cursor = conn.cursor()
+        count_cache.clear()
+
+    def tearDown(self):
+        self.db.close()
+        close_all_pools()
+        self.tmp_dir.cleanup()
+
+    def _walk(self, filters, sort_by, sort_dir, page_size=7):
+        ids, after, totals = [], None, set()
+        while True:
+            page = fetch_page(self.cursor, self.db.db_name, filters, sort_by, sort_dir, page_size, after)
+            self.assertLessEqual(len(page["results"]), page_size)
+            ids.extend(row["id"] for row in page["results"])
+            totals.add(page["total"])
+            after = page["nextCursor"]
+            if after is None:
+                return ids, totals
+
+    def _expected(self, where, column, sort_dir):
+        self.cursor.execute(
+            f"SELECT CDR.CDR_ID FROM CDR JOIN FraudCase ON CDR.CDR_ID = FraudCase.CDR_ID {where} "
+            f"ORDER BY CDR.{column} {sort_dir}, CDR.CDR_ID {sort_dir}"
+        )
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def test_pages_cover_every_row_once_for_every_sort(self):
+        for sort_by, column in [("start_datetime", "Start_epoch"), ("volume", "Volume"),
+                                ("calculated_cost", "Calculated_Cost")]:
+            for sort_dir in ("asc", "desc"):
+                ids, totals = self._walk(DataTableFilters(), sort_by, sort_dir)
+                self.assertEqual(ids, self._expected("", column, sort_dir), (sort_by, sort_dir))
+                self.assertEqual(totals, {len(ids)})
+
+    def test_offset_pages_match_the_keyset_order(self):
+        # The fallback for the deprecated page parameter
+        for sort_by, column in [("start_datetime", "Start_epoch"), ("volume", "Volume")]:
+            for sort_dir in ("asc", "desc"):
+                expected = self._expected("", column, sort_dir)
+                for offset in range(0, len(expected) + 7, 7):
+                    page = fetch_page(self.cursor, self.db.db_name, DataTableFilters(), sort_by, sort_dir, 7,
+                                      offset=offset)
+                    self.assertEqual([row["id"] for row in page["results"]], expected[offset:offset + 7],
+                                     (sort_by, sort_dir, offset))
+
+    def test_filters(self):
+        filters = DataTableFilters(authentication_id="AUTH1", charge_point_id="CP3", reason="3",
+                                   start_date="2024-01-02", end_date="2024-01-04 23:59:59")
+        ids, totals = self._walk(filters, "volume", "desc", page_size=2)
+        expected = self._expected(
+            "WHERE Authentication_ID = 'AUTH1' AND Charge_Point_ID = 'CP3' AND Reason3 IS NOT NULL "
+            "AND Start_epoch BETWEEN strftime('%s', '2024-01-02') AND strftime('%s', '2024-01-04 23:59:59')",
+            "Volume", "desc",
+        )
+        self.assertTrue(expected)
+        self.assertEqual(ids, expected)
+        self.assertEqual(totals, {len(expected)})
+
+    def test_invalid_input(self):
+        page = fetch_page(self.cursor, self.db.db_name, DataTableFilters(), "volume", "asc", 5)
+        with self.assertRaises(ValueError):
+            fetch_page(self.cursor, self.db.db_name, DataTableFilters(), "volume", "desc", 5, page["nextCursor"])
+        with self.assertRaises(ValueError):
+            fetch_page(self.cursor, self.db.db_name, DataTableFilters(), "volume", "asc", 5, "not-a-cursor")
+        with self.assertRaises(ValueError):
+            fetch_page(self.cursor, self.db.db_name, DataTableFilters(reason="8"))
+        with self.assertRaises(ValueError):
+            fetch_page(self.cursor, self.db.db_name, DataTableFilters(), sort_by="Volume; DROP TABLE CDR")
+
+    def test_count_is_cached_until_fraud_cases_change(self):
+        total = fetch_page(self.cursor, self.db.db_name, DataTableFilters())["total"]
+        # Another filter has its own entry
+        self.cursor.execute("UPDATE FraudCase SET Reason1 = NULL WHERE CDR_ID = 'CDR001'")
+        self.assertEqual(fetch_page(self.cursor, self.db.db_name, DataTableFilters(reason="1"))["total"], total - 1)
+        self.cursor.execute("INSERT INTO FraudCase (CDR_ID, Reason2) VALUES ('CDR000', 'r2')")
+        self.assertEqual(fetch_page(self.cursor, self.db.db_name, DataTableFilters())["total"], total + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
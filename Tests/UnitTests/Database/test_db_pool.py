@@ -0,0 +1,100 @@
+"""
+Unit tests for the shared SQLite connection pool.
+"""
+
+import os
+import tempfile
+import threading
+import sqlite3
+import unittest
+
+from backend.data.DbContext import DbContext
+from backend.data.DbPool import ConnectionPool, PoolTimeout, close_all_pools, get_pool
+
+
+class ConnectionPoolTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.pool = ConnectionPool(os.path.join(self.tmp_dir.name, "pool.db"), max_size=2, timeout=0.2)
+
+    def tearDown(self):
+        self.pool.close_all()
+        self.tmp_dir.cleanup()
+
+    def test_connections_are_reused_in_wal_mode(self):
+        with self.pool.connection() as conn:
+            first = conn
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        with self.pool.connection() as conn:
+            self.assertIs(conn, first)
+
+        stats = self.pool.stats()
+        self.assertEqual(stats["open_connections"], 1)
+        self.assertEqual(stats["acquisitions"], 2)
+        self.assertEqual(stats["in_use"], 0)
+
+    def test_release_rolls_back_uncommitted_work(self):
+        with self.pool.connection() as conn:
+            conn.execute("CREATE TABLE T (x INTEGER)")
+            conn.commit()
+            conn.execute("INSERT INTO T VALUES (1)")
+        with self.pool.connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM T").fetchone()[0], 0)
+
+    def test_exhausted_pool_times_out(self):
+        first = self.pool.acquire()
+        second = self.pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            self.pool.acquire()
+        self.assertEqual(self.pool.stats()["timeouts"], 1)
+
+        # A waiting borrower gets the connection as soon as it is released
+        borrowed = []
+        waiter = threading.Thread(target=lambda: borrowed.append(self.pool.acquire()))
+        waiter.start()
+        self.pool.release(first)
+        waiter.join()
+        self.assertIs(borrowed[0], first)
+        self.pool.release(second)
+        self.pool.release(borrowed[0])
+
+
+
+class DbContextPoolTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "context.db")
+        self.pool = get_pool(self.db_path)
+        self.pool.timeout = 0.2
+
+    def tearDown(self):
+        close_all_pools()
+        self.tmp_dir.cleanup()
+
+    def test_failing_queries_give_their_connection_back(self):
+        # No UserStats table yet: every call fails after borrowing a connection
+        for _ in range(self.pool.max_size * 3):
+            db = DbContext()
+            db.db_name = self.db_path
+            with self.assertRaises(sqlite3.OperationalError):
+                db.get_user_stats()
+            self.assertIsNone(db.connection)
+
+        stats = self.pool.stats()
+        self.assertEqual(stats["in_use"], 0)
+        self.assertEqual(stats["timeouts"], 0)
+
+    def test_with_block_releases_on_exception(self):
+        db = DbContext()
+        db.db_name = self.db_path
+        for _ in range(self.pool.max_size + 1):
+            with self.assertRaises(RuntimeError):
+                with db:
+                    raise RuntimeError("request failed")
+        self.assertEqual(self.pool.stats()["in_use"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
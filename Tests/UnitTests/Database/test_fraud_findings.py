@@ -0,0 +1,76 @@
+import sqlite3
+
+import pytest
+
+from backend.data.fraud_findings import (
+    HIGH,
+    create_fraud_finding_tables,
+    drop_fraud_findings,
+    fraud_findings_exist,
+    rule_id,
+)
+
+
+@pytest.fixture
+def cursor():
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    create_fraud_finding_tables(cursor)
+    yield cursor
+    conn.close()
+
+
+def _findings(cursor):
+    cursor.execute("SELECT CDR_ID, Rule_ID, Reason FROM FraudFinding ORDER BY CDR_ID, Rule_ID")
+    return cursor.fetchall()
+
+
+def test_fraud_case_view_pivots_findings(cursor):
+    cursor.executemany(
+        "INSERT INTO FraudFinding (CDR_ID, Rule_ID, Severity, Evidence, Reason) VALUES (?, ?, ?, ?, ?)",
+        [("1", 2, 2, 3.5, "Unusual cost per kWh (ratio: 3.50)"), ("1", 7, 3, 80.0, "Unrealistic movement"), ("2", 4, 3, None, "Overlapping")],
+    )
+    cursor.execute("SELECT CDR_ID, Reason1, Reason2, Reason4, Reason7 FROM FraudCase ORDER BY CDR_ID")
+    assert cursor.fetchall() == [
+        ("1", None, "Unusual cost per kWh (ratio: 3.50)", None, "Unrealistic movement"),
+        ("2", None, None, "Overlapping", None),
+    ]
+
+
+def test_writes_through_the_view(cursor):
+    cursor.execute("INSERT INTO FraudCase (CDR_ID, Reason1, Reason4) VALUES ('1', 'a', 'd')")
+    with pytest.raises(sqlite3.IntegrityError):
+        cursor.execute("INSERT INTO FraudCase (CDR_ID, Reason2) VALUES ('1', 'b')")
+
+    cursor.execute("UPDATE FraudCase SET Reason1 = NULL, Reason3 = 'c' WHERE CDR_ID = '1'")
+    assert _findings(cursor) == [("1", 3, "c"), ("1", 4, "d")]
+    cursor.execute("SELECT Severity FROM FraudFinding WHERE Rule_ID = 4")
+    assert cursor.fetchone() == (HIGH,)
+
+    cursor.execute("DELETE FROM FraudCase WHERE CDR_ID = '1'")
+    assert _findings(cursor) == []
+
+
+def test_legacy_table_is_migrated():
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE FraudCase (CDR_ID TEXT NOT NULL, Reason1 TEXT, Reason2 TEXT, Reason5 TEXT)")
+    cursor.executemany(
+        "INSERT INTO FraudCase VALUES (?, ?, ?, ?)",
+        [("1", "a", None, None), ("1", None, "b", ""), ("2", None, None, "e")],
+    )
+    create_fraud_finding_tables(cursor)
+    assert _findings(cursor) == [("1", 1, "a"), ("1", 2, "b"), ("2", 5, "e")]
+    cursor.execute("SELECT type FROM sqlite_master WHERE name = 'FraudCase'")
+    assert cursor.fetchone() == ("view",)
+
+    drop_fraud_findings(cursor)
+    assert not fraud_findings_exist(cursor)
+    conn.close()
+
+
+def test_rule_id():
+    assert rule_id("Reason3") == 3 and rule_id("7") == 7
+    for reason in ("8", "Reason0", "Reason1; DROP TABLE CDR"):
+        with pytest.raises(ValueError):
+            rule_id(reason)
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from backend.fraude_detectie.columnar import (
+    duration_minutes_series,
+    haversine_km,
+    impossible_travel_mask,
+    to_float_series,
+)
+
+
+def test_to_float_series_accepts_comma_decimals():
+    values = pd.Series(["25", "12,5", " 3.25 ", "abc", None, 7])
+    result = to_float_series(values).tolist()
+    assert result[:3] == [25.0, 12.5, 3.25]
+    assert pd.isna(result[3]) and pd.isna(result[4])
+    assert result[5] == 7.0
+
+
+def test_duration_minutes_series_parses_hh_mm_ss():
+    values = pd.Series(["00:30:00", "01:30:30", "60", "bad", None])
+    result = duration_minutes_series(values).tolist()
+    assert result[0] == 30.0
+    assert result[1] == 90.5
+    assert all(pd.isna(value) for value in result[2:])
+
+
+def test_haversine_km():
+    # Amsterdam to Rotterdam, and a missing coordinate
+    distance = haversine_km([52.37, 52.37], [4.90, None], [51.92, 51.92], [4.48, 4.48])
+    assert 57 < distance[0] < 58
+    assert np.isnan(distance[1])
+
+
+def test_impossible_travel_mask_compares_consecutive_sessions_per_user():
+    group = np.array(["A", "A", "A", "B", "B", "C"], dtype=object)
+    start = np.array([0, 3600, 7200, 3000, 3300, 0])
+    end = np.array([1800, 4000, 7500, 3100, 3400, 60])
+    # Amsterdam, Rotterdam, Rotterdam, Rotterdam, unknown, Amsterdam
+    latitude = np.array([52.37, 51.92, 51.92, 51.92, np.nan, 52.37])
+    longitude = np.array([4.90, 4.48, 4.48, 4.48, np.nan, 4.90])
+
+    mask, distance, gap = impossible_travel_mask(group, start, end, latitude, longitude, 10, 60)
+
+    # A: 57 km in 30 min, then 0 km; B's second point has no coordinates; C follows B
+    assert mask.tolist() == [False, True, False, False, False, False]
+    assert gap[1] == 30.0
+    assert int(distance[1]) == 57
@@ -0,0 +1,103 @@
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+from backend.fraude_detectie.Fraude_detectie import FraudDetector
+
+
+@pytest.fixture
+def db_path():
+    db_fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(db_fd)
+    yield path
+    os.remove(path)
+
+
+def test_bulk_writer_upserts_per_reason_column(db_path):
+    detector = FraudDetector(db_path)
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    detector._create_fraud_table(cursor)
+
+    detector._bulk_update_fraud_table(cursor, [
+        ("1", "Reason1", "High volume in short duration"),
+        ("2", "Reason2", "Unusual cost per kWh (ratio: 2.00)"),
+        ("1", "Reason2", "Unusual cost per kWh (ratio: 3.00)"),
+    ])
+    detector._bulk_update_fraud_table(cursor, [
+        ("2", "Reason2", "Unusual cost per kWh (ratio: 4.00)"),
+        ("3", "Reason6", "Data integrity violation: Missing Charge_Point_ID"),
+    ])
+
+    cursor.execute("SELECT CDR_ID, Reason1, Reason2, Reason6 FROM FraudCase ORDER BY CDR_ID")
+    rows = cursor.fetchall()
+    conn.close()
+
+    assert rows == [
+        ("1", "High volume in short duration", "Unusual cost per kWh (ratio: 3.00)", None),
+        ("2", None, "Unusual cost per kWh (ratio: 4.00)", None),
+        ("3", None, None, "Data integrity violation: Missing Charge_Point_ID"),
+    ]
+
+
+def test_bulk_writer_rejects_unknown_column(db_path):
+    detector = FraudDetector(db_path)
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    detector._create_fraud_table(cursor)
+    with pytest.raises(ValueError):
+        detector._bulk_update_fraud_table(cursor, [("1", "Reason9; DROP TABLE CDR", "x")])
+    conn.close()
+
+
+def test_legacy_duplicates_are_merged(db_path):
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE FraudCase (
+            CDR_ID TEXT NOT NULL,
+            Reason1 TEXT, Reason2 TEXT, Reason3 TEXT, Reason4 TEXT,
+            Reason5 TEXT, Reason6 TEXT, Reason7 TEXT
+        )
+    """)
+    cursor.executemany(
+        "INSERT INTO FraudCase (CDR_ID, Reason1, Reason2) VALUES (?, ?, ?)",
+        [("1", "High volume in short duration", None), ("1", None, "Unusual"), ("2", None, "Unusual")],
+    )
+    conn.commit()
+
+    FraudDetector(db_path)._create_fraud_table(cursor)
+
+    cursor.execute("SELECT CDR_ID, Reason1, Reason2 FROM FraudCase ORDER BY CDR_ID")
+    assert cursor.fetchall() == [
+        ("1", "High volume in short duration", "Unusual"),
+        ("2", None, "Unusual"),
+    ]
+    with pytest.raises(sqlite3.IntegrityError):
+        cursor.execute("INSERT INTO FraudCase (CDR_ID) VALUES ('1')")
+    conn.close()
+
+
+def test_findings_carry_rule_evidence_and_run(db_path):
+    detector = FraudDetector(db_path)
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    detector._create_fraud_table(cursor)
+
+    detector.run_id = 1
+    detector._bulk_update_fraud_table(cursor, [
+        ("1", "Reason2", "Unusual cost per kWh (ratio: 3.00)", 3.0),
+        ("2", "Reason4", "Overlapping sessions"),
+    ])
+    # An unchanged finding keeps the run that wrote it
+    detector.run_id = 2
+    detector._bulk_update_fraud_table(cursor, [
+        ("1", "Reason2", "Unusual cost per kWh (ratio: 4.00)", 4.0),
+        ("2", "Reason4", "Overlapping sessions"),
+    ])
+
+    cursor.execute("SELECT CDR_ID, Rule_ID, Severity, Evidence, Run_ID FROM FraudFinding ORDER BY CDR_ID")
+    assert cursor.fetchall() == [("1", 2, 2, 4.0, 2), ("2", 4, 3, None, 1)]
+    conn.close()
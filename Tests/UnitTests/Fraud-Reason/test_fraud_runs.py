@@ -0,0 +1,50 @@
+import os
+import random
+import sqlite3
+
+import pytest
+
+from backend.fraude_detectie.Fraude_detectie import RULES, FraudDetector
+from backend.fraude_detectie.fraud_runs import COMPLETED, FAILED, list_runs
+
+
+@pytest.fixture
+def db_path(tmp_dir):
+    return os.path.join(tmp_dir, "runs.db")
+
+
+def test_run_and_rule_statistics_are_recorded(db_path, insert_cdrs):
+    insert_cdrs(db_path, None, 0, 200, random.Random(3))
+    detector = FraudDetector(db_path)
+    detector.detect_fraud()
+
+    conn = sqlite3.connect(db_path)
+    runs = list_runs(conn.cursor())
+    findings = conn.execute("SELECT COUNT(*) FROM FraudFinding").fetchone()[0]
+    stamped = conn.execute("SELECT DISTINCT Run_ID FROM FraudFinding").fetchall()
+    conn.close()
+
+    assert len(runs) == 1
+    run = runs[0]
+    assert run["Status"] == COMPLETED and run["Mode"] == "full" and run["Error"] is None
+    assert run["Thresholds"]["MAX_VOLUME_KWH"] == 22
+    assert stamped == [(run["Run_ID"],)]
+    assert {rule["Rule"] for rule in run["Rules"]} == set(RULES)
+    assert sum(rule["Findings"] for rule in run["Rules"]) >= findings > 0
+    volume_rule = next(rule for rule in run["Rules"] if rule["Rule"] == "detect_high_volume_short_duration")
+    # The rule reads only the CdrFeatures rows over its thresholds
+    assert volume_rule["Rows_Read"] == volume_rule["Findings"] > 0 and volume_rule["Statements"] > 0
+    assert detector.rule_timings.keys() == set(RULES)
+
+
+def test_failed_run_is_recorded(db_path):
+    # No CDR table, so computing the CDR features fails before the first rule
+    result = FraudDetector(db_path).detect_fraud()
+    assert result.empty
+
+    conn = sqlite3.connect(db_path)
+    run = list_runs(conn.cursor())[0]
+    conn.close()
+    assert run["Status"] == FAILED
+    assert "no such table: CDR" in run["Error"]
+    assert run["Rules"] == []
@@ -0,0 +1,122 @@
+import os
+import random
+import shutil
+import sqlite3
+
+from backend.fraude_detectie.Fraude_detectie import RULES, FraudDetector
+
+
+def _fraud_cases(db_path):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT * FROM FraudCase ORDER BY CDR_ID").fetchall()
+    conn.close()
+    return rows
+
+
+def test_incremental_run_matches_full_run(tmp_dir, insert_cdrs):
+    rng = random.Random(5)
+    incremental_db = os.path.join(tmp_dir, "incremental.db")
+    insert_cdrs(incremental_db, "history.xlsx", 0, 300, rng)
+    FraudDetector(incremental_db).detect_fraud()
+
+    # Second import, detected incrementally
+    insert_cdrs(incremental_db, "new.xlsx", 300, 60, rng)
+    full_db = os.path.join(tmp_dir, "full.db")
+    shutil.copyfile(incremental_db, full_db)
+    new_cases = FraudDetector(incremental_db).detect_fraud(import_filename="new.xlsx")
+
+    # Same import followed by a full run, as imports used to do
+    FraudDetector(full_db).detect_fraud()
+
+    assert _fraud_cases(incremental_db) == _fraud_cases(full_db)
+    assert not new_cases.empty
+    assert set(new_cases["CDR_ID"]) <= {f"CDR{i:04d}" for i in range(300, 360)}
+
+
+def test_incremental_run_leaves_other_rows_alone(tmp_dir, insert_cdrs):
+    db_path = os.path.join(tmp_dir, "scoped.db")
+    rng = random.Random(11)
+    insert_cdrs(db_path, "history.xlsx", 0, 100, rng)
+    insert_cdrs(db_path, "new.xlsx", 100, 5, rng)
+
+    # History was never evaluated, an incremental run must not touch it
+    FraudDetector(db_path).detect_fraud(import_filename="new.xlsx")
+    conn = sqlite3.connect(db_path)
+    history_cases = conn.execute("""
+        SELECT COUNT(*) FROM FraudCase f JOIN CDR c ON c.CDR_ID = f.CDR_ID
+        WHERE c.import_filename = 'history.xlsx'
+          AND (f.Reason1 IS NOT NULL OR f.Reason2 IS NOT NULL OR f.Reason6 IS NOT NULL)
+    """).fetchone()[0]
+    conn.close()
+    assert history_cases == 0
+
+
+def test_impossible_travel_uses_charge_point_coordinates(tmp_dir, insert_cdrs):
+    rng = random.Random(11)
+    incremental_db = os.path.join(tmp_dir, "incremental.db")
+    insert_cdrs(incremental_db, "history.xlsx", 0, 300, rng)
+    conn = sqlite3.connect(incremental_db)
+    conn.execute("CREATE TABLE ChargePoint (Charge_Point_ID TEXT PRIMARY KEY, Latitude REAL, Longitude REAL)")
+    # Amsterdam, Rotterdam and one without coordinates
+    conn.executemany("INSERT INTO ChargePoint VALUES (?, ?, ?)", [("CP1", 52.37, 4.90), ("CP2", 51.92, 4.48), ("CP3", None, None)])
+    conn.commit()
+    conn.close()
+    FraudDetector(incremental_db).detect_fraud()
+
+    insert_cdrs(incremental_db, "new.xlsx", 300, 60, rng)
+    full_db = os.path.join(tmp_dir, "full.db")
+    shutil.copyfile(incremental_db, full_db)
+    FraudDetector(incremental_db).detect_fraud(import_filename="new.xlsx")
+    FraudDetector(full_db).detect_fraud()
+
+    assert _fraud_cases(incremental_db) == _fraud_cases(full_db)
+    conn = sqlite3.connect(full_db)
+    reasons = [row[0] for row in conn.execute("SELECT Reason7 FROM FraudCase WHERE Reason7 IS NOT NULL")]
+    conn.close()
+    assert reasons and all(reason.startswith("Unrealistic movement: 57.") for reason in reasons)
+
+
+def test_parallel_run_matches_serial_run(tmp_dir, insert_cdrs):
+    rng = random.Random(9)
+    serial_db = os.path.join(tmp_dir, "serial.db")
+    insert_cdrs(serial_db, "history.xlsx", 0, 300, rng)
+    parallel_db = os.path.join(tmp_dir, "parallel.db")
+    shutil.copyfile(serial_db, parallel_db)
+
+    FraudDetector(serial_db).detect_fraud()
+    detector = FraudDetector(parallel_db)
+    detector.detect_fraud(parallel=True, max_workers=2)
+
+    assert _fraud_cases(serial_db)
+    assert _fraud_cases(parallel_db) == _fraud_cases(serial_db)
+    assert set(detector.rule_timings) == set(RULES)
+    conn = sqlite3.connect(parallel_db)
+    assert conn.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    conn.close()
+
+
+def test_parallel_run_keeps_other_writers_out_until_the_merge(tmp_dir, insert_cdrs, monkeypatch):
+    db_path = os.path.join(tmp_dir, "parallel.db")
+    insert_cdrs(db_path, "history.xlsx", 0, 100, random.Random(3))
+    run_parallel_rules = FraudDetector._run_parallel_rules
+    blocked = []
+
+    def checked(self, cursor, workers):
+        # Another writer, e.g. an import job, while the workers take their snapshots
+        other = sqlite3.connect(db_path, timeout=0)
+        try:
+            other.execute("INSERT INTO CDR (CDR_ID) VALUES ('LATE')")
+            other.commit()
+        except sqlite3.OperationalError as e:
+            blocked.append(str(e))
+        finally:
+            other.close()
+        run_parallel_rules(self, cursor, workers)
+
+    monkeypatch.setattr(FraudDetector, "_run_parallel_rules", checked)
+    FraudDetector(db_path).detect_fraud(parallel=True, max_workers=2)
+
+    assert blocked == ["database is locked"]
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM FraudRun WHERE Status = 'completed'").fetchone() == (1,)
+    conn.close()
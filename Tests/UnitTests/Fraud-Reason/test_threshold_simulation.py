@@ -0,0 +1,125 @@
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+
+import pytest
+
+from Tests.synthetic_cdrs import insert_cdr_rows
+from backend.data.fraud_findings import drop_fraud_findings
+from backend.fraude_detectie.Fraude_detectie import FraudDetector
+from backend.fraude_detectie.threshold_simulation import feature_cache, simulate_thresholds
+
+DEFAULTS = {
+    "MAX_VOLUME_KWH": 22,
+    "MAX_DURATION_MINUTES": 60,
+    "MIN_COST_THRESHOLD": 20,
+    "MIN_TIME_GAP_MINUTES": 30,
+    "THRESHOLD": 3,
+    "MIN_DISTANCE_KM": 10,
+    "MIN_TRAVEL_TIME_MINUTES": 15,
+}
+
+
+@pytest.fixture
+def tmp_dir():
+    path = tempfile.mkdtemp()
+    feature_cache.clear()
+    yield path
+    feature_cache.clear()
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def _build_db(db_path, count=400, seed=11):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    rows = []
+    for i in range(count):
+        day, hour, minute = rng.randint(1, 4), rng.randint(0, 22), rng.randint(0, 59)
+        minutes = rng.randint(5, 90)
+        start = f"2024-01-0{day} {hour:02d}:{minute:02d}:00"
+        end_minute = hour * 60 + minute + minutes
+        end = f"2024-01-0{day} {min(end_minute // 60, 23):02d}:{end_minute % 60:02d}:00"
+        rows.append((
+            f"CDR{i:04d}", rng.choice(["A1", "A2", "A3", " A4", None]), rng.choice(["CP1", "CP2", "CP3", "CP4"]), None,
+            rng.choice([f"{rng.uniform(1, 40):.1f}".replace(".", ","), "0", ""]),
+            f"00:{minutes % 60:02d}:00", rng.choice([1.0, 25.0, rng.uniform(1, 40)]), start, end, None,
+        ))
+    insert_cdr_rows(conn, rows)
+    conn.execute("CREATE TABLE ChargePoint (Charge_Point_ID TEXT PRIMARY KEY, Latitude REAL, Longitude REAL)")
+    conn.executemany(
+        "INSERT INTO ChargePoint VALUES (?, ?, ?)",
+        [("CP1", 52.37, 4.89), ("CP2", 51.92, 4.48), ("CP3", 52.09, 5.12), ("CP4", None, None)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def _detected_counts(db_path, thresholds):
+    FraudDetector(db_path, thresholds=thresholds).detect_fraud()
+    conn = sqlite3.connect(db_path)
+    counts = dict(conn.execute("SELECT Rule_ID, COUNT(*) FROM FraudFinding GROUP BY Rule_ID").fetchall())
+    flagged = conn.execute("SELECT COUNT(DISTINCT CDR_ID) FROM FraudFinding").fetchone()[0]
+    conn.close()
+    return counts, flagged
+
+
+@pytest.mark.parametrize("changes", [
+    {},
+    {"MAX_VOLUME_KWH": 10, "MAX_DURATION_MINUTES": 45, "MIN_TIME_GAP_MINUTES": 120, "THRESHOLD": 2},
+    {"MIN_COST_THRESHOLD": 5, "MIN_DISTANCE_KM": 30, "MIN_TRAVEL_TIME_MINUTES": 600},
+])
+def test_simulation_matches_a_detection_run(tmp_dir, changes):
+    thresholds = {**DEFAULTS, **changes}
+    db_path = os.path.join(tmp_dir, "simulate.db")
+    _build_db(db_path)
+    detect_path = os.path.join(tmp_dir, "detect.db")
+    shutil.copyfile(db_path, detect_path)
+
+    simulated = simulate_thresholds(db_path, thresholds)
+    counts, flagged = _detected_counts(detect_path, thresholds)
+
+    assert {rule["ruleId"]: rule["flagged"] for rule in simulated["rules"]} == {rule: counts.get(rule, 0) for rule in range(1, 8)}
+    assert simulated["flaggedCdrs"] == flagged
+    assert simulated["totalCdrs"] == 400 and not simulated["cachedFeatures"]
+    assert all(rule["current"] == 0 for rule in simulated["rules"])
+
+
+def test_simulation_after_a_run_reads_the_stored_features(tmp_dir):
+    db_path = os.path.join(tmp_dir, "simulate.db")
+    _build_db(db_path)
+    FraudDetector(db_path, thresholds=DEFAULTS).detect_fraud()
+
+    thresholds = {**DEFAULTS, "MAX_VOLUME_KWH": 10, "MIN_DISTANCE_KM": 30}
+    simulated = simulate_thresholds(db_path, thresholds)
+    assert simulated["rules"][3]["current"] > 0
+
+    # What saving the thresholds does
+    conn = sqlite3.connect(db_path)
+    drop_fraud_findings(conn.cursor())
+    conn.commit()
+    conn.close()
+    counts, flagged = _detected_counts(db_path, thresholds)
+    assert {rule["ruleId"]: rule["flagged"] for rule in simulated["rules"]} == {rule: counts.get(rule, 0) for rule in range(1, 8)}
+    assert simulated["flaggedCdrs"] == flagged
+
+
+def test_simulation_writes_nothing_and_reuses_features(tmp_dir):
+    db_path = os.path.join(tmp_dir, "simulate.db")
+    _build_db(db_path)
+    before = open(db_path, "rb").read()
+
+    first = simulate_thresholds(db_path, DEFAULTS)
+    second = simulate_thresholds(db_path, {**DEFAULTS, "MAX_VOLUME_KWH": 5})
+    assert open(db_path, "rb").read() == before
+    assert second["cachedFeatures"]
+    assert second["rules"][0]["flagged"] >= first["rules"][0]["flagged"]
+
+    # New CDRs invalidate the cached features
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO CDR (CDR_ID, Authentication_ID, Charge_Point_ID) VALUES ('NEW', 'A1', 'CP1')")
+    conn.commit()
+    conn.close()
+    third = simulate_thresholds(db_path, DEFAULTS)
+    assert not third["cachedFeatures"] and third["totalCdrs"] == 401
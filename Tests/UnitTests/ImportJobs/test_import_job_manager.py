@@ -0,0 +1,96 @@
+"""
+Unit tests for the background import job queue.
+"""
+
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+
+from backend.data.DbPool import close_all_pools
+from backend.import_jobs.import_job_manager import ImportJobManager
+
+
+class ImportJobManagerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, "jobs.db")
+        self.release = threading.Event()
+        self.seen_phases = []
+
+    def tearDown(self):
+        close_all_pools()
+        self.tmp_dir.cleanup()
+
+    def _manager(self, import_file):
+        manager = ImportJobManager(self.db_path, import_file)
+        manager.create_jobs_table()
+        self.addCleanup(manager.shutdown)
+        return manager
+
+    def test_job_reports_progress_and_result(self):
+        manager_ref = {}
+
+        def import_file(file_path, progress):
+            progress("inserting", 5000)
+            self.seen_phases.append(manager_ref["manager"].get_job(manager_ref["job_id"]))
+            self.release.wait(5)
+            progress("detecting", 7500)
+            return True, "Successfully imported 7500 records", 7500
+
+        manager = self._manager(import_file)
+        manager_ref["manager"] = manager
+        upload_dir = tempfile.mkdtemp(dir=self.tmp_dir.name)
+        job_id = manager_ref["job_id"] = manager.submit(os.path.join(upload_dir, "cdrs.csv"), cleanup_dir=upload_dir)
+        self.assertIn(manager.get_job(job_id)["phase"], ("queued", "parsing", "inserting"))
+
+        self.release.set()
+        manager.shutdown(wait=True)
+
+        [running] = self.seen_phases
+        self.assertEqual((running["phase"], running["status"], running["rowsDone"]), ("inserting", "running", 5000))
+
+        job = manager.get_job(job_id)
+        self.assertEqual(job["phase"], "done")
+        self.assertEqual(job["recordsImported"], 7500)
+        self.assertEqual(job["filename"], "cdrs.csv")
+        self.assertIsNone(job["error"])
+        self.assertFalse(os.path.exists(upload_dir))
+
+    def test_failures_are_recorded(self):
+        def import_file(file_path, progress):
+            if file_path.endswith("bad.xlsx"):
+                return False, "Error importing file: Missing required columns", None
+            raise RuntimeError("disk full")
+
+        manager = self._manager(import_file)
+        bad = manager.submit("bad.xlsx")
+        broken = manager.submit("broken.xlsx")
+        manager.shutdown(wait=True)
+
+        self.assertEqual(manager.get_job(bad)["error"], "Error importing file: Missing required columns")
+        self.assertEqual(manager.get_job(broken)["error"], "disk full")
+        self.assertEqual([job["phase"] for job in manager.list_jobs()], ["failed", "failed"])
+        self.assertIsNone(manager.get_job("unknown"))
+
+    def test_only_jobs_of_stopped_processes_fail_after_restart(self):
+        manager = self._manager(lambda file_path, progress: self.release.wait(5))
+        running = manager.submit("slow.xlsx")
+        orphaned = manager.submit("orphaned.xlsx")
+        stopped = subprocess.Popen([sys.executable, "-c", "pass"])
+        stopped.wait()
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("UPDATE ImportJob SET Process_ID = ? WHERE Job_ID = ?", (stopped.pid, orphaned))
+
+        # Another worker starts while this one is still importing
+        ImportJobManager(self.db_path, None).create_jobs_table()
+        self.assertEqual(manager.get_job(orphaned)["error"], "Interrupted by a server restart")
+        self.assertIsNone(manager.get_job(running)["error"])
+        self.release.set()
+
+if __name__ == "__main__":
+    unittest.main()
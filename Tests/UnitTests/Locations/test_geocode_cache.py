@@ -0,0 +1,95 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from backend.fraud_locations.Fraude_Locaties import FraudLocationManager
+from backend.fraud_locations.geocode_cache import GeocodeCache, normalize_address_key, prewarm
+
+
+@pytest.fixture
+def db_path():
+    path = tempfile.mkdtemp()
+    db_file = os.path.join(path, "geocode.db")
+    conn = sqlite3.connect(db_file)
+    conn.execute("""
+        CREATE TABLE CDR (
+            CDR_ID TEXT PRIMARY KEY, Charge_Point_ID TEXT, Charge_Point_Address TEXT,
+            Charge_Point_ZIP TEXT, Charge_Point_City TEXT, Charge_Point_Country TEXT
+        )
+    """)
+    conn.commit()
+    conn.close()
+    yield db_file
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def no_rate_limit():
+    with patch("backend.fraud_locations.geocode_pipeline.rate_limiter", return_value=None):
+        yield
+
+
+def _manager(db_path, result):
+    manager = FraudLocationManager(db_path)
+    manager.geolocator = MagicMock()
+    manager.geolocator.geocode.return_value = result
+    return manager
+
+
+def test_repeat_lookups_hit_the_cache(db_path):
+    manager = _manager(db_path, MagicMock(latitude=52.0, longitude=4.0))
+    hits_before = manager.geocode_cache.hits
+    first = manager.geocode_address("Teststraat 1", "1234AB", "Den Haag", "NLD")
+    # Another manager and different spacing/case still map to the same key
+    again = _manager(db_path, None)
+    second = again.geocode_address("teststraat  1 ", "1234AB", "den haag", "NLD")
+
+    assert first == second == {"latitude": 52.0, "longitude": 4.0}
+    assert manager.geolocator.geocode.call_count == 1
+    again.geolocator.geocode.assert_not_called()
+    assert manager.geocode_cache.hits - hits_before == 1
+
+
+def test_failed_lookups_are_cached_until_the_ttl_passes(db_path):
+    manager = _manager(db_path, None)
+    assert manager.geocode_address("Nergens 1", "0000XX", "Nowhere", "NLD") is None
+    assert manager.geocode_address("Nergens 1", "0000XX", "Nowhere", "NLD") is None
+    assert manager.geolocator.geocode.call_count == 1
+
+    # With a zero TTL the failure is retried
+    manager.geocode_cache = GeocodeCache(db_path, negative_ttl=0)
+    manager.geolocator.geocode.return_value = MagicMock(latitude=1.0, longitude=2.0)
+    with patch("backend.fraud_locations.geocode_cache.time.time", return_value=2e10):
+        assert manager.geocode_address("Nergens 1", "0000XX", "Nowhere", "NLD") == {"latitude": 1.0, "longitude": 2.0}
+    assert manager.geolocator.geocode.call_count == 2
+
+
+def test_errors_are_not_cached(db_path):
+    manager = _manager(db_path, None)
+    manager.geolocator.geocode.side_effect = Exception("connection reset")
+    assert manager.geocode_address("Teststraat 2", "1234AB", "Den Haag", "NLD") is None
+    assert manager.geocode_cache.get(manager.address_key("Teststraat 2", "1234AB", "Den Haag", "NLD")) == (False, None)
+
+
+def test_prewarm_seeds_known_coordinates(db_path):
+    manager = _manager(db_path, MagicMock(latitude=50.0, longitude=5.0))
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany("INSERT INTO ChargePoint (Charge_Point_ID, Address, ZIP, City, Country, Latitude, Longitude) VALUES (?, ?, ?, ?, ?, ?, ?)", [
+            ("CP1", "Kade 1", "1000AA", "Amsterdam", "NLD", 52.37, 4.89),
+            ("CP2", "Plein 2", "2000BB", "Rotterdam", "NLD", None, None),
+            ("CP3", "Plein 2", "2000BB", "Rotterdam", "NLD", None, None),
+        ])
+
+    assert prewarm(manager) == {"addresses": 2, "seeded": 1, "cached": 0, "geocoded": 1}
+    assert prewarm(manager) == {"addresses": 2, "seeded": 1, "cached": 1, "geocoded": 0}
+    assert manager.geolocator.geocode.call_count == 1
+    assert manager.geocode_address("Kade 1", "1000AA", "Amsterdam", "NLD") == {"latitude": 52.37, "longitude": 4.89}
+    assert manager.geocode_cache.stats()["entries"] == 2
+
+
+def test_normalize_address_key():
+    assert normalize_address_key(" Kade 1 ,  1000AA  Amsterdam,, Netherlands ") == "kade 1, 1000aa amsterdam, netherlands"
@@ -0,0 +1,153 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from geopy.exc import GeocoderTimedOut
+
+from backend.data.charge_points import FAILED, FOUND, NOT_FOUND, sync_charge_points
+from backend.fraud_locations.Fraude_Locaties import FraudLocationManager
+from backend.fraud_locations.geocode_pipeline import (
+    GeocodePipeline,
+    TokenBucket,
+    geocode_with_retries,
+    latest_progress,
+)
+from backend.fraud_locations.geocoders import GeocodeQuery, GeocoderProvider
+
+
+class FakeProvider(GeocoderProvider):
+    """Coordinates for every city but "Nowhere", optionally timing out first."""
+    name = "fake"
+
+    def __init__(self, timeouts=0, delay=0.0):
+        self.timeouts = timeouts
+        self.delay = delay
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def geocode(self, query):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            timeout = self.timeouts > 0
+            self.timeouts -= 1
+        try:
+            time.sleep(self.delay)
+            if timeout:
+                raise GeocoderTimedOut("timed out")
+            if query.city == "Nowhere":
+                return None
+            return {"latitude": float(len(query.city)), "longitude": 4.0}
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+@pytest.fixture
+def db_path():
+    path = tempfile.mkdtemp()
+    db_file = os.path.join(path, "pipeline.db")
+    conn = sqlite3.connect(db_file)
+    conn.execute("""
+        CREATE TABLE CDR (
+            CDR_ID TEXT PRIMARY KEY, Charge_Point_ID TEXT, Charge_Point_Address TEXT,
+            Charge_Point_ZIP TEXT, Charge_Point_City TEXT, Charge_Point_Country TEXT
+        )
+    """)
+    conn.commit()
+    conn.close()
+    yield db_file
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff():
+    with patch("backend.fraud_locations.geocode_pipeline.backoff_delay", return_value=0):
+        yield
+
+
+def _seed(db_path, rows):
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany("INSERT INTO CDR VALUES (?, ?, ?, ?, ?, ?)", rows)
+        sync_charge_points(conn.cursor())
+
+
+def test_pipeline_writes_coordinates_and_metrics(db_path):
+    provider = FakeProvider()
+    manager = FraudLocationManager(db_path, providers=[provider], use_nominatim=False)
+    _seed(db_path, [
+        ("C1", "CP1", "Kade 1", "1000AA", "Amsterdam", "NLD"),
+        ("C2", "CP1", "Kade 1", "1000AA", "Amsterdam", "NLD"),
+        ("C3", "CP2", "Kade 1", "1000AA", "Amsterdam", "NLD"),
+        ("C4", "CP3", "Plein 2", "2000BB", "Delft", "NLD"),
+        ("C5", "CP4", "Weg 3", "0000XX", "Nowhere", "NLD"),
+    ])
+
+    progress = manager.update_charge_point_coordinates(max_workers=2, batch_size=2)
+
+    assert (progress.total, progress.done, progress.found, progress.not_found) == (4, 4, 3, 1)
+    # CP1 and CP2 share an address and cost one lookup
+    assert provider.calls == 3
+    with sqlite3.connect(db_path) as conn:
+        rows = {row[0]: row[1:] for row in conn.execute("SELECT Charge_Point_ID, Latitude, Geocode_Status FROM ChargePoint")}
+    assert rows == {"CP1": (9.0, FOUND), "CP2": (9.0, FOUND), "CP3": (5.0, FOUND), "CP4": (None, NOT_FOUND)}
+    status = latest_progress(db_path).to_dict()
+    assert status["status"] == "done" and status["written"] == 3
+
+    # The next run is answered from the cache, including the miss
+    progress = manager.update_charge_point_coordinates()
+    assert (progress.total, progress.cached, progress.geocoder_calls) == (1, 1, 0)
+    assert provider.calls == 3
+
+
+def test_concurrency_is_bounded(db_path):
+    provider = FakeProvider(delay=0.02)
+    manager = FraudLocationManager(db_path, providers=[provider], use_nominatim=False)
+    _seed(db_path, [(f"C{i}", f"CP{i}", "Straat 1", f"{1000 + i}AA", "Amsterdam", "NLD") for i in range(20)])
+
+    progress = GeocodePipeline(manager, max_workers=3).run(manager._charge_points_without_coordinates())
+
+    assert progress.found == 20
+    assert 1 < provider.max_active <= 3
+
+
+def test_timeouts_are_retried_with_a_cap():
+    query = GeocodeQuery("Kade 1", "1000AA", "Amsterdam", "NLD", "Kade 1, 1000AA Amsterdam, Netherlands")
+    retries = []
+    provider = FakeProvider(timeouts=2)
+    assert geocode_with_retries(provider, query, max_retries=3, on_retry=lambda: retries.append(1)) is not None
+    assert provider.calls == 3 and len(retries) == 2
+
+    provider = FakeProvider(timeouts=10)
+    with pytest.raises(GeocoderTimedOut):
+        geocode_with_retries(provider, query, max_retries=2)
+    assert provider.calls == 3
+
+
+def test_failures_are_not_cached(db_path):
+    provider = FakeProvider(timeouts=100)
+    manager = FraudLocationManager(db_path, providers=[provider], use_nominatim=False)
+    _seed(db_path, [("C1", "CP1", "Kade 9", "1000AA", "Amsterdam", "NLD")])
+
+    progress = manager.update_charge_point_coordinates(max_retries=1)
+    assert (progress.failed, progress.retries) == (1, 1)
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("SELECT Geocode_Status FROM ChargePoint").fetchone() == (FAILED,)
+    assert manager.geocode_cache.get(manager.address_key("Kade 9", "1000AA", "Amsterdam", "NLD")) == (False, None)
+
+
+def test_token_bucket_limits_the_rate():
+    bucket = TokenBucket(rate=200.0)
+    started = time.monotonic()
+    for _ in range(11):
+        bucket.acquire()
+    # The first token is free, the other ten take 1/200 s each
+    assert time.monotonic() - started >= 0.045
@@ -0,0 +1,96 @@
+import os
+import shutil
+import tempfile
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from backend.fraud_locations.Fraude_Locaties import FraudLocationManager
+from backend.fraud_locations.geocoders import GazetteerIndex, GazetteerProvider, GeocodeQuery, GeocoderProvider
+
+
+@pytest.fixture
+def tmp_dir():
+    path = tempfile.mkdtemp()
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def _query(zip_code, city, country):
+    return GeocodeQuery("Teststraat 1", zip_code, city, country, f"Teststraat 1, {zip_code} {city}, {country}")
+
+
+def test_csv_gazetteer(tmp_dir):
+    path = os.path.join(tmp_dir, "gazetteer.csv")
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write("country,postal_code,city,latitude,longitude\n")
+        handle.write("NLD,2511 AB,Den Haag,52.08,4.31\n")
+        handle.write("NL,3011,Rotterdam,51.92,4.48\n")
+        handle.write("GBR,SW1A,London,51.50,-0.14\n")
+        handle.write("DEU,,Köln,50.94,6.96\n")
+    provider = GazetteerProvider(path)
+
+    assert provider.geocode(_query("2511AB", "Den Haag", "NLD")) == {"latitude": 52.08, "longitude": 4.31}
+    # Unknown full code, known leading digits
+    assert provider.geocode(_query("3011 XY", "Rotterdam", "NLD")) == {"latitude": 51.92, "longitude": 4.48}
+    # Outward code of a UK postcode
+    assert provider.geocode(_query("SW1A 1AA", "Westminster", "GBR")) == {"latitude": 51.50, "longitude": -0.14}
+    # City when the postal code is unknown
+    assert provider.geocode(_query("50667", "köln ", "DEU")) == {"latitude": 50.94, "longitude": 6.96}
+    assert provider.geocode(_query("9999", "Nergens", "NLD")) is None
+    assert os.path.exists(path + ".idx")
+    provider.close()
+
+
+def test_geonames_dump(tmp_dir):
+    path = os.path.join(tmp_dir, "NL.txt")
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write("NL\t1011\tAmsterdam\tNoord-Holland\t07\tAmsterdam\t0363\t\t\t52.3731\t4.9034\t6\n")
+    provider = GazetteerProvider(path)
+    assert provider.geocode(_query("1011AB", "Amsterdam", "NLD")) == {"latitude": 52.3731, "longitude": 4.9034}
+    provider.close()
+
+
+def test_index_is_sorted_and_searchable(tmp_dir):
+    path = os.path.join(tmp_dir, "keys.idx")
+    GazetteerIndex.build(((f"NL|z|{i:05d}", i, -i) for i in range(999, -1, -1)), path)
+    index = GazetteerIndex(path)
+    assert index.count == 1000
+    assert index.get("NL|z|00000") == (0.0, 0.0)
+    assert index.get("NL|z|00737") == (737.0, -737.0)
+    assert index.get("NL|z|01000") is None
+    index.close()
+
+
+def test_provider_without_geocode_cannot_be_created():
+    class Incomplete(GeocoderProvider):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_manager_uses_providers_before_nominatim():
+    class Stub(GeocoderProvider):
+        name = "stub"
+
+        def geocode(self, query):
+            return {"latitude": 1.0, "longitude": 2.0} if query.city == "Delft" else None
+
+    manager = FraudLocationManager(":memory:", providers=[Stub()])
+    with patch.object(manager, "geolocator") as geolocator, \
+            patch("backend.fraud_locations.geocode_pipeline.rate_limiter") as rate_limiter:
+        limiter = MagicMock()
+        rate_limiter.side_effect = lambda provider: limiter if provider.min_interval else None
+        geolocator.geocode.return_value = MagicMock(latitude=3.0, longitude=4.0)
+        assert manager.geocode_address("Markt 1", "2611GP", "Delft", "NLD") == {"latitude": 1.0, "longitude": 2.0}
+        geolocator.geocode.assert_not_called()
+        limiter.acquire.assert_not_called()
+        assert manager.geocode_address("Markt 1", "3011", "Rotterdam", "NLD") == {"latitude": 3.0, "longitude": 4.0}
+        limiter.acquire.assert_called_once()
+
+
+def test_offline_manager_never_calls_nominatim():
+    manager = FraudLocationManager(":memory:", providers=[], use_nominatim=False)
+    assert manager.geolocator is None
+    assert manager.geocode_address("Markt 1", "2611GP", "Delft", "NLD") is None
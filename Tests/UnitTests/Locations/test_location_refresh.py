@@ -0,0 +1,104 @@
+import sqlite3
+
+import pytest
+
+from backend.data.charge_points import create_charge_point_table
+from backend.data.fraud_findings import create_fraud_finding_tables
+from backend.fraud_locations.location_refresh import (
+    create_fraud_location_tables,
+    mark_all_dirty,
+    mark_cdrs_dirty,
+    mark_dirty,
+    refresh_fraud_locations,
+)
+
+
+@pytest.fixture
+def cursor():
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE CDR (
+            CDR_ID TEXT PRIMARY KEY, Charge_Point_ID TEXT, Charge_Point_Address TEXT,
+            Charge_Point_ZIP TEXT, Charge_Point_City TEXT, Charge_Point_Country TEXT, Start_datetime TEXT
+        )
+    """)
+    cursor.executemany("INSERT INTO CDR VALUES (?, ?, 'Kade 1', '1000AA', 'Amsterdam', 'NLD', ?)", [
+        ("C1", "CP1", "2024-01-01 10:00:00"),
+        ("C2", "CP1", "2024-01-02 10:00:00"),
+        ("C3", "CP2", "2024-01-03 10:00:00"),
+        ("C4", "CP3", "2024-01-04 10:00:00"),
+    ])
+    create_fraud_finding_tables(cursor)
+    cursor.executemany("INSERT INTO FraudCase (CDR_ID, Reason1) VALUES (?, 'x')", [("C1",), ("C2",), ("C3",), ("C4",)])
+    create_charge_point_table(cursor)
+    # CP3 has no coordinates
+    cursor.execute("UPDATE ChargePoint SET Latitude = 52.0, Longitude = 4.0 WHERE Charge_Point_ID != 'CP3'")
+    create_fraud_location_tables(cursor)
+    yield cursor
+    cursor.connection.close()
+
+
+def _locations(cursor):
+    cursor.execute("SELECT Charge_Point_ID, Fraud_Count, Last_Detected_Date FROM FraudLocations ORDER BY Charge_Point_ID")
+    return cursor.fetchall()
+
+
+def test_new_table_is_built_in_full(cursor):
+    assert refresh_fraud_locations(cursor) == {"processed": 3, "upserted": 2, "removed": 0}
+    assert _locations(cursor) == [("CP1", 2, "2024-01-02 10:00:00"), ("CP2", 1, "2024-01-03 10:00:00")]
+    # Nothing queued, nothing to do
+    assert refresh_fraud_locations(cursor)["processed"] == 0
+
+
+def test_only_dirty_charge_points_are_refreshed(cursor):
+    refresh_fraud_locations(cursor)
+
+    # CP2 is cleared and CP3 geocoded; CP1 changes too, but is not queued
+    cursor.execute("DELETE FROM FraudCase WHERE CDR_ID IN ('C1', 'C3')")
+    cursor.execute("UPDATE ChargePoint SET Latitude = 51.0, Longitude = 5.0 WHERE Charge_Point_ID = 'CP3'")
+    mark_cdrs_dirty(cursor, "SELECT 'C3'")
+    mark_dirty(cursor, "SELECT 'CP3' AS Charge_Point_ID")
+
+    assert refresh_fraud_locations(cursor) == {"processed": 2, "upserted": 1, "removed": 1}
+    assert _locations(cursor) == [("CP1", 2, "2024-01-02 10:00:00"), ("CP3", 1, "2024-01-04 10:00:00")]
+
+    mark_all_dirty(cursor)
+    refresh_fraud_locations(cursor)
+    assert _locations(cursor) == [("CP1", 1, "2024-01-02 10:00:00"), ("CP3", 1, "2024-01-04 10:00:00")]
+
+
+def test_popup_columns_are_precomputed(cursor):
+    cursor.execute("UPDATE FraudCase SET Reason2 = 'Unusual cost per kWh (ratio: 1.50)' WHERE CDR_ID = 'C1'")
+    cursor.execute("UPDATE FraudCase SET Reason1 = 'Unrealistic movement: 80.0 km in 10.0 min' WHERE CDR_ID IN ('C1', 'C2')")
+    refresh_fraud_locations(cursor)
+    cursor.execute("SELECT Latest_CDR_ID, Reasons, Reason_Counts FROM FraudLocations ORDER BY Charge_Point_ID")
+    assert cursor.fetchall() == [
+        (
+            "C2",
+            "Unrealistic movement (2); Unusual cost per kWh (1)",
+            '{"Unrealistic movement":2,"Unusual cost per kWh":1}',
+        ),
+        ("C3", "x (1)", '{"x":1}'),
+    ]
+
+
+def test_older_table_gets_popup_columns():
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE CDR (CDR_ID TEXT PRIMARY KEY, Charge_Point_ID TEXT)")
+    cursor.execute("""
+        CREATE TABLE FraudLocations (
+            Location_ID TEXT PRIMARY KEY, Charge_Point_ID TEXT NOT NULL, Address TEXT, ZIP TEXT, City TEXT,
+            Country TEXT, Latitude REAL NOT NULL, Longitude REAL NOT NULL, Fraud_Count INTEGER DEFAULT 1,
+            Last_Detected_Date TEXT
+        )
+    """)
+    cursor.execute("INSERT INTO FraudLocations (Location_ID, Charge_Point_ID, Latitude, Longitude) VALUES ('LOC_CP9', 'CP9', 1, 2)")
+    create_fraud_location_tables(cursor)
+    cursor.execute("SELECT Reasons FROM FraudLocations")
+    assert cursor.fetchall() == [(None,)]
+    # Queued, so the next refresh fills them in
+    cursor.execute("SELECT Charge_Point_ID FROM FraudLocationDirty")
+    assert cursor.fetchall() == [("CP9",)]
+    conn.close()
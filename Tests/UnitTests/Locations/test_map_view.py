@@ -0,0 +1,77 @@
+import sqlite3
+
+import pytest
+
+from backend.fraud_locations.location_refresh import create_fraud_location_tables
+from backend.fraud_locations.map_view import (
+    CLUSTER_MAX_ZOOM,
+    BoundingBox,
+    cluster_cell_degrees,
+    fraud_location_popup,
+    fraud_locations_in_view,
+)
+
+
+@pytest.fixture
+def cursor():
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE CDR (CDR_ID TEXT PRIMARY KEY, Charge_Point_ID TEXT)")
+    create_fraud_location_tables(cursor)
+    locations = [
+        # Three in Amsterdam within a few hundred metres, one in Rotterdam, one in Paris
+        ("CP1", 52.370, 4.890, 3),
+        ("CP2", 52.371, 4.892, 1),
+        ("CP3", 52.372, 4.894, 2),
+        ("CP4", 51.920, 4.480, 5),
+        ("CP5", 48.857, 2.352, 1),
+    ]
+    for charge_point_id, latitude, longitude, fraud_count in locations:
+        cursor.execute(
+            "INSERT INTO FraudLocations (Location_ID, Charge_Point_ID, Latitude, Longitude, Fraud_Count) VALUES (?, ?, ?, ?, ?)",
+            (f"LOC_{charge_point_id}", charge_point_id, latitude, longitude, fraud_count),
+        )
+    # A new index picks up the existing rows
+    cursor.execute("DROP TABLE FraudLocationIndex")
+    create_fraud_location_tables(cursor)
+    yield cursor
+    conn.close()
+
+
+def test_points_inside_the_box_at_high_zoom(cursor):
+    view = fraud_locations_in_view(cursor, BoundingBox.parse("4.0,51.5,5.0,53.0"), CLUSTER_MAX_ZOOM)
+    assert not view["clustered"] and view["clusters"] == []
+    assert [point["Charge_Point_ID"] for point in view["points"]] == ["CP4", "CP1", "CP3", "CP2"]
+
+    view = fraud_locations_in_view(cursor, BoundingBox.parse("4.0,51.5,5.0,53.0"), 15, max_points=2)
+    assert view["truncated"] and len(view["points"]) == 2
+
+
+def test_nearby_points_are_clustered_at_low_zoom(cursor):
+    view = fraud_locations_in_view(cursor, BoundingBox.parse("-10,40,20,60"), 8)
+    assert view["clustered"]
+    assert [cluster["count"] for cluster in view["clusters"]] == [3]
+    cluster = view["clusters"][0]
+    assert cluster["fraudCount"] == 6
+    assert cluster["bbox"] == [4.890, 52.370, 4.894, 52.372]
+    # Cells with a single location come back as points
+    assert sorted(point["Charge_Point_ID"] for point in view["points"]) == ["CP4", "CP5"]
+
+
+def test_bbox_parsing():
+    assert BoundingBox.parse("-190,10,200,20") == BoundingBox(-180, 10, 180, 20)
+    for text in ("1,2,3", "a,b,c,d", "5,10,4,20", "1,50,2,40"):
+        with pytest.raises(ValueError):
+            BoundingBox.parse(text)
+    assert cluster_cell_degrees(0) == 90.0
+
+
+def test_popup_lookup(cursor):
+    cursor.execute("""
+        UPDATE FraudLocations SET Latest_CDR_ID = 'C9', Reasons = 'x (2); y (1)', Reason_Counts = '{"x":2,"y":1}'
+        WHERE Location_ID = 'LOC_CP1'
+    """)
+    popup = fraud_location_popup(cursor, "LOC_CP1")
+    assert popup["Latest_CDR_ID"] == "C9" and popup["Reason_Counts"] == {"x": 2, "y": 1}
+    assert fraud_location_popup(cursor, "LOC_CP2")["Reason_Counts"] == {}
+    assert fraud_location_popup(cursor, "LOC_missing") is None
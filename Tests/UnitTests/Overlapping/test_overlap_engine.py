@@ -0,0 +1,61 @@
+"""
+Unit tests for the sweep-line overlap engine.
+
+The sweep must return exactly the pairs a brute-force comparison finds.
+"""
+
+import itertools
+import random
+import unittest
+
+from backend.data.timestamps import to_epoch
+from backend.overlapping.overlap_engine import (
+    find_overlapping_pairs,
+    overlap_counts,
+    sessions_overlap,
+)
+
+
+class OverlapEngineTests(unittest.TestCase):
+
+    def _random_sessions(self, seed):
+        rng = random.Random(seed)
+        sessions = []
+        for i in range(300):
+            start = rng.randint(0, 20_000)
+            sessions.append((f"C{i}", f"U{rng.randint(0, 9)}", start, start + rng.randint(0, 900)))
+        return sessions
+
+    def _brute_force(self, sessions, **options):
+        pairs = set()
+        for a, b in itertools.combinations(sessions, 2):
+            if a[1] == b[1] and sessions_overlap(a[2], a[3], b[2], b[3], **options):
+                pairs.add(frozenset((a[0], b[0])))
+        return pairs
+
+    def test_matches_brute_force(self):
+        for options in ({"leeway_seconds": 1}, {"inclusive": True}, {}):
+            sessions = self._random_sessions(seed=7)
+            found = [frozenset(pair) for pair in find_overlapping_pairs(sessions, **options)]
+            self.assertEqual(len(found), len(set(found)))
+            self.assertSetEqual(set(found), self._brute_force(sessions, **options))
+
+    def test_touching_sessions(self):
+        sessions = [("A", "U", 0, 100), ("B", "U", 100, 200)]
+        self.assertEqual(overlap_counts(sessions, inclusive=True), {"A": 1, "B": 1})
+        self.assertEqual(overlap_counts(sessions, leeway_seconds=1), {})
+
+    def test_missing_values_never_overlap(self):
+        sessions = [("A", None, 0, 100), ("B", None, 0, 100), ("C", "U", None, 100), ("D", "U", 0, 100)]
+        self.assertEqual(overlap_counts(sessions, inclusive=True), {})
+
+    def test_to_epoch(self):
+        self.assertEqual(to_epoch("1970-01-01 00:01:00"), 60)
+        self.assertEqual(to_epoch("1970-01-01T00:01:00.900"), 60)
+        self.assertEqual(to_epoch("1970-01-01 01:01:00+01:00"), 60)
+        self.assertIsNone(to_epoch("not a date"))
+        self.assertIsNone(to_epoch(None))
+
+
+if __name__ == "__main__":
+    unittest.main()
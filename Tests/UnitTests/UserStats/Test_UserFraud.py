@@ -55,6 +55,14 @@ class TestFraudStats(unittest.TestCase):
         self.assertIn("TotalVolume", first)
         self.assertIn("TotalCost", first)
 
+    @patch("backend.fraud_per_user.fraud_per_user.DbContext")
+    def test_get_specific_fraud_unknown_reason(self, mock_db):
+        response = self.client.get("/api/all-authentication-ids-with-specific-fraud/NoSuchReason")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["detail"], "Unknown reason: NoSuchReason")
+        mock_db.assert_not_called()
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,19 @@
+import shutil
+import tempfile
+
+import pytest
+
+from Tests import synthetic_cdrs
+
+
+@pytest.fixture
+def tmp_dir():
+    path = tempfile.mkdtemp()
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+@pytest.fixture
+def insert_cdrs():
+    """insert_cdrs(db_path, import_filename, first_id, count, rng, **choices): random CDRs in the shared test schema."""
+    return synthetic_cdrs.insert_cdrs
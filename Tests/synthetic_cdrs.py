@@ -0,0 +1,88 @@
+"""
+Synthetic CDR tables shared by the unit tests (through Tests/UnitTests/conftest.py) and the benchmarks.
+"""
+
+import sqlite3
+
+from backend.data.migrations import cdr_time_values
+
+# The CDR columns the fraud rules, the CdrFeatures table and the aggregates read
+CDR_TEST_COLUMNS = (
+    "CDR_ID",
+    "Authentication_ID",
+    "Charge_Point_ID",
+    "Charge_Point_Country",
+    "Volume",
+    "Duration",
+    "Calculated_Cost",
+    "Start_datetime",
+    "End_datetime",
+    "import_filename",
+    "Start_epoch",
+    "End_epoch",
+    "Start_hour",
+)
+
+CDR_TEST_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS CDR (
+        CDR_ID TEXT PRIMARY KEY,
+        Authentication_ID TEXT,
+        Charge_Point_ID TEXT,
+        Charge_Point_Country TEXT,
+        Volume TEXT,
+        Duration TEXT,
+        Calculated_Cost REAL,
+        Start_datetime TEXT,
+        End_datetime TEXT,
+        import_filename TEXT,
+        Start_epoch INTEGER,
+        End_epoch INTEGER,
+        Start_hour INTEGER
+    )
+"""
+
+_START = CDR_TEST_COLUMNS.index("Start_datetime")
+_END = CDR_TEST_COLUMNS.index("End_datetime")
+
+
+def insert_cdr_rows(conn: sqlite3.Connection, rows):
+    """
+    Create the CDR table if needed and insert rows of the CDR_TEST_COLUMNS up
+    to import_filename; the epoch and hour columns follow from the datetimes.
+    """
+    conn.execute(CDR_TEST_SCHEMA)
+    conn.executemany(
+        f"INSERT INTO CDR VALUES ({', '.join(['?'] * len(CDR_TEST_COLUMNS))})",
+        (tuple(row) + cdr_time_values(row[_START], row[_END]) for row in rows),
+    )
+
+
+def random_cdrs(
+    rng,
+    first_id: int,
+    count: int,
+    import_filename=None,
+    auth_ids=("A1", "A2", "A3", "A4", " A5", None),
+    charge_points=("CP1", "CP2", "CP3"),
+    countries=("NL", "BE"),
+):
+    """Sessions of 5 to 90 minutes on the first days of January 2024, with Dutch decimal commas in Volume."""
+    for i in range(first_id, first_id + count):
+        day, hour, minute = rng.randint(1, 3), rng.randint(0, 22), rng.randint(0, 59)
+        minutes = rng.randint(5, 90)
+        start = f"2024-01-0{day} {hour:02d}:{minute:02d}:00"
+        end_minute = hour * 60 + minute + minutes
+        end = f"2024-01-0{day} {min(end_minute // 60, 23):02d}:{end_minute % 60:02d}:00"
+        yield (
+            f"CDR{i:04d}", rng.choice(auth_ids), rng.choice(charge_points), rng.choice(countries),
+            f"{rng.uniform(1, 40):.1f}".replace(".", ","), f"00:{minutes % 60:02d}:00",
+            rng.uniform(1, 40), start, end, import_filename,
+        )
+
+
+def insert_cdrs(db_path: str, import_filename, first_id: int, count: int, rng, **choices):
+    """Add count random_cdrs, numbered from first_id, to the database at db_path."""
+    conn = sqlite3.connect(db_path)
+    insert_cdr_rows(conn, random_cdrs(rng, first_id, count, import_filename, **choices))
+    conn.commit()
+    conn.close()
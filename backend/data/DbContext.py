@@ -1,12 +1,40 @@
-import sqlite3
 
 # from datetime import datetime
 import pandas as pd
 import logging
 import os
-from typing import Tuple, Optional
+from typing import Callable, Iterator, List, Optional, Tuple
 
 from backend.fraude_detectie import Fraude_detectie
+from backend.data.DbPool import get_pool
+from backend.data.aggregates import create_aggregate_tables, refresh_aggregates
+from backend.data.cdr_features import create_cdr_feature_table, refresh_cdr_features
+from backend.data.charge_points import create_charge_point_table, sync_charge_points
+from backend.data.cdr_reader import CDR_COLUMNS, iter_batches, read_cdr_rows
+from backend.data.cdr_writer import write_csv, write_xlsx
+from backend.data.timestamps import to_epoch
+from backend.data.migrations import CDR_TIME_COLUMNS, cdr_time_values, ensure_cdr_time_columns, table_columns
+from backend.fraud_locations.location_refresh import mark_cdrs_dirty
+from backend.overlapping.overlap_engine import overlap_counts, sessions_overlap
+
+
+# Rows per insert/commit when importing a file
+IMPORT_BATCH_SIZE = 5000
+# Rows fetched from the cursor per page when exporting
+EXPORT_PAGE_SIZE = 5000
+
+_LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+
+def _get_file_logger(name: str, filename: str) -> logging.Logger:
+    """Named logger writing to `filename`; the handler is attached only once per process."""
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    if not logger.handlers:
+        handler = logging.FileHandler(filename)
+        handler.setFormatter(logging.Formatter(_LOG_FORMAT))
+        logger.addHandler(handler)
+    return logger
 
 
 class DbContext:
@@ -15,35 +43,32 @@ class DbContext:
         base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         # Construct the correct db path
         self.db_name = os.path.join(base_dir, db_name)
-        print("Database path:", self.db_name)
         self.connection = None
+        self._pool = None
 
-        # Import logger
-        self.import_logger = logging.getLogger("import_logger")
-        self.import_logger.setLevel(logging.INFO)
-        import_handler = logging.FileHandler("import_log.txt")
-        import_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-        if not self.import_logger.handlers:
-            self.import_logger.addHandler(import_handler)
-
-        # Export logger
-        self.export_logger = logging.getLogger("export_logger")
-        self.export_logger.setLevel(logging.INFO)
-        export_handler = logging.FileHandler("export_log.txt")
-        export_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-        if not self.export_logger.handlers:
-            self.export_logger.addHandler(export_handler)
-        # Initialize logging
+        # Import and export loggers
+        self.import_logger = _get_file_logger("import_logger", "import_log.txt")
+        self.export_logger = _get_file_logger("export_logger", "export_log.txt")
+        # Initialize logging (no-op once the root logger is configured)
         logging.basicConfig(
             filename="import_log.txt",
             level=logging.INFO,
-            format="%(asctime)s - %(levelname)s - %(message)s",
+            format=_LOG_FORMAT,
         )
 
     def connect(self):
-        """Establish a connection to the SQLite database."""
-        self.connection = sqlite3.connect(self.db_name)
-        print(f"Connected to {self.db_name}")
+        """Borrow a connection to the SQLite database from the shared pool."""
+        if self.connection is None:
+            self._pool = get_pool(self.db_name)
+            self.connection = self._pool.acquire()
+
+    def __enter__(self):
+        """`with DbContext() as db:` borrows a connection and gives it back on every path."""
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
     def create_table(self, table_name, schema):
         if self.connection:
@@ -56,45 +81,60 @@ class DbContext:
 
     def initialize_database(self):
         """Initialize the database by creating all required tables."""
-        self.connect()
-
-        # Define the schema for the CDR (Charge Detail Record) table
-        cdr_schema = """
-            CDR_ID TEXT PRIMARY KEY,
-            Start_datetime TEXT,
-            End_datetime TEXT,
-            Duration INTEGER,
-            Volume REAL,
-            Charge_Point_Address TEXT,
-            Charge_Point_ZIP TEXT,
-            Charge_Point_City TEXT,
-            Charge_Point_Country TEXT,
-            Charge_Point_Type TEXT,
-            Product_Type TEXT,
-            Tariff_Type TEXT,
-            Authentication_ID TEXT,
-            Contract_ID TEXT,
-            Meter_ID TEXT,
-            OBIS_Code TEXT,
-            Charge_Point_ID TEXT,
-            Service_Provider_ID TEXT,
-            Infra_Provider_ID TEXT ,
-            Calculated_Cost REAL ,
-            import_filename TEXT
-        """
-
-        # Create the CDR table
-        self.create_table("CDR", cdr_schema)
-        self.close()
+        with self:
+            # Define the schema for the CDR (Charge Detail Record) table
+            cdr_schema = """
+                CDR_ID TEXT PRIMARY KEY,
+                Start_datetime TEXT,
+                End_datetime TEXT,
+                Duration INTEGER,
+                Volume REAL,
+                Charge_Point_Address TEXT,
+                Charge_Point_ZIP TEXT,
+                Charge_Point_City TEXT,
+                Charge_Point_Country TEXT,
+                Charge_Point_Type TEXT,
+                Product_Type TEXT,
+                Tariff_Type TEXT,
+                Authentication_ID TEXT,
+                Contract_ID TEXT,
+                Meter_ID TEXT,
+                OBIS_Code TEXT,
+                Charge_Point_ID TEXT,
+                Service_Provider_ID TEXT,
+                Infra_Provider_ID TEXT ,
+                Calculated_Cost REAL ,
+                import_filename TEXT
+            """
+
+            # Create the CDR table
+            self.create_table("CDR", cdr_schema)
+
+            # Integer epoch/hour columns and the indexes time based queries use
+            cursor = self.connection.cursor()
+            ensure_cdr_time_columns(cursor)
+            # Per-user and per-charge-point totals, kept up to date by fraud detection
+            create_aggregate_tables(cursor)
+            # Charge point addresses and coordinates, one row per charge point
+            create_charge_point_table(cursor)
+            # Parsed and windowed values the fraud rules compare with their thresholds
+            create_cdr_feature_table(cursor)
+            self.connection.commit()
 
     def insert_cdr(self, cdr_data):
         """Insert a new CDR record into the database."""
         if self.connection:
             cursor = self.connection.cursor()
+            cdr_data = dict(cdr_data)
+            time_values = cdr_time_values(cdr_data.get("Start_datetime"), cdr_data.get("End_datetime"))
+            cdr_data.update(zip(CDR_TIME_COLUMNS, time_values))
             columns = ", ".join(cdr_data.keys())
             placeholders = ", ".join(["?"] * len(cdr_data))
             sql = f"INSERT INTO CDR ({columns}) VALUES ({placeholders})"
             cursor.execute(sql, list(cdr_data.values()))
+            sync_charge_points(cursor, "CDR_ID = ?", (cdr_data["CDR_ID"],))
+            refresh_cdr_features(cursor, [cdr_data.get("Authentication_ID")])
+            refresh_aggregates(cursor, "SELECT ?", (cdr_data["CDR_ID"],))
             self.connection.commit()
             print(f"Inserted new CDR record with ID: {cdr_data['CDR_ID']}")
         else:
@@ -131,397 +171,443 @@ class DbContext:
             return None
 
     def close(self):
-        """Close the database connection."""
+        """Give the database connection back to the pool."""
         if self.connection:
-            self.connection.close()
-            print(f"Connection to {self.db_name} closed.")
+            self._pool.release(self.connection)
+            self.connection = None
 
-    def import_excel_to_database(self, excel_file_path) -> Tuple[int, Optional[str]]:
+
+    def import_excel_to_database(
+        self,
+        excel_file_path,
+        batch_size: int = IMPORT_BATCH_SIZE,
+        progress: Optional[Callable[[str, int], None]] = None,
+    ) -> Tuple[int, Optional[str]]:
         """
-        Import data from an Excel file into the CDR table and log the results.
+        Import data from an Excel or CSV file into the CDR table and log the results.
+
+        The file is streamed and inserted in batches of batch_size rows, each
+        committed on its own, so memory stays constant whatever the file size.
+        If a batch fails, the batches before it stay imported and are
+        processed like a complete import.
 
         Args:
-            excel_file_path (str): Path to the Excel file to import
+            excel_file_path (str): Path to the .xlsx, .xls or .csv file to import
+            batch_size (int): Number of rows per insert/commit
+            progress (callable): Optional progress(phase, rows_done) callback,
+                called with "inserting" after every batch, then "detecting" and "done"
 
         Returns:
-            int: Number of records successfully imported
+            tuple: (number of records imported, error message or None)
         """
+        file_name = os.path.basename(excel_file_path)
+        rows_done = 0
+        inserted = False
         try:
-            # Extract the file name from the full path
-            file_name = os.path.basename(excel_file_path)
-
-            # Read the Excel file
-            df = pd.read_excel(excel_file_path)
-
-            # Ensure all required columns are present
-            required_columns = [
-                "CDR_ID",
-                "Start_datetime",
-                "End_datetime",
-                "Duration",
-                "Volume",
-                "Charge_Point_Address",
-                "Charge_Point_ZIP",
-                "Charge_Point_City",
-                "Charge_Point_Country",
-                "Charge_Point_Type",
-                "Product_Type",
-                "Tariff_Type",
-                "Authentication_ID",
-                "Contract_ID",
-                "Meter_ID",
-                "OBIS_Code",
-                "Charge_Point_ID",
-                "Service_Provider_ID",
-                "Infra_Provider_ID",
-                "Calculated_Cost",
-            ]
-
-            # Add import_filename column to DataFrame
-            df["import_filename"] = file_name
-            required_columns_with_filename = required_columns + ["import_filename"]
-
-            # Check if all required columns are present
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            if missing_columns:
-                raise ValueError(
-                    f"Missing required columns in Excel file: {missing_columns}"
-                )
-
-            # Connect to database
-            self.connect()
-
-            # Prepare the insert statement
-            cursor = self.connection.cursor()
-            columns = ", ".join(required_columns_with_filename)
-            placeholders = ", ".join(["?"] * len(required_columns_with_filename))
+            insert_columns = CDR_COLUMNS + ["import_filename"] + list(CDR_TIME_COLUMNS)
+            columns = ", ".join(insert_columns)
+            placeholders = ", ".join(["?"] * len(insert_columns))
             insert_sql = f"INSERT INTO CDR ({columns}) VALUES ({placeholders})"
+            start_index = CDR_COLUMNS.index("Start_datetime")
+            end_index = CDR_COLUMNS.index("End_datetime")
+
+            rows = read_cdr_rows(excel_file_path)
+            for batch in iter_batches(rows, batch_size):
+                # Add the import filename and the epoch/hour columns to every row
+                records = [
+                    row + (file_name,) + cdr_time_values(row[start_index], row[end_index])
+                    for row in batch
+                ]
+                self.connect()
+                self.connection.executemany(insert_sql, records)
+                self.connection.commit()
+                rows_done += len(records)
+                if progress:
+                    progress("inserting", rows_done)
+
+            if rows_done == 0:
+                raise ValueError("No data rows found in file")
+            inserted = True
+
+            fraud_cases = self._process_imported_rows(file_name, rows_done, progress)
+            if progress:
+                progress("done", rows_done)
 
-            # Convert DataFrame to list of tuples for insertion
-            records = [tuple(row) for row in df[required_columns_with_filename].values]
-
-            # Insert all records
-            cursor.executemany(insert_sql, records)
-            self.connection.commit()
-
-            # Call Fraude_detectie after importing
-            detector = Fraude_detectie.FraudDetector(self.db_name)
-            fraude_resultaat = detector.detect_fraud()
-            fraud_cases = len(fraude_resultaat)
-            print(f"Fraudedetectie voltooid. Gevonden cases: {fraud_cases}")
-            
             # Log success with fraud cases
-            self.import_logger.info(f"Successfully imported {len(records)} records from {file_name} - Found {fraud_cases} fraud cases")
+            self.import_logger.info(f"Successfully imported {rows_done} records from {file_name} - Found {fraud_cases} fraud cases")
             logging.info(
-                f"Successfully imported {len(records)} records from {file_name} - Found {fraud_cases} fraud cases"
+                f"Successfully imported {rows_done} records from {file_name} - Found {fraud_cases} fraud cases"
             )
-            print(f"Successfully imported {len(records)} records from {file_name} - Found {fraud_cases} fraud cases")
-            
-            return len(records), None
+            print(f"Successfully imported {rows_done} records from {file_name} - Found {fraud_cases} fraud cases")
+
+            return rows_done, None
 
         except Exception as e:
             # Log failure
-            file_name = os.path.basename(excel_file_path)
-            self.import_logger.error(f"Failed to import records from {file_name}. Error: {str(e)}")
-            print(f"Error importing Excel file: {str(e)}")
             if self.connection:
                 self.connection.rollback()
-            return 0, str(e)
+            error = str(e)
+            if rows_done and not inserted:
+                # The committed batches get their charge points, features and detection all the same
+                try:
+                    self._process_imported_rows(file_name, rows_done, progress)
+                except Exception as processing_error:
+                    self.import_logger.error(f"Failed to process the records imported from {file_name}. Error: {processing_error}")
+            if rows_done:
+                error = f"{error} (the first {rows_done} records were imported)"
+            self.import_logger.error(f"Failed to import records from {file_name}. Error: {error}")
+            print(f"Error importing Excel file: {error}")
+            return rows_done, error
 
         finally:
             if self.connection:
                 self.close()
 
 
-    def export_cdr_to_file(
+    def _process_imported_rows(
+        self,
+        file_name: str,
+        rows_done: int,
+        progress: Optional[Callable[[str, int], None]] = None,
+    ) -> int:
+        """Post-process the imported rows of file_name and detect fraud in them; returns the number of fraud cases."""
+        # New charge points and changed addresses, before detection reads their coordinates
+        self.connect()
+        cursor = self.connection.cursor()
+        sync_charge_points(cursor, "import_filename = ?", (file_name,))
+        mark_cdrs_dirty(cursor, "SELECT CDR_ID FROM CDR WHERE import_filename = ?", (file_name,))
+        # Counted in the user and charge point totals even when detection fails
+        refresh_aggregates(cursor, "SELECT CDR_ID FROM CDR WHERE import_filename = ?", (file_name,))
+        # The features of the imported sessions and of the sessions of the same users they precede
+        cursor.execute("SELECT DISTINCT Authentication_ID FROM CDR WHERE import_filename = ?", (file_name,))
+        refresh_cdr_features(cursor, [row[0] for row in cursor.fetchall()])
+        self.connection.commit()
+
+        # Call Fraude_detectie after importing
+        if progress:
+            progress("detecting", rows_done)
+        detector = Fraude_detectie.FraudDetector(self.db_name)
+        fraude_resultaat = detector.detect_fraud(import_filename=file_name)
+        fraud_cases = len(fraude_resultaat)
+        print(f"Fraudedetectie voltooid. Gevonden cases: {fraud_cases}")
+        return fraud_cases
+
+
+    def export_query(
         self,
-        output_path: str,
         columns: Optional[str] = None,
         start_date: Optional[str] = None,
         end_date: Optional[str] = None
-    ) -> Tuple[bool, int]:
-        """Export filtered CDR data to CSV or Excel."""
-        try:
-            self.connect()
+    ) -> Tuple[List[str], str, dict]:
+        """Column names, SQL and parameters of a CDR export; raises ValueError for unknown columns."""
+        cursor = self.connection.cursor()
+        available = table_columns(cursor, "CDR")
+        if columns:
+            selected = [column.strip() for column in columns.split(",") if column.strip()]
+            unknown = [column for column in selected if column not in available]
+            if unknown:
+                raise ValueError(f"Unknown export columns: {unknown}")
+        else:
+            # The derived epoch/hour columns are internal
+            selected = [column for column in available if column not in CDR_TIME_COLUMNS]
 
-            # Build base query
-            query = f"SELECT {columns} FROM CDR" if columns else "SELECT * FROM CDR"
-            filters = []
-            params = {}
+        query = f"SELECT {', '.join(selected)} FROM CDR"
+        filters = []
+        params = {}
 
-            if start_date:
-                filters.append("datetime(Start_datetime) >= datetime(:start)")
-                params["start"] = start_date
+        # An unparseable date binds NULL and matches nothing, like datetime() did
+        if start_date:
+            filters.append("Start_epoch >= :start")
+            params["start"] = to_epoch(start_date)
 
-            if end_date:
-                filters.append("datetime(Start_datetime) <= datetime(:end)")
-                params["end"] = end_date
+        if end_date:
+            filters.append("Start_epoch <= :end")
+            params["end"] = to_epoch(end_date)
 
-            if filters:
-                query += " WHERE " + " AND ".join(filters)
+        if filters:
+            query += " WHERE " + " AND ".join(filters)
 
-            df = pd.read_sql_query(query, self.connection, params=params)
+        return selected, query, params
 
-            record_count = len(df)
-            if record_count == 0:
-                self.export_logger.warning("No records found in the database")
-                print("No records found")
-                return False, 0
+    def iter_cdr_export(
+        self,
+        columns: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        page_size: int = EXPORT_PAGE_SIZE
+    ) -> Tuple[List[str], Iterator[List[tuple]]]:
+        """
+        Column names and a generator of row pages for a filtered CDR export.
 
-            # Write to file
-            if output_path.endswith(('.xlsx', '.xls')):
-                df.to_excel(output_path, index=False)
-            elif output_path.endswith('.csv'):
-                df.to_csv(output_path, index=False)
-            else:
-                print("Unsupported file format")
-                return False, record_count
+        The query runs before this returns, so bad columns fail early. The
+        pages are fetched from the cursor on demand and the connection goes
+        back to the pool once the started generator is exhausted or closed.
+        """
+        self.connect()
+        try:
+            header, query, params = self.export_query(columns, start_date, end_date)
+            cursor = self.connection.cursor()
+            cursor.execute(query, params)
+        except Exception:
+            self.close()
+            raise
+
+        def pages():
+            try:
+                while True:
+                    page = cursor.fetchmany(page_size)
+                    if not page:
+                        break
+                    yield page
+            finally:
+                cursor.close()
+                self.close()
+
+        return header, pages()
 
-            print(f"Exported {record_count} records to {output_path}")
-            return True, record_count
+    def export_cdr_to_file(
+        self,
+        output_path: str,
+        columns: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> Tuple[bool, int]:
+        """Export filtered CDR data to CSV or Excel."""
+        if not output_path.endswith(('.xlsx', '.csv')):
+            self.export_logger.error(f"Unsupported export file format: {output_path}")
+            return False, 0
 
+        try:
+            header, pages = self.iter_cdr_export(columns, start_date, end_date)
+            writer = write_xlsx if output_path.endswith('.xlsx') else write_csv
+            record_count = writer(output_path, header, pages)
         except Exception as e:
-            print(f"Error exporting data: {e}")
+            self.export_logger.error(f"Error exporting data: {e}")
             return False, 0
 
-        finally:
-            self.close()
+        if record_count == 0:
+            self.export_logger.warning("No records found in the database")
+            return False, 0
 
+        self.export_logger.info(f"Exported {record_count} records to {output_path}")
+        return True, record_count
 
+    def _load_overlap_frame(self, columns: str, where: str = "", params: tuple = ()):
+        """Read the sessions the overlap engine needs, using the integer epoch columns."""
+        cursor = self.connection.cursor()
+        cursor.execute(
+            f"SELECT CDR_ID, Authentication_ID, Start_epoch, End_epoch, Start_datetime, End_datetime, {columns} "
+            f"FROM CDR {where}",
+            params,
+        )
+        rows = cursor.fetchall()
+        names = [desc[0] for desc in cursor.description]
+        # Engine input straight from the rows, pandas would turn NULL epochs into NaN
+        sessions = [row[:4] for row in rows]
+        df = pd.DataFrame.from_records(rows, columns=names)
+        return df, sessions
 
     def get_overlapping_sessions_by_auth_id(self, auth_id: str) -> list[dict]:
-        self.connect()
-        query = """
-        WITH Overlaps AS (
-            SELECT a.CDR_ID AS main_id, b.CDR_ID AS overlap_id, a.*, a.Calculated_Cost
-            FROM CDR a
-            JOIN CDR b
-            ON a.Authentication_ID = b.Authentication_ID
-            AND a.CDR_ID != b.CDR_ID
-            AND datetime(a.Start_datetime) < datetime(b.End_datetime, '-1 second')
-            AND datetime(a.End_datetime)   > datetime(b.Start_datetime, '+1 second')
-        )
-        SELECT o.main_id AS CDR_ID, o.Authentication_ID, o.Start_datetime, o.End_datetime,
-            o.Charge_Point_City, o.Volume, o.Calculated_Cost,
-            o.Charge_Point_ID, o.Charge_Point_Country,
-            COUNT(o.overlap_id) AS OverlappingCount
-        FROM Overlaps o
-        WHERE o.Authentication_ID = ?
-        GROUP BY o.main_id
-        ORDER BY o.Start_datetime
-        """
-        df = pd.read_sql_query(query, self.connection, params=(auth_id,))
-        self.close()
-        return df.to_dict(orient='records')
+        with self:
+            df, sessions = self._load_overlap_frame(
+                "Charge_Point_City, Volume, Calculated_Cost, Charge_Point_ID, Charge_Point_Country",
+                "WHERE Authentication_ID = ? ORDER BY Start_epoch",
+                (auth_id,),
+            )
 
+        # 1-second leeway, like the overlap pages always used
+        counts = overlap_counts(sessions, leeway_seconds=1)
+        df["OverlappingCount"] = df["CDR_ID"].map(counts)
+        df = df[df["OverlappingCount"].notna()].sort_values("Start_datetime", kind="stable")
+        df["OverlappingCount"] = df["OverlappingCount"].astype(int)
+        columns = [
+            "CDR_ID", "Authentication_ID", "Start_datetime", "End_datetime",
+            "Charge_Point_City", "Volume", "Calculated_Cost",
+            "Charge_Point_ID", "Charge_Point_Country", "OverlappingCount",
+        ]
+        return df[columns].to_dict(orient='records')
 
-    def get_overlapping_sessions(self):
-        self.connect()
 
-        query = """
-        WITH Overlaps AS (
-            SELECT a.CDR_ID AS main_id, b.CDR_ID AS overlap_id, a.*, a.Calculated_Cost
-            FROM CDR a
-            JOIN CDR b
-            ON a.Authentication_ID = b.Authentication_ID
-            AND a.CDR_ID != b.CDR_ID
-            AND (
-                datetime(a.Start_datetime) BETWEEN datetime(b.Start_datetime) AND datetime(b.End_datetime)
-                OR datetime(a.End_datetime) BETWEEN datetime(b.Start_datetime) AND datetime(b.End_datetime)
-                OR datetime(b.Start_datetime) BETWEEN datetime(a.Start_datetime) AND datetime(a.End_datetime)
+    def get_overlapping_sessions(self):
+        with self:
+            df, sessions = self._load_overlap_frame(
+                "Charge_Point_City, Volume, Calculated_Cost", "WHERE Authentication_ID IS NOT NULL"
             )
-        )
-        SELECT o.main_id AS CDR_ID, o.Authentication_ID, o.Start_datetime, o.End_datetime,
-            o.Charge_Point_City, o.Volume,  o.Calculated_Cost,
-            COUNT(o.overlap_id) AS OverlappingCount
-        FROM Overlaps o
-        GROUP BY o.main_id
-        ORDER BY o.Authentication_ID, o.Start_datetime
-        """
 
-        df = pd.read_sql_query(query, self.connection)
-        self.close()
-        return df.to_dict(orient="records")
+        # Same inclusive comparison as the Reason4 fraud rule
+        counts = overlap_counts(sessions, inclusive=True)
+        df["OverlappingCount"] = df["CDR_ID"].map(counts)
+        df = df[df["OverlappingCount"].notna()].sort_values(
+            ["Authentication_ID", "Start_datetime"], kind="stable"
+        )
+        df["OverlappingCount"] = df["OverlappingCount"].astype(int)
+        columns = [
+            "CDR_ID", "Authentication_ID", "Start_datetime", "End_datetime",
+            "Charge_Point_City", "Volume", "Calculated_Cost", "OverlappingCount",
+        ]
+        return df[columns].to_dict(orient="records")
     
     def get_overlapping_stats(self):
-        self.connect()
-        query = """
-        WITH Overlaps AS (
-            SELECT a.Authentication_ID,
-                a.CDR_ID,
-                a.Volume,
-                a.Calculated_Cost
-            FROM   CDR a
-            JOIN   CDR b
-            ON   a.Authentication_ID = b.Authentication_ID
-            AND   a.CDR_ID           != b.CDR_ID
-            -- 1-seconde leeway
-            AND   datetime(a.Start_datetime) < datetime(b.End_datetime, '-1 second')
-            AND   datetime(a.End_datetime)   > datetime(b.Start_datetime, '+1 second')
-        )
-        SELECT  Authentication_ID,
-                COUNT(DISTINCT CDR_ID) AS ClusterCount,
-                SUM(Volume)           AS TotalVolume,
-                SUM(Calculated_Cost)  AS TotalCost
-        FROM    Overlaps
-        GROUP BY Authentication_ID;
-        """
-        df = pd.read_sql_query(query, self.connection)
-        self.close()
+        with self:
+            _, sessions = self._load_overlap_frame("Volume", "WHERE Authentication_ID IS NOT NULL")
+            counts = overlap_counts(sessions, leeway_seconds=1)
+
+            # Aggregate the overlapping CDRs in SQL so Volume/Cost keep SQLite's numeric semantics
+            cursor = self.connection.cursor()
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS OverlapIds (CDR_ID TEXT PRIMARY KEY)")
+            cursor.execute("DELETE FROM temp.OverlapIds")
+            cursor.executemany("INSERT INTO temp.OverlapIds (CDR_ID) VALUES (?)", [(cdr_id,) for cdr_id in counts])
+            query = """
+            SELECT  c.Authentication_ID,
+                    COUNT(*)               AS ClusterCount,
+                    SUM(c.Volume)          AS TotalVolume,
+                    SUM(c.Calculated_Cost) AS TotalCost
+            FROM    CDR c
+            JOIN    temp.OverlapIds o ON o.CDR_ID = c.CDR_ID
+            GROUP BY c.Authentication_ID;
+            """
+            df = pd.read_sql_query(query, self.connection)
+            cursor.execute("DROP TABLE temp.OverlapIds")
         return df.to_dict(orient='records')
 
 
     def get_overlapping_cluster_count(self):
-        self.connect()
-        query = """
-        SELECT Authentication_ID, COUNT(DISTINCT CDR_ID) AS ClusterCount
-        FROM CDR
-        GROUP BY Authentication_ID
-        """
-        df = pd.read_sql_query(query, self.connection)
-        self.close()
+        with self:
+            query = """
+            SELECT Authentication_ID, COUNT(DISTINCT CDR_ID) AS ClusterCount
+            FROM CDR
+            GROUP BY Authentication_ID
+            """
+            df = pd.read_sql_query(query, self.connection)
         return df.to_dict(orient='records')
 
 
     def get_all_overlapping_for_cdr(self, cdr_id):
-        self.connect()
-
-        # Query voor overlappende sessies
-        query = """ 
-        SELECT  b.CDR_ID,
-                b.Start_datetime,
-                b.End_datetime,
-                b.Charge_Point_City,
-                b.Volume,
-                b.Authentication_ID,
-                b.Charge_Point_ID,
-                b.Charge_Point_Country,
-                b.Calculated_Cost
-        FROM    CDR a
-        JOIN    CDR b
-        ON    a.Authentication_ID = b.Authentication_ID
-        AND    a.CDR_ID = ?                -- target CDR
-        AND    a.CDR_ID != b.CDR_ID        -- niet zichzelf
-        -- 1-sec leeway
-        AND    datetime(b.Start_datetime) < datetime(a.End_datetime,  '-1 second')
-        AND    datetime(b.End_datetime)   > datetime(a.Start_datetime, '+1 second')
-        """
+        with self:
+            # Alle sessies van dezelfde gebruiker als de target CDR
+            columns = """Charge_Point_City, Volume, Charge_Point_ID, Charge_Point_Country, Calculated_Cost"""
+            df, sessions = self._load_overlap_frame(
+                columns,
+                "WHERE CDR_ID = ? OR Authentication_ID = (SELECT Authentication_ID FROM CDR WHERE CDR_ID = ?)",
+                (cdr_id, cdr_id),
+            )
 
-        df_overlaps = pd.read_sql_query(query, self.connection, params=(cdr_id,))
+        target = df[df["CDR_ID"] == cdr_id]
+        if target.empty:
+            return []
+        _, _, start, end = next(session for session in sessions if session[0] == cdr_id)
 
-        # Query voor het originele CDR zelf (A)
-        query_original = """
-        SELECT CDR_ID, Start_datetime, End_datetime, Charge_Point_City, Volume, Authentication_ID,
-            Charge_Point_ID, Charge_Point_Country, Calculated_Cost
-        FROM CDR
-        WHERE CDR_ID = ?
-        """
-        df_original = pd.read_sql_query(query_original, self.connection, params=(cdr_id,))
+        # 1-sec leeway, niet zichzelf
+        overlaps = [
+            index for index, (other_id, _, other_start, other_end) in enumerate(sessions)
+            if other_id != cdr_id
+            and None not in (start, end, other_start, other_end)
+            and sessions_overlap(start, end, other_start, other_end, leeway_seconds=1)
+        ]
 
         # Combineer beide sets (A zelf + overlap)
-        df_combined = pd.concat([df_original, df_overlaps], ignore_index=True)
-
-        self.close()
-        return df_combined.drop_duplicates(subset="CDR_ID").to_dict(orient="records")
+        df_combined = pd.concat([target, df.iloc[overlaps]], ignore_index=True)
+        result_columns = [
+            "CDR_ID", "Start_datetime", "End_datetime", "Charge_Point_City", "Volume",
+            "Authentication_ID", "Charge_Point_ID", "Charge_Point_Country", "Calculated_Cost",
+        ]
+        return df_combined[result_columns].to_dict(orient="records")
 
     
     # Haalt alle statistieken per Authentication_ID op: aantal transacties, totaal volume en totale kosten
     def get_user_stats(self):
-        self.connect()
+        with self:
+            query = """
+            SELECT Authentication_ID, TransactionCount, TotalVolume, TotalCost
+            FROM UserStats
+            ORDER BY Authentication_ID
+            """
 
-        query = """
-        SELECT 
-            Authentication_ID,
-            COUNT(*) AS TransactionCount,
-            SUM(Volume) AS TotalVolume,
-            SUM(Calculated_Cost) AS TotalCost
-        FROM CDR
-        GROUP BY Authentication_ID
-        ORDER BY Authentication_ID
-        """
-
-        cursor = self.connection.cursor()
-        cursor.execute(query)
-        rows = cursor.fetchall()
-
-        columns = [desc[0] for desc in cursor.description]
-        result = [dict(zip(columns, row)) for row in rows]
+            cursor = self.connection.cursor()
+            cursor.execute(query)
+            rows = cursor.fetchall()
 
-        self.close()
+            columns = [desc[0] for desc in cursor.description]
+            result = [dict(zip(columns, row)) for row in rows]
         return result
     
 
     def get_overlapping_cluster(self, start_cdr_id: str) -> list[dict]:
-        self.connect()
-
-        visited = set()
-        to_visit = [start_cdr_id]
-        cluster = {}
-
-        while to_visit:
-            current_id = to_visit.pop()
-            if current_id in visited:
-                continue
-            visited.add(current_id)
-
-            overlapping = self.get_all_overlapping_for_cdr(current_id)
-            for session in overlapping:
-                cdr_id = session['CDR_ID']
-                if cdr_id not in cluster:
-                    cluster[cdr_id] = session
-                    if cdr_id not in visited:
-                        to_visit.append(cdr_id)
-
-        self.close()
+        with self:
+            visited = set()
+            to_visit = [start_cdr_id]
+            cluster = {}
+
+            while to_visit:
+                current_id = to_visit.pop()
+                if current_id in visited:
+                    continue
+                visited.add(current_id)
+
+                overlapping = self.get_all_overlapping_for_cdr(current_id)
+                for session in overlapping:
+                    cdr_id = session['CDR_ID']
+                    if cdr_id not in cluster:
+                        cluster[cdr_id] = session
+                        if cdr_id not in visited:
+                            to_visit.append(cdr_id)
         return list(cluster.values())
 
 
     def get_cdrs_by_authentication_id(self, auth_id: str) -> list[dict]:
         """Returns all CDR rows for a given Authentication_ID"""
-        self.connect()
-        query = """
-            SELECT 
-                CDR_ID,
-                Start_datetime,
-                End_datetime,
-                Duration,
-                Volume,
-                Charge_Point_ID,
-                Charge_Point_City,
-                Charge_Point_Country,
-                Calculated_Cost
-            FROM CDR
-            WHERE Authentication_ID = ?
-            ORDER BY Start_datetime DESC
-        """
-        cursor = self.connection.cursor()
-        cursor.execute(query, (auth_id,))
-        columns = [desc[0] for desc in cursor.description]
-        rows = cursor.fetchall()
-        self.close()
+        with self:
+            query = """
+                SELECT 
+                    CDR_ID,
+                    Start_datetime,
+                    End_datetime,
+                    Duration,
+                    Volume,
+                    Charge_Point_ID,
+                    Charge_Point_City,
+                    Charge_Point_Country,
+                    Calculated_Cost
+                FROM CDR
+                WHERE Authentication_ID = ?
+                ORDER BY Start_datetime DESC
+            """
+            cursor = self.connection.cursor()
+            cursor.execute(query, (auth_id,))
+            columns = [desc[0] for desc in cursor.description]
+            rows = cursor.fetchall()
         return [dict(zip(columns, row)) for row in rows]
     
     def get_cdrs_by_charge_point_id(self, charge_point_id: str) -> list[dict]:
         """Returns all CDR rows for a given Charge_Point_ID"""
-        self.connect()
-        query = """
-            SELECT 
-                CDR_ID,
-                Start_datetime,
-                End_datetime,
-                Duration,
-                Volume,
-                Authentication_ID,
-                Charge_Point_City,
-                Charge_Point_Country,
-                Calculated_Cost
-            FROM CDR
-            WHERE Charge_Point_ID = ?
-            ORDER BY Start_datetime DESC
-        """
-        cursor = self.connection.cursor()
-        cursor.execute(query, (charge_point_id,))
-        columns = [desc[0] for desc in cursor.description]
-        rows = cursor.fetchall()
-        self.close()
-        return [dict(zip(columns, row)) for row in rows]
\ No newline at end of file
+        with self:
+            query = """
+                SELECT 
+                    CDR_ID,
+                    Start_datetime,
+                    End_datetime,
+                    Duration,
+                    Volume,
+                    Authentication_ID,
+                    Charge_Point_City,
+                    Charge_Point_Country,
+                    Calculated_Cost
+                FROM CDR
+                WHERE Charge_Point_ID = ?
+                ORDER BY Start_datetime DESC
+            """
+            cursor = self.connection.cursor()
+            cursor.execute(query, (charge_point_id,))
+            columns = [desc[0] for desc in cursor.description]
+            rows = cursor.fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+
+
+def get_db():
+    """FastAPI dependency: a DbContext holding a pooled connection for the duration of the request."""
+    db = DbContext()
+    db.connect()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,196 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Pragmas every pooled connection gets
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",  # 64 MB page cache
+    "PRAGMA mmap_size=268435456",  # 256 MB memory-mapped I/O
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """Raised when no connection became available within the pool timeout."""
+
+
+class ConnectionPool:
+    """
+    A small thread-safe pool of SQLite connections for one database file.
+
+    Connections are opened lazily up to max_size, in WAL mode with the pragmas
+    above and a per-connection cache of prepared statements. Borrowers get a
+    connection for exclusive use and give it back with release() (or use the
+    connection() context manager); uncommitted work is rolled back on release,
+    just like closing a plain connection would.
+    """
+
+    def __init__(self, db_path: str, max_size: int = 8, timeout: float = 30.0, cached_statements: int = 256):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._borrowed = {}
+        self._closed = False
+
+        # Metrics
+        self._acquisitions = 0
+        self._timeouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._total_hold = 0.0
+        self._max_hold = 0.0
+
+    def _open_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """Borrow a connection, waiting up to `timeout` seconds when the pool is exhausted."""
+        requested = time.perf_counter()
+        conn = None
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_open = self._created < self.max_size
+                if can_open:
+                    self._created += 1
+            if can_open:
+                try:
+                    conn = self._open_connection()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self._timeouts += 1
+                    raise PoolTimeout(
+                        f"No connection to {self.db_path} available after {self.timeout:.0f}s"
+                    )
+
+        acquired = time.perf_counter()
+        wait = acquired - requested
+        with self._lock:
+            self._borrowed[id(conn)] = acquired
+            self._acquisitions += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+        return conn
+
+    def release(self, conn: sqlite3.Connection):
+        """Return a borrowed connection to the pool."""
+        with self._lock:
+            acquired = self._borrowed.pop(id(conn), None)
+            if acquired is None:
+                return  # not ours, or released twice
+            hold = time.perf_counter() - acquired
+            self._total_hold += hold
+            self._max_hold = max(self._max_hold, hold)
+
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Broken connection, don't hand it out again
+            self._discard(conn)
+            return
+        if self._closed:
+            self._discard(conn)
+            return
+        self._idle.put(conn)
+
+    def _discard(self, conn: sqlite3.Connection):
+        with self._lock:
+            self._created -= 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """Context manager that borrows a connection and always gives it back."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def stats(self) -> dict:
+        """Pool size and wait/hold time metrics (milliseconds)."""
+        with self._lock:
+            acquisitions = self._acquisitions
+            released = acquisitions - len(self._borrowed)
+            return {
+                "db_path": self.db_path,
+                "max_size": self.max_size,
+                "open_connections": self._created,
+                "in_use": len(self._borrowed),
+                "idle": self._idle.qsize(),
+                "acquisitions": acquisitions,
+                "timeouts": self._timeouts,
+                "avg_wait_ms": round(self._total_wait / acquisitions * 1000, 3) if acquisitions else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 3),
+                "avg_hold_ms": round(self._total_hold / released * 1000, 3) if released else 0.0,
+                "max_hold_ms": round(self._max_hold * 1000, 3),
+            }
+
+    def close_all(self):
+        """Close every idle connection; borrowed ones are closed when they come back."""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str) -> ConnectionPool:
+    """The shared pool for a database file (one per absolute path)."""
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(key)
+            _pools[key] = pool
+        return pool
+
+
+def pool_stats() -> list:
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.stats() for pool in pools]
+
+
+def close_all_pools():
+    """Close all idle pooled connections, e.g. before removing a database file."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_all()
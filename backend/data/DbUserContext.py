@@ -1,9 +1,9 @@
-import sqlite3
 
 # from datetime import datetime
 import pandas as pd
 import os
 import bcrypt
+from backend.data.DbPool import get_pool
 
 class Hashing:
     def hash_password(self, plain_password: str) -> str:
@@ -22,13 +22,22 @@ class DbUserContext:
         base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         # Construct the correct db path
         self.db_name = os.path.join(base_dir, db_name)
-        print("Database path:", self.db_name)
         self.connection = None
+        self._pool = None
 
     def connect(self):
-        """Establish a connection to the SQLite database."""
-        self.connection = sqlite3.connect(self.db_name)
-        print(f"Connected to {self.db_name}")
+        """Borrow a connection to the SQLite database from the shared pool."""
+        if self.connection is None:
+            self._pool = get_pool(self.db_name)
+            self.connection = self._pool.acquire()
+
+    def __enter__(self):
+        """`with DbUserContext() as db:` borrows a connection and gives it back on every path."""
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
     def create_table(self, table_name, schema):
         if self.connection:
@@ -41,33 +50,31 @@ class DbUserContext:
 
     def initialize_user_database(self):
         """Initialize the database by creating all required tables."""
-        self.connect()
+        with self:
+            # Define the schema for the USERS table
+            user_schema = """
+                User_ID TEXT PRIMARY KEY,
+                User_Name TEXT,
+                User_Password TEXT 
+            """
 
-        # Define the schema for the USERS table
-        user_schema = """
-            User_ID TEXT PRIMARY KEY,
-            User_Name TEXT,
-            User_Password TEXT 
-        """
-
-        self.create_table("USERS", user_schema)
+            self.create_table("USERS", user_schema)
 
-        cursor = self.connection.cursor()
-        cursor.execute("SELECT 1 FROM USERS WHERE User_ID = ?", ('1',))
-        if cursor.fetchone() is None:
-            # Hash the password before inserting
-            hasher = Hashing()
-            hashed_password = hasher.hash_password('Admin')
-
-            cursor.execute(
-                "INSERT INTO USERS (User_ID, User_Name, User_Password) VALUES (?, ?, ?)",
-                ('1', 'Admin', hashed_password)
-            )
-            self.connection.commit()
-            print("Default admin user inserted.")
-        else:
-            print("Default admin user already exists.")
-        self.close()
+            cursor = self.connection.cursor()
+            cursor.execute("SELECT 1 FROM USERS WHERE User_ID = ?", ('1',))
+            if cursor.fetchone() is None:
+                # Hash the password before inserting
+                hasher = Hashing()
+                hashed_password = hasher.hash_password('Admin')
+
+                cursor.execute(
+                    "INSERT INTO USERS (User_ID, User_Name, User_Password) VALUES (?, ?, ?)",
+                    ('1', 'Admin', hashed_password)
+                )
+                self.connection.commit()
+                print("Default admin user inserted.")
+            else:
+                print("Default admin user already exists.")
 
     def insert_user(self, user_data):
         """Insert a new USER record with:
@@ -143,9 +150,9 @@ class DbUserContext:
         return None
 
     def close(self):
-        """Close the database connection."""
+        """Give the database connection back to the pool."""
         if self.connection:
-            self.connection.close()
-            print(f"Connection to {self.db_name} closed.")
+            self._pool.release(self.connection)
+            self.connection = None
     
     
\ No newline at end of file
@@ -6,17 +6,13 @@ class GetAll:
         self.data = None
 
     def fetch_data(self):
-        db = DbContext()
-        db.connect()
-        self.data = db.GetAllDataFromDatabase()
-        db.close()
+        with DbContext() as db:
+            self.data = db.GetAllDataFromDatabase()
         return self.data
     
     def fetch_one_data(self, cdr_id):
-        db = DbContext()
-        db.connect()
-        self.data = db.get_cdr(cdr_id)
-        db.close()
+        with DbContext() as db:
+            self.data = db.get_cdr(cdr_id)
         return self.data
     
     def parse_import_log_line(self, line: str):
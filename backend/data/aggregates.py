@@ -0,0 +1,174 @@
+from backend.data.migrations import REASON_FIELDS, table_columns
+
+# Materialized GROUP BY results over CDR joined with FraudCase. Rows are
+# rebuilt per key: fully after a full fraud detection run, for the
+# users/charge points of imported or inserted CDRs, and for those of the
+# CDRs whose fraud case an incremental run changed.
+_REASON_COUNT_COLUMNS = [f"{field}_count" for field in REASON_FIELDS]
+
+AGGREGATES = {
+    "UserStats": {
+        "keys": ["Authentication_ID"],
+        "measures": ["TransactionCount", "TotalVolume", "TotalCost", "FraudCount"],
+    },
+    "ChargePointStats": {
+        "keys": ["Charge_Point_ID", "Charge_Point_Country"],
+        "measures": ["transaction_count", "total_volume", "total_cost", "fraud_count"],
+    },
+}
+
+AGGREGATE_INDEXES = {
+    "idx_userstats_auth": "UserStats(Authentication_ID)",
+    "idx_userstats_fraud": "UserStats(FraudCount)",
+    "idx_cpstats_cp": "ChargePointStats(Charge_Point_ID)",
+    "idx_cpstats_count": "ChargePointStats(transaction_count DESC, Charge_Point_ID)",
+    "idx_cpstats_fraud": "ChargePointStats(fraud_count)",
+}
+
+
+def reason_count_column(reason: str) -> str:
+    """Per-reason count column for a FraudCase reason field; raises ValueError for anything else."""
+    if reason not in REASON_FIELDS:
+        raise ValueError(f"Unknown reason: {reason}")
+    return f"{reason}_count"
+
+
+def _select(table: str, source: str = "CDR c", fraud_cases: str = "FraudCase") -> str:
+    keys = AGGREGATES[table]["keys"]
+    count, volume, cost, fraud = AGGREGATES[table]["measures"]
+    reason_counts = ",\n        ".join(
+        f"COUNT(f.{field}) AS {column}" for field, column in zip(REASON_FIELDS, _REASON_COUNT_COLUMNS)
+    )
+    return f"""
+        SELECT {", ".join(f"c.{key}" for key in keys)},
+        COUNT(*) AS {count},
+        SUM(c.Volume) AS {volume},
+        SUM(c.Calculated_Cost) AS {cost},
+        COUNT(f.CDR_ID) AS {fraud},
+        {reason_counts}
+        FROM {source}
+        LEFT JOIN {fraud_cases} f ON f.CDR_ID = c.CDR_ID
+    """
+
+
+def _group_by(table: str) -> str:
+    return "GROUP BY " + ", ".join(f"c.{key}" for key in AGGREGATES[table]["keys"])
+
+
+# CDR columns the aggregates are computed from
+_SOURCE_COLUMNS = {"CDR_ID", "Authentication_ID", "Charge_Point_ID", "Charge_Point_Country", "Volume", "Calculated_Cost"}
+
+
+def _table_exists(cursor, name: str) -> bool:
+    # FraudCase is a view over FraudFinding
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type IN ('table', 'view') AND name = ?", (name,))
+    return cursor.fetchone() is not None
+
+
+def _can_aggregate(cursor) -> bool:
+    """False for a missing or partial CDR table, which leaves the aggregates alone."""
+    return _SOURCE_COLUMNS.issubset(table_columns(cursor, "CDR"))
+
+
+def create_aggregate_tables(cursor):
+    """Create UserStats and ChargePointStats, filling them from CDR when they are new."""
+    created = False
+    for table, spec in AGGREGATES.items():
+        if _table_exists(cursor, table):
+            continue
+        count, volume, cost, fraud = spec["measures"]
+        columns = [f"{key} TEXT" for key in spec["keys"]] + [
+            f"{count} INTEGER NOT NULL",
+            f"{volume} REAL",
+            f"{cost} REAL",
+            f"{fraud} INTEGER NOT NULL",
+        ] + [f"{column} INTEGER NOT NULL" for column in _REASON_COUNT_COLUMNS]
+        cursor.execute(f"CREATE TABLE {table} ({', '.join(columns)})")
+        created = True
+
+    for name, target in AGGREGATE_INDEXES.items():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+
+    if created:
+        rebuild_aggregates(cursor)
+
+
+def _fraud_cases(cursor) -> str:
+    if _table_exists(cursor, "FraudCase"):
+        return "FraudCase"
+    # Detection never ran, every fraud count is 0
+    return "(SELECT " + ", ".join(f"NULL AS {column}" for column in ("CDR_ID",) + REASON_FIELDS) + ")"
+
+
+def _stale_keys(cursor, table: str) -> str:
+    """Temp table of keys whose CDRs moved to another key, for this connection's next refresh."""
+    name = f"temp.StaleKeys{table}"
+    cursor.execute(
+        f"CREATE TEMP TABLE IF NOT EXISTS StaleKeys{table} AS "
+        f"SELECT {', '.join(AGGREGATES[table]['keys'])} FROM CDR WHERE 0"
+    )
+    return name
+
+
+def stage_aggregate_keys(cursor, cdr_ids_query: str, params: tuple = ()):
+    """
+    Remember the current keys of some CDRs before their Authentication_ID or
+    Charge_Point_ID is rewritten. The next refresh_aggregates on this
+    connection rebuilds those keys as well, or drops them when no CDR is left.
+    """
+    if not _can_aggregate(cursor):
+        return
+    for table, spec in AGGREGATES.items():
+        keys = ", ".join(spec["keys"])
+        cursor.execute(
+            f"INSERT INTO {_stale_keys(cursor, table)} SELECT {keys} FROM CDR WHERE CDR_ID IN ({cdr_ids_query})",
+            params,
+        )
+
+
+def rebuild_aggregates(cursor):
+    """Recompute both aggregate tables from scratch."""
+    if not (_can_aggregate(cursor) and _table_exists(cursor, "UserStats")):
+        return
+    fraud_cases = _fraud_cases(cursor)
+    for table in AGGREGATES:
+        cursor.execute(f"DELETE FROM {_stale_keys(cursor, table)}")
+        cursor.execute(f"DELETE FROM {table}")
+        cursor.execute(f"INSERT INTO {table} {_select(table, fraud_cases=fraud_cases)} {_group_by(table)}")
+
+
+def refresh_aggregates(cursor, cdr_ids_query: str, params: tuple = ()):
+    """
+    Recompute the aggregate rows of the users and charge points of some CDRs.
+
+    cdr_ids_query selects the CDR_IDs that were imported or whose fraud
+    cases changed; every key they belong to, and every key staged by
+    stage_aggregate_keys, is rebuilt from CDR, so the cost follows the size
+    of those groups rather than of the table. Keys are matched with IS,
+    NULL Authentication_IDs form a group of their own.
+    """
+    if not (_can_aggregate(cursor) and _table_exists(cursor, "UserStats")):
+        return
+    fraud_cases = _fraud_cases(cursor)
+    for table, spec in AGGREGATES.items():
+        keys = spec["keys"]
+        stale = _stale_keys(cursor, table)
+        cursor.execute("DROP TABLE IF EXISTS temp.AggregateKeys")
+        # UNION also removes the duplicate NULL keys
+        cursor.execute(f"""
+            CREATE TEMP TABLE AggregateKeys AS
+            SELECT {", ".join(keys)} FROM CDR
+            WHERE CDR_ID IN ({cdr_ids_query})
+            UNION SELECT {", ".join(keys)} FROM {stale}
+        """, params)
+        cursor.execute(f"DELETE FROM {stale}")
+        match = " AND ".join(f"k.{key} IS {{alias}}.{key}" for key in keys)
+        cursor.execute(f"""
+            DELETE FROM {table} WHERE rowid IN (
+                SELECT s.rowid FROM temp.AggregateKeys k JOIN {table} s ON {match.format(alias='s')}
+            )
+        """)
+        # CROSS JOIN keeps the keys as the outer loop, so the (key, Start_epoch) indexes find the groups
+        source = f"temp.AggregateKeys k CROSS JOIN CDR c ON {match.format(alias='c')}"
+        cursor.execute(f"INSERT INTO {table} {_select(table, source, fraud_cases)} {_group_by(table)}")
+    cursor.execute("DROP TABLE IF EXISTS temp.AggregateKeys")
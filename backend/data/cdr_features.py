@@ -0,0 +1,136 @@
+from typing import Iterable, Optional
+
+import pandas as pd
+
+from backend.data.migrations import cdr_epoch_columns
+from backend.fraude_detectie.columnar import duration_minutes_series, to_float_series
+
+# One row per CDR with the values the detection rules compare with their
+# thresholds, parsed and windowed once instead of on every run. Volume and
+# duration are NULL where they don't parse; Cost_per_kWh is NULL where
+# detect_high_cost_low_volume skips the CDR (no cost or volume, or a zero
+# volume). Prev_* describe the previous session of the same user at the
+# same charge point, Travel_* the previous session of the same user
+# anywhere. Distances are not stored: coordinates are geocoded after import.
+CDR_FEATURE_SCHEMA = """
+    CDR_ID TEXT PRIMARY KEY,
+    Volume_kWh REAL,
+    Duration_Minutes REAL,
+    Cost REAL,
+    Cost_per_kWh REAL,
+    Prev_CDR_ID TEXT,
+    Prev_Gap_Seconds INTEGER,
+    Travel_Prev_CDR_ID TEXT,
+    Travel_Gap_Minutes REAL
+"""
+
+CDR_FEATURE_COLUMNS = (
+    "CDR_ID", "Volume_kWh", "Duration_Minutes", "Cost", "Cost_per_kWh",
+    "Prev_CDR_ID", "Prev_Gap_Seconds", "Travel_Prev_CDR_ID", "Travel_Gap_Minutes",
+)
+
+# The range scans of the volume, consecutive sessions and travel rules
+CDR_FEATURE_INDEXES = {
+    "idx_cdrfeatures_volume": "CdrFeatures(Volume_kWh)",
+    "idx_cdrfeatures_prev_gap": "CdrFeatures(Prev_Gap_Seconds)",
+    "idx_cdrfeatures_travel_gap": "CdrFeatures(Travel_Gap_Minutes)",
+}
+
+
+def create_cdr_feature_table(cursor):
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS CdrFeatures ({CDR_FEATURE_SCHEMA})")
+    for name, target in CDR_FEATURE_INDEXES.items():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+
+
+def _stage_users(cursor, users: Iterable) -> str:
+    cursor.execute("CREATE TEMP TABLE IF NOT EXISTS FeatureUsers (Authentication_ID TEXT)")
+    cursor.execute("DELETE FROM temp.FeatureUsers")
+    cursor.executemany("INSERT INTO temp.FeatureUsers VALUES (?)", ((user,) for user in set(users)))
+    # IS, so the sessions without an Authentication_ID are a user of their own
+    return "JOIN temp.FeatureUsers u ON c.Authentication_ID IS u.Authentication_ID"
+
+
+def compute_cdr_features(cursor, users: Optional[Iterable] = None) -> pd.DataFrame:
+    """
+    CdrFeatures rows for every CDR, or for every CDR of the given Authentication_IDs.
+
+    Both windows are per user, so the sessions of a user are all that is
+    needed to compute theirs. Ties in start time are broken the way
+    detect_impossible_travel reads idx_cdr_auth_start: by end time, then
+    rowid.
+    """
+    join = _stage_users(cursor, users) if users is not None else ""
+    # Sessions without a user or a time have no travel, and are no one's predecessor
+    travels = "Authentication_ID IS NOT NULL AND Start_epoch IS NOT NULL AND End_epoch IS NOT NULL"
+    features = pd.read_sql_query(
+        f"""
+        SELECT CDR_ID, Volume, Duration, Calculated_Cost,
+               LAG(CDR_ID) OVER w AS Prev_CDR_ID,
+               Start_epoch - LAG(End_epoch) OVER w AS Prev_Gap_Seconds,
+               CASE WHEN {travels} THEN LAG(CDR_ID) OVER t END AS Travel_Prev_CDR_ID,
+               CASE WHEN {travels} THEN (Start_epoch - LAG(End_epoch) OVER t) / 60.0 END AS Travel_Gap_Minutes
+        FROM (
+            SELECT c.rowid AS Row, c.CDR_ID, c.Authentication_ID, c.Charge_Point_ID,
+                   c.Volume, c.Duration, c.Calculated_Cost, {cdr_epoch_columns(cursor, "c")}
+            FROM CDR c
+            {join}
+        )
+        WINDOW w AS (PARTITION BY Authentication_ID, Charge_Point_ID ORDER BY Start_epoch, Row),
+               t AS (PARTITION BY Authentication_ID, {travels} ORDER BY Start_epoch, End_epoch, Row)
+        """,
+        cursor.connection,
+    )
+    volume = to_float_series(features["Volume"])
+    cost = pd.to_numeric(features["Calculated_Cost"], errors="coerce").astype("float64")
+    features["Volume_kWh"] = volume
+    features["Duration_Minutes"] = duration_minutes_series(features["Duration"])
+    features["Cost"] = cost
+    features["Cost_per_kWh"] = cost / volume.where(volume != 0)
+    return features[list(CDR_FEATURE_COLUMNS)]
+
+
+def refresh_cdr_features(cursor, users: Optional[Iterable] = None):
+    """
+    Recompute CdrFeatures for every CDR, or for every CDR of the given Authentication_IDs.
+
+    Call it with the users of new sessions, and with both the old and the
+    new ID of a user whose sessions changed Authentication_ID or
+    Charge_Point_ID, since that changes which session comes before which.
+    """
+    create_cdr_feature_table(cursor)
+    features = compute_cdr_features(cursor, users)
+    if users is None:
+        cursor.execute("DELETE FROM CdrFeatures")
+    # NaN is not NULL to SQLite
+    rows = features.astype(object).where(features.notna(), None)
+    cursor.executemany(
+        f"INSERT OR REPLACE INTO CdrFeatures ({', '.join(CDR_FEATURE_COLUMNS)}) "
+        f"VALUES ({', '.join('?' * len(CDR_FEATURE_COLUMNS))})",
+        rows.itertuples(index=False, name=None),
+    )
+
+
+def ensure_cdr_features(cursor):
+    """Create CdrFeatures and compute it for the users of CDRs that have no features yet."""
+    create_cdr_feature_table(cursor)
+    cursor.execute("SELECT 1 FROM CdrFeatures LIMIT 1")
+    if cursor.fetchone() is None:
+        refresh_cdr_features(cursor)
+        return
+    cursor.execute("""
+        SELECT DISTINCT Authentication_ID FROM CDR c
+        WHERE NOT EXISTS (SELECT 1 FROM CdrFeatures f WHERE f.CDR_ID = c.CDR_ID)
+    """)
+    users = [row[0] for row in cursor.fetchall()]
+    if users:
+        refresh_cdr_features(cursor, users)
+
+
+def cdr_features_complete(cursor) -> bool:
+    """True when CdrFeatures exists and has a row for every CDR."""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'CdrFeatures'")
+    if cursor.fetchone() is None:
+        return False
+    cursor.execute("SELECT (SELECT COUNT(*) FROM CdrFeatures) = (SELECT COUNT(*) FROM CDR)")
+    return bool(cursor.fetchone()[0])
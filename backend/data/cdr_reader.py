@@ -0,0 +1,124 @@
+import csv
+import math
+import os
+from datetime import date, datetime, time, timedelta
+from itertools import islice
+from typing import Iterator, List
+
+import pandas as pd
+
+# Columns every imported CDR file must contain, in CDR table order
+CDR_COLUMNS = [
+    "CDR_ID",
+    "Start_datetime",
+    "End_datetime",
+    "Duration",
+    "Volume",
+    "Charge_Point_Address",
+    "Charge_Point_ZIP",
+    "Charge_Point_City",
+    "Charge_Point_Country",
+    "Charge_Point_Type",
+    "Product_Type",
+    "Tariff_Type",
+    "Authentication_ID",
+    "Contract_ID",
+    "Meter_ID",
+    "OBIS_Code",
+    "Charge_Point_ID",
+    "Service_Provider_ID",
+    "Infra_Provider_ID",
+    "Calculated_Cost",
+]
+
+SUPPORTED_EXTENSIONS = (".xlsx", ".xls", ".csv")
+
+
+def _cell_value(value):
+    """Convert a spreadsheet cell to something sqlite3 can bind, the way the CDR table stores it."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value if value != "" else None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat(" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, time):
+        return value.strftime("%H:%M:%S")
+    if isinstance(value, timedelta):
+        seconds = int(value.total_seconds())
+        return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    return value
+
+
+def _xlsx_rows(file_path: str) -> Iterator[tuple]:
+    from openpyxl import load_workbook
+
+    # read_only streams the sheet XML instead of building the whole workbook in memory
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _csv_rows(file_path: str) -> Iterator[list]:
+    with open(file_path, newline="", encoding="utf-8-sig") as handle:
+        yield from csv.reader(handle)
+
+
+def _xls_rows(file_path: str) -> Iterator[tuple]:
+    # The legacy binary format has no streaming reader, so it is loaded as a whole
+    df = pd.read_excel(file_path, header=None, dtype=object)
+    yield from df.itertuples(index=False, name=None)
+
+
+def _raw_rows(file_path: str) -> Iterator[tuple]:
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == ".csv":
+        return _csv_rows(file_path)
+    if extension == ".xls":
+        return _xls_rows(file_path)
+    return _xlsx_rows(file_path)
+
+
+def read_cdr_rows(file_path: str) -> Iterator[tuple]:
+    """
+    Stream the CDR rows of an Excel (.xlsx/.xls) or CSV file.
+
+    The first row is the header. Rows are yielded one at a time as tuples in
+    CDR_COLUMNS order with cells converted for SQLite; blank rows are skipped.
+    Raises ValueError when required columns are missing.
+    """
+    rows = _raw_rows(file_path)
+    header = next(rows, None) or ()
+    names = [str(name) if name is not None else None for name in header]
+
+    missing_columns = [col for col in CDR_COLUMNS if col not in names]
+    if missing_columns:
+        rows.close()
+        raise ValueError(f"Missing required columns in Excel file: {missing_columns}")
+
+    positions = [names.index(col) for col in CDR_COLUMNS]
+    width = len(names)
+    try:
+        for row in rows:
+            if len(row) < width:
+                row = tuple(row) + (None,) * (width - len(row))
+            values = tuple(_cell_value(row[position]) for position in positions)
+            if any(value is not None for value in values):
+                yield values
+    finally:
+        rows.close()
+
+
+def iter_batches(rows: Iterator[tuple], batch_size: int) -> Iterator[List[tuple]]:
+    """Group rows into lists of at most batch_size rows."""
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
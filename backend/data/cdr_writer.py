@@ -0,0 +1,63 @@
+import csv
+import io
+import zlib
+from typing import Iterable, Iterator, List, Sequence
+
+# gzip container (header + crc trailer) for zlib.compressobj
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def csv_chunks(header: Sequence[str], pages: Iterable[List[tuple]], compress: bool = False) -> Iterator[bytes]:
+    """
+    Encode pages of rows as CSV, one bytes chunk per page.
+
+    With compress=True the chunks together form a single gzip stream, so
+    the response can be sent with Content-Encoding: gzip.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, _GZIP_WBITS) if compress else None
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+
+    for page in pages:
+        writer.writerows(page)
+        chunk = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        if compressor:
+            chunk = compressor.compress(chunk)
+        if chunk:
+            yield chunk
+
+    if compressor:
+        yield compressor.compress(buffer.getvalue().encode("utf-8")) + compressor.flush()
+    elif buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def write_xlsx(path: str, header: Sequence[str], pages: Iterable[List[tuple]]) -> int:
+    """Write pages of rows to an .xlsx file with a write-only workbook; returns the number of rows."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(list(header))
+    rows = 0
+    for page in pages:
+        for row in page:
+            sheet.append(row)
+        rows += len(page)
+    workbook.save(path)
+    return rows
+
+
+def write_csv(path: str, header: Sequence[str], pages: Iterable[List[tuple]]) -> int:
+    """Write pages of rows to a CSV file; returns the number of rows."""
+    rows = 0
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(header)
+        for page in pages:
+            writer.writerows(page)
+            rows += len(page)
+    return rows
@@ -0,0 +1,104 @@
+from typing import Optional, Tuple
+
+from backend.data.migrations import table_columns
+
+# Geocode_Status values of a charge point
+PENDING = "pending"
+FOUND = "found"
+NOT_FOUND = "not_found"
+FAILED = "failed"
+
+# One row per charge point: its address as the latest session reported it
+# and the coordinates geocoding found for that address. CDRs refer to it by
+# Charge_Point_ID, so geocoding writes one row instead of every session.
+CHARGE_POINT_SCHEMA = f"""
+    Charge_Point_ID TEXT PRIMARY KEY,
+    Address TEXT,
+    ZIP TEXT,
+    City TEXT,
+    Country TEXT,
+    Latitude REAL,
+    Longitude REAL,
+    Geocode_Status TEXT NOT NULL DEFAULT '{PENDING}',
+    Geocoded_at REAL
+"""
+
+CHARGE_POINT_INDEXES = {
+    "idx_chargepoint_status": "ChargePoint(Geocode_Status)",
+}
+
+_ADDRESS_COLUMNS = ("Charge_Point_Address", "Charge_Point_ZIP", "Charge_Point_City", "Charge_Point_Country")
+
+
+def _table_exists(cursor, name: str) -> bool:
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+    return cursor.fetchone() is not None
+
+
+def create_charge_point_table(cursor):
+    """Create ChargePoint, filling it from CDR when it is new."""
+    if _table_exists(cursor, "ChargePoint"):
+        created = False
+    else:
+        cursor.execute(f"CREATE TABLE ChargePoint ({CHARGE_POINT_SCHEMA})")
+        created = True
+    for name, target in CHARGE_POINT_INDEXES.items():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+    if created:
+        sync_charge_points(cursor)
+
+
+def sync_charge_points(cursor, where: str = "", params: tuple = ()):
+    """
+    Upsert the charge points of the CDRs matching `where` into ChargePoint.
+
+    The address of a charge point is taken from its latest session. New
+    charge points start out pending; a charge point whose address changed
+    loses its coordinates and is geocoded again. Coordinates that older
+    databases stored on CDR itself are carried over.
+    """
+    columns = table_columns(cursor, "CDR")
+    if not (_table_exists(cursor, "ChargePoint") and {"Charge_Point_ID", *_ADDRESS_COLUMNS}.issubset(columns)):
+        return
+    # The address comes from the latest of all sessions of a charge point, not just the matching ones
+    scope = f"AND Charge_Point_ID IN (SELECT Charge_Point_ID FROM CDR WHERE {where})" if where else ""
+    order = "ORDER BY Start_epoch DESC" if "Start_epoch" in columns else ""
+    if "Latitude" in columns and "Longitude" in columns:
+        coordinates = "MAX(Latitude) OVER cp AS Latitude, MAX(Longitude) OVER cp AS Longitude"
+    else:
+        coordinates = "NULL AS Latitude, NULL AS Longitude"
+    cursor.execute(f"""
+        INSERT INTO ChargePoint (Charge_Point_ID, Address, ZIP, City, Country, Latitude, Longitude, Geocode_Status)
+        SELECT Charge_Point_ID, Address, ZIP, City, Country, Latitude, Longitude,
+               CASE WHEN Latitude IS NULL THEN '{PENDING}' ELSE '{FOUND}' END
+        FROM (
+            SELECT Charge_Point_ID,
+                   Charge_Point_Address AS Address, Charge_Point_ZIP AS ZIP,
+                   Charge_Point_City AS City, Charge_Point_Country AS Country,
+                   {coordinates},
+                   ROW_NUMBER() OVER (PARTITION BY Charge_Point_ID {order}) AS session_rank
+            FROM CDR
+            WHERE Charge_Point_ID IS NOT NULL {scope}
+            WINDOW cp AS (PARTITION BY Charge_Point_ID)
+        )
+        WHERE session_rank = 1
+        ON CONFLICT(Charge_Point_ID) DO UPDATE SET
+            Address = excluded.Address,
+            ZIP = excluded.ZIP,
+            City = excluded.City,
+            Country = excluded.Country,
+            Latitude = NULL,
+            Longitude = NULL,
+            Geocode_Status = '{PENDING}',
+            Geocoded_at = NULL
+        WHERE (Address, ZIP, City, Country) IS NOT (excluded.Address, excluded.ZIP, excluded.City, excluded.Country)
+    """, params)
+
+
+def charge_point_coordinates(cursor, charge_point_id: str) -> Tuple[Optional[float], Optional[float]]:
+    """(latitude, longitude) of a charge point, (None, None) when it is not geocoded."""
+    if not _table_exists(cursor, "ChargePoint"):
+        return None, None
+    cursor.execute("SELECT Latitude, Longitude FROM ChargePoint WHERE Charge_Point_ID = ?", (charge_point_id,))
+    row = cursor.fetchone()
+    return (row[0], row[1]) if row else (None, None)
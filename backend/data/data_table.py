@@ -0,0 +1,233 @@
+import base64
+import binascii
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from backend.data.fraud_findings import rule_id
+from backend.data.timestamps import to_epoch
+
+# sort_by values of /api/data-table and the CDR column behind each, every one
+# backed by a (column, CDR_ID) index, see CDR_INDEXES
+SORT_COLUMNS = {
+    "start_datetime": "Start_epoch",
+    "volume": "Volume",
+    "calculated_cost": "Calculated_Cost",
+}
+
+# Seconds a total is reused for the same filters while FraudFinding is unchanged
+COUNT_TTL = 30.0
+
+_SELECT = """
+    SELECT
+        CDR.CDR_ID as id,
+        CDR.Authentication_ID as authentication_id,
+        CDR.Start_datetime as start_datetime,
+        CDR.Duration as duration,
+        CDR.Volume as volume,
+        CDR.Charge_Point_ID as charge_point_id,
+        CDR.Calculated_Cost as calculated_cost,
+        {sort_column} as sort_key
+    FROM CDR
+    INNER JOIN FraudCase ON CDR.CDR_ID = FraudCase.CDR_ID
+"""
+
+
+@dataclass
+class DataTableFilters:
+    search: Optional[str] = None
+    authentication_id: Optional[str] = None
+    charge_point_id: Optional[str] = None
+    reason: Optional[str] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+
+    def where(self) -> Tuple[List[str], list]:
+        """SQL conditions and parameters; raises ValueError for an unknown reason."""
+        conditions, params = [], []
+        if self.search:
+            conditions.append("LOWER(CDR.Authentication_ID) LIKE ?")
+            params.append(f"%{self.search.lower()}%")
+        if self.authentication_id:
+            conditions.append("CDR.Authentication_ID = ?")
+            params.append(self.authentication_id)
+        if self.charge_point_id:
+            conditions.append("CDR.Charge_Point_ID = ?")
+            params.append(self.charge_point_id)
+        if self.reason:
+            # A range scan of idx_fraudfinding_rule
+            conditions.append("CDR.CDR_ID IN (SELECT CDR_ID FROM FraudFinding WHERE Rule_ID = ?)")
+            params.append(rule_id(self.reason))
+        # An unparseable date binds NULL and matches nothing, like the export
+        if self.start_date:
+            conditions.append("CDR.Start_epoch >= ?")
+            params.append(to_epoch(self.start_date))
+        if self.end_date:
+            conditions.append("CDR.Start_epoch <= ?")
+            params.append(to_epoch(self.end_date))
+        return conditions, params
+
+
+def encode_cursor(sort_by: str, sort_dir: str, key, cdr_id: str) -> str:
+    payload = json.dumps([sort_by, sort_dir, key, cdr_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(token: str, sort_by: str, sort_dir: str) -> Tuple[object, str]:
+    """(sort key, CDR_ID) of the last row of the previous page; raises ValueError for a bad token."""
+    try:
+        cursor_sort, cursor_dir, key, cdr_id = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError("Invalid cursor")
+    if (cursor_sort, cursor_dir) != (sort_by, sort_dir):
+        raise ValueError("Cursor belongs to a different sort order")
+    return key, cdr_id
+
+
+def _segments(column: str, descending: bool, after) -> List[Tuple[str, list]]:
+    """
+    Seek conditions, in page order, for the rows that follow `after`.
+
+    SQLite sorts NULL first, and a row value comparison never matches
+    NULL, so the NULL and non-NULL sort keys are read as separate ranges
+    of the (column, CDR_ID) index.
+    """
+    op = "<" if descending else ">"
+    nulls, values = f"{column} IS NULL", f"{column} IS NOT NULL"
+    if after is None:
+        ranges = [(values, []), (nulls, [])]
+        return ranges if descending else ranges[::-1]
+
+    key, cdr_id = after
+    if key is None:
+        null_rest = (f"{nulls} AND CDR.CDR_ID {op} ?", [cdr_id])
+        return [null_rest] if descending else [null_rest, (values, [])]
+
+    value_rest = (f"({column}, CDR.CDR_ID) {op} (?, ?)", [key, cdr_id])
+    return [value_rest, (nulls, [])] if descending else [value_rest]
+
+
+@dataclass
+class _CachedCount:
+    fingerprint: tuple
+    expires: float
+    total: int
+
+
+@dataclass
+class CountCache:
+    """Totals per (database, filter) that are reused until FraudFinding changes or the TTL passes."""
+    ttl: float = COUNT_TTL
+    _entries: dict = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def get(self, key, fingerprint: tuple) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and entry.fingerprint == fingerprint and entry.expires > time.monotonic():
+            return entry.total
+        return None
+
+    def put(self, key, fingerprint: tuple, total: int):
+        with self._lock:
+            self._entries[key] = _CachedCount(fingerprint, time.monotonic() + self.ttl, total)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+count_cache = CountCache()
+
+
+def _fingerprint(cursor) -> tuple:
+    # Both are rowid lookups at the end of the table, so this stays O(1)
+    cursor.execute("SELECT (SELECT MAX(rowid) FROM FraudFinding), (SELECT MAX(rowid) FROM CDR)")
+    return tuple(cursor.fetchone())
+
+
+def count_rows(cursor, db_name: str, conditions: List[str], params: list) -> int:
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    key = (db_name, where, tuple(params))
+    fingerprint = _fingerprint(cursor)
+    total = count_cache.get(key, fingerprint)
+    if total is None:
+        cursor.execute(
+            f"SELECT COUNT(*) FROM CDR INNER JOIN FraudCase ON CDR.CDR_ID = FraudCase.CDR_ID {where}",
+            params,
+        )
+        total = cursor.fetchone()[0]
+        count_cache.put(key, fingerprint, total)
+    return total
+
+
+def fetch_page(
+    cursor,
+    db_name: str,
+    filters: DataTableFilters,
+    sort_by: str = "start_datetime",
+    sort_dir: str = "desc",
+    page_size: int = 20,
+    after: Optional[str] = None,
+    offset: int = 0,
+) -> dict:
+    """
+    One page of fraud rows joined with CDR, with keyset pagination on (sort column, CDR_ID).
+
+    `after` is the nextCursor of the previous page. Each page is an index
+    seek from the last row seen, so it costs the same at any depth.
+    `offset` skips rows instead, for clients of the deprecated page
+    parameter; that cost grows with the depth. Raises ValueError for an
+    unknown sort, reason or cursor.
+    """
+    if sort_by not in SORT_COLUMNS:
+        raise ValueError(f"Unknown sort column: {sort_by}")
+    if sort_dir not in ("asc", "desc"):
+        raise ValueError(f"Unknown sort direction: {sort_dir}")
+
+    column = f"CDR.{SORT_COLUMNS[sort_by]}"
+    descending = sort_dir == "desc"
+    conditions, params = filters.where()
+    seek = decode_cursor(after, sort_by, sort_dir) if after else None
+    order = f"ORDER BY {column} {sort_dir.upper()}, CDR.CDR_ID {sort_dir.upper()}"
+
+    rows = []
+    # One extra row tells whether there is a next page
+    for condition, seek_params in _segments(column, descending, seek):
+        remaining = page_size + 1 - len(rows)
+        if remaining <= 0:
+            break
+        where = " AND ".join(conditions + [condition])
+        cursor.execute(
+            f"{_SELECT.format(sort_column=column)} WHERE {where} {order} LIMIT ? OFFSET ?",
+            params + seek_params + [remaining, offset],
+        )
+        names = [description[0] for description in cursor.description]
+        segment_rows = cursor.fetchall()
+        rows.extend(dict(zip(names, row)) for row in segment_rows)
+        if offset and not segment_rows:
+            # The offset runs on into the next range
+            cursor.execute(
+                f"SELECT COUNT(*) FROM CDR INNER JOIN FraudCase ON CDR.CDR_ID = FraudCase.CDR_ID WHERE {where}",
+                params + seek_params,
+            )
+            offset = max(offset - cursor.fetchone()[0], 0)
+        else:
+            offset = 0
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort_by, sort_dir, last["sort_key"], last["id"])
+    for row in rows:
+        del row["sort_key"]
+
+    return {
+        "results": rows,
+        "total": count_rows(cursor, db_name, conditions, params),
+        "nextCursor": next_cursor,
+        "pageSize": page_size,
+    }
@@ -0,0 +1,149 @@
+from backend.data.migrations import REASON_FIELDS, table_columns
+
+# One row per (CDR, rule) a detection rule flagged. Rule_ID is the number of
+# the FraudCase reason column the rule used to fill, so Reason3 is rule 3.
+# Evidence is the measured value behind the finding where a rule has one
+# (cost per kWh, repeat count, distance in km); Reason keeps the text the
+# rule has always written.
+FRAUD_FINDING_SCHEMA = """
+    CDR_ID TEXT NOT NULL,
+    Rule_ID INTEGER NOT NULL,
+    Severity INTEGER NOT NULL,
+    Evidence REAL,
+    Reason TEXT NOT NULL,
+    Run_ID INTEGER,
+    PRIMARY KEY (CDR_ID, Rule_ID)
+"""
+
+# The primary key serves lookups by CDR_ID; this one the per-rule range scans
+FRAUD_FINDING_INDEXES = {
+    "idx_fraudfinding_rule": "FraudFinding(Rule_ID, CDR_ID)",
+}
+
+LOW, MEDIUM, HIGH = 1, 2, 3
+
+RULE_IDS = tuple(range(1, len(REASON_FIELDS) + 1))
+
+RULE_SEVERITY = {
+    1: MEDIUM,  # High volume in short duration
+    2: MEDIUM,  # Unusual cost per kWh
+    3: LOW,     # Rapid consecutive sessions
+    4: HIGH,    # Overlapping sessions
+    5: MEDIUM,  # Repeated behavior
+    6: LOW,     # Data integrity violation
+    7: HIGH,    # Unrealistic movement
+}
+
+
+def rule_id(reason: str) -> int:
+    """Rule_ID for a reason given as "Reason3" or "3"; raises ValueError for anything else."""
+    name = reason if reason.startswith("Reason") else f"Reason{reason}"
+    if name not in REASON_FIELDS:
+        raise ValueError(f"Unknown reason: {reason}")
+    return REASON_FIELDS.index(name) + 1
+
+
+def _object_type(cursor, name: str):
+    cursor.execute("SELECT type FROM sqlite_master WHERE name = ?", (name,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _migrate_fraud_case_table(cursor):
+    """Move the findings of a FraudCase table into FraudFinding and drop the table."""
+    columns = table_columns(cursor, "FraudCase")
+    for rule, field in zip(RULE_IDS, REASON_FIELDS):
+        if field not in columns:
+            continue
+        # MAX() merges the duplicate rows per CDR that older databases have
+        cursor.execute(f"""
+            INSERT INTO FraudFinding (CDR_ID, Rule_ID, Severity, Reason)
+            SELECT CDR_ID, ?, ?, MAX({field}) FROM FraudCase
+            WHERE {field} IS NOT NULL AND {field} != ''
+            GROUP BY CDR_ID
+            ON CONFLICT(CDR_ID, Rule_ID) DO NOTHING
+        """, (rule, RULE_SEVERITY[rule]))
+    cursor.execute("DROP TABLE FraudCase")
+
+
+def _fraud_case_view() -> str:
+    reasons = ",\n".join(
+        f"(SELECT r.Reason FROM FraudFinding r WHERE r.CDR_ID = f.CDR_ID AND r.Rule_ID = {rule}) AS {field}"
+        for rule, field in zip(RULE_IDS, REASON_FIELDS)
+    )
+    # A plain (non-aggregate) view, so SQLite flattens it into the queries
+    # that join it and only evaluates the reason columns they use
+    return f"""
+        CREATE VIEW FraudCase AS
+        SELECT f.CDR_ID,
+        {reasons}
+        FROM FraudFinding f
+        WHERE f.Rule_ID = (SELECT MIN(m.Rule_ID) FROM FraudFinding m WHERE m.CDR_ID = f.CDR_ID)
+    """
+
+
+def _fraud_case_triggers() -> list:
+    insert = "\n".join(
+        f"""INSERT INTO FraudFinding (CDR_ID, Rule_ID, Severity, Reason)
+            SELECT NEW.CDR_ID, {rule}, {RULE_SEVERITY[rule]}, NEW.{field} WHERE NEW.{field} IS NOT NULL;"""
+        for rule, field in zip(RULE_IDS, REASON_FIELDS)
+    )
+    update = "\n".join(
+        f"""DELETE FROM FraudFinding WHERE CDR_ID = OLD.CDR_ID AND Rule_ID = {rule} AND NEW.{field} IS NULL;
+            INSERT INTO FraudFinding (CDR_ID, Rule_ID, Severity, Reason)
+            SELECT OLD.CDR_ID, {rule}, {RULE_SEVERITY[rule]}, NEW.{field}
+            WHERE NEW.{field} IS NOT NULL AND NEW.{field} IS NOT OLD.{field}
+            ON CONFLICT(CDR_ID, Rule_ID) DO UPDATE SET Reason = excluded.Reason, Evidence = NULL;"""
+        for rule, field in zip(RULE_IDS, REASON_FIELDS)
+    )
+    return [
+        f"""CREATE TRIGGER FraudCase_insert INSTEAD OF INSERT ON FraudCase
+        BEGIN
+            SELECT RAISE(ABORT, 'UNIQUE constraint failed: FraudCase.CDR_ID')
+            WHERE EXISTS (SELECT 1 FROM FraudFinding WHERE CDR_ID = NEW.CDR_ID);
+            {insert}
+        END""",
+        f"""CREATE TRIGGER FraudCase_update INSTEAD OF UPDATE ON FraudCase
+        BEGIN
+            {update}
+        END""",
+        """CREATE TRIGGER FraudCase_delete INSTEAD OF DELETE ON FraudCase
+        BEGIN
+            DELETE FROM FraudFinding WHERE CDR_ID = OLD.CDR_ID;
+        END""",
+    ]
+
+
+def create_fraud_finding_tables(cursor):
+    """
+    Create FraudFinding and the FraudCase view over it.
+
+    FraudCase keeps its old shape, one row per flagged CDR with a
+    Reason1..Reason7 column per rule, and INSTEAD OF triggers map writes to
+    it onto FraudFinding. A FraudCase table from an older database is
+    migrated into FraudFinding and replaced by the view.
+    """
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS FraudFinding ({FRAUD_FINDING_SCHEMA})")
+    for name, target in FRAUD_FINDING_INDEXES.items():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+
+    if _object_type(cursor, "FraudCase") == "table":
+        _migrate_fraud_case_table(cursor)
+    if _object_type(cursor, "FraudCase") is None:
+        cursor.execute(_fraud_case_view())
+        for trigger in _fraud_case_triggers():
+            cursor.execute(trigger)
+
+
+def drop_fraud_findings(cursor):
+    """Remove every finding, and FraudCase with them, so detection starts over."""
+    if _object_type(cursor, "FraudCase") == "view":
+        cursor.execute("DROP VIEW FraudCase")
+    else:
+        cursor.execute("DROP TABLE IF EXISTS FraudCase")
+    cursor.execute("DROP TABLE IF EXISTS FraudFinding")
+
+
+def fraud_findings_exist(cursor) -> bool:
+    """True once detection has created FraudFinding."""
+    return _object_type(cursor, "FraudFinding") == "table"
@@ -0,0 +1,75 @@
+from backend.data.timestamps import to_epoch
+
+# Derived CDR columns, filled at import time and backfilled here for older rows
+CDR_TIME_COLUMNS = ("Start_epoch", "End_epoch", "Start_hour")
+
+# Reason columns of FraudCase, one per detection rule
+REASON_FIELDS = ("Reason1", "Reason2", "Reason3", "Reason4", "Reason5", "Reason6", "Reason7")
+
+CDR_INDEXES = {
+    "idx_cdr_auth_start": "CDR(Authentication_ID, Start_epoch, End_epoch)",
+    "idx_cdr_cp_start": "CDR(Charge_Point_ID, Start_epoch, End_epoch)",
+    # (sort column, CDR_ID) pairs for the keyset pagination of /api/data-table
+    "idx_cdr_start_id": "CDR(Start_epoch, CDR_ID)",
+    "idx_cdr_volume_id": "CDR(Volume, CDR_ID)",
+    "idx_cdr_cost_id": "CDR(Calculated_Cost, CDR_ID)",
+    "idx_cdr_import_filename": "CDR(import_filename)",
+}
+
+
+def table_columns(cursor, table_name: str) -> list:
+    cursor.execute(f"PRAGMA table_info({table_name})")
+    return [row[1] for row in cursor.fetchall()]
+
+
+def cdr_epoch_columns(cursor, alias: str = "") -> str:
+    """Select list for Start_epoch and End_epoch, parsed on the fly where CDR has no such columns yet."""
+    prefix = f"{alias}." if alias else ""
+    if "Start_epoch" in table_columns(cursor, "CDR"):
+        return f"{prefix}Start_epoch AS Start_epoch, {prefix}End_epoch AS End_epoch"
+    # The same parser ensure_cdr_time_columns backfills with
+    return f"""CAST(strftime('%s', {prefix}Start_datetime) AS INTEGER) AS Start_epoch,
+              CAST(strftime('%s', {prefix}End_datetime) AS INTEGER) AS End_epoch"""
+
+
+def cdr_time_values(start_datetime, end_datetime) -> tuple:
+    """Start_epoch, End_epoch and Start_hour for one CDR, in CDR_TIME_COLUMNS order."""
+    start_epoch = to_epoch(start_datetime)
+    end_epoch = to_epoch(end_datetime)
+    # Hour of day in UTC, the same value time(Start_datetime) used to give
+    start_hour = (start_epoch // 3600) % 24 if start_epoch is not None else None
+    return start_epoch, end_epoch, start_hour
+
+
+def ensure_cdr_time_columns(cursor):
+    """
+    Add the integer epoch/hour columns and their indexes to CDR.
+
+    When the columns are added, the rows of the older database are backfilled
+    once with SQLite's own date parser, so the values match what the former
+    datetime()/julianday() comparisons saw. After that the values come from
+    insert time only: a backfill on every call would scan all of CDR, since
+    no index serves its NULL checks.
+    """
+    columns = table_columns(cursor, "CDR")
+    if not columns:
+        return
+
+    missing = [column for column in CDR_TIME_COLUMNS if column not in columns]
+    for column in missing:
+        cursor.execute(f"ALTER TABLE CDR ADD COLUMN {column} INTEGER")
+
+    if missing:
+        cursor.execute("""
+            UPDATE CDR
+            SET Start_epoch = CAST(strftime('%s', Start_datetime) AS INTEGER),
+                End_epoch = CAST(strftime('%s', End_datetime) AS INTEGER),
+                Start_hour = CAST(strftime('%H', Start_datetime) AS INTEGER)
+        """)
+
+    for name, target in CDR_INDEXES.items():
+        indexed_columns = target[target.index("(") + 1:-1].split(", ")
+        if all(column in columns or column in CDR_TIME_COLUMNS for column in indexed_columns):
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+    # Covered by idx_cdr_start_id
+    cursor.execute("DROP INDEX IF EXISTS idx_cdr_start")
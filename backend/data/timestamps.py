@@ -0,0 +1,38 @@
+import calendar
+from datetime import date, datetime
+from typing import Optional
+
+
+def to_epoch(value) -> Optional[int]:
+    """
+    Convert a CDR timestamp to whole epoch seconds (UTC), or None when it can't be parsed.
+
+    Accepts the same ISO-8601 shapes SQLite's datetime() understands
+    ("YYYY-MM-DD HH:MM:SS", "T" separator, fractional seconds, offsets) as
+    well as datetime/pandas Timestamp objects. Naive timestamps are taken as
+    UTC, like SQLite does, and fractions are truncated to whole seconds.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, date):
+        parsed = datetime(value.year, value.month, value.day)
+    elif isinstance(value, str):
+        text = value.strip()
+        if not text:
+            return None
+        try:
+            parsed = datetime.fromisoformat(text)
+        except ValueError:
+            return None
+    else:
+        return None
+
+    try:
+        if parsed.tzinfo is not None:
+            return calendar.timegm(parsed.utctimetuple())
+        return calendar.timegm(parsed.timetuple())
+    except (ValueError, OverflowError):
+        # NaT and out-of-range values
+        return None
@@ -43,11 +43,11 @@ def fetch_charge_counts():
         query = """
         SELECT 
             CASE 
-                WHEN time(c.Start_datetime) BETWEEN '00:00:00' AND '08:59:59' THEN '0000-0900'
-                WHEN time(c.Start_datetime) BETWEEN '09:00:00' AND '12:59:59' THEN '0900-1300'
-                WHEN time(c.Start_datetime) BETWEEN '13:00:00' AND '16:59:59' THEN '1300-1700'
-                WHEN time(c.Start_datetime) BETWEEN '17:00:00' AND '20:59:59' THEN '1700-2100'
-                WHEN time(c.Start_datetime) >= '21:00:00' OR time(c.Start_datetime) BETWEEN '00:00:00' AND '00:59:59' THEN '0000-0900'
+                WHEN c.Start_hour BETWEEN 0 AND 8 THEN '0000-0900'
+                WHEN c.Start_hour BETWEEN 9 AND 12 THEN '0900-1300'
+                WHEN c.Start_hour BETWEEN 13 AND 16 THEN '1300-1700'
+                WHEN c.Start_hour BETWEEN 17 AND 20 THEN '1700-2100'
+                WHEN c.Start_hour BETWEEN 21 AND 23 THEN '2100-0000'
                 END as TimeRange,
             COUNT(DISTINCT c.CDR_ID) as TotalCharges
         FROM CDR c
@@ -87,11 +87,11 @@ def fetch_charge_details(time_range):
         cursor = db.connection.cursor()
 
         time_conditions = {
-            "0000-0900": "time(Start_datetime) BETWEEN '00:00:00' AND '08:59:59'",
-            "0900-1300": "time(Start_datetime) BETWEEN '09:00:00' AND '12:59:59'",
-            "1300-1700": "time(Start_datetime) BETWEEN '13:00:00' AND '16:59:59'",
-            "1700-2100": "time(Start_datetime) BETWEEN '17:00:00' AND '20:59:59'",
-            "2100-0000": "(time(Start_datetime) >= '21:00:00' OR time(c.Start_datetime) BETWEEN '00:00:00' AND '00:59:59' THEN '0000-0900'",
+            "0000-0900": "c.Start_hour BETWEEN 0 AND 8",
+            "0900-1300": "c.Start_hour BETWEEN 9 AND 12",
+            "1300-1700": "c.Start_hour BETWEEN 13 AND 16",
+            "1700-2100": "c.Start_hour BETWEEN 17 AND 20",
+            "2100-0000": "c.Start_hour BETWEEN 21 AND 23",
         }
 
         if time_range not in time_conditions:
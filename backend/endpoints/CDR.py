@@ -1,18 +1,16 @@
-from fastapi import APIRouter, HTTPException
-from backend.data.DbContext import DbContext
+from fastapi import APIRouter, Depends, HTTPException
+from backend.data.DbContext import DbContext, get_db
+from backend.data.charge_points import charge_point_coordinates
 
 
 router = APIRouter()
 
 @router.get("/api/cdr-details/{cdr_id}")
-async def get_cdr_details(cdr_id: str):
-    db = DbContext()
-    db.connect()
+def get_cdr_details(cdr_id: str, db: DbContext = Depends(get_db)):
     cursor = db.connection.cursor()
     cursor.execute("SELECT * FROM CDR WHERE CDR_ID = ?", (cdr_id,))
     cdr_row = cursor.fetchone()
     if not cdr_row:
-        db.close()
         raise HTTPException(status_code=404, detail="CDR not found")
     columns = [desc[0] for desc in cursor.description]
     cdr = dict(zip(columns, cdr_row))
@@ -22,10 +20,8 @@ async def get_cdr_details(cdr_id: str):
     reasons_row = cursor.fetchone()
     reasons = [r for r in reasons_row if r] if reasons_row else []
 
-    latitude = cdr.get('Latitude')
-    longitude = cdr.get('Longitude')
+    latitude, longitude = charge_point_coordinates(cursor, cdr.get('Charge_Point_ID'))
 
-    db.close()
     return {
         "cdr": cdr,
         "reasons": reasons,
@@ -16,9 +16,9 @@ router = APIRouter()
 session_manager.create_sessions_table()
 
 @router.post("/api/create/user")
-async def create_user(user_data: dict):
+def create_user(user_data: dict):
+    db = DbContext()
     try:
-        db = DbContext()
         db.connect()
         if (db.insert_user(user_data)):
             return {"message": "User created successfully"}
@@ -32,20 +32,13 @@ async def create_user(user_data: dict):
 
 
 @router.post("/api/login")
-async def login(user_data: UserRequest):
-    db = DbUserContext()
-    db.connect()
-    user = db.get_user(user_data.User_Name, user_data.User_Password)
-    if user:
+def login(user_data: UserRequest):
+    with DbUserContext() as db:
+        user = db.get_user(user_data.User_Name, user_data.User_Password)
+        if not user:
+            raise HTTPException(status_code=401, detail="Invalid credentials")
         user_id = user["User_ID"] if isinstance(user, dict) else user[0]  # adjust as needed
         session_token = session_manager.create_session(user_id)
-        db_user = DbUserContext()
-        db_user.connect()
-        user = db_user.get_user_by_id(user_id)
+        user = db.get_user_by_id(user_id)
         user_name = user["User_Name"] if user else "Unknown"
-        db_user.close()
-        db.close()
-        return {"session_token": session_token, "user_id": user_id, "user_name": user_name}
-    else:
-        db.close()
-        raise HTTPException(status_code=401, detail="Invalid credentials")
+    return {"session_token": session_token, "user_id": user_id, "user_name": user_name}
@@ -1,20 +1,20 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import Response
-from backend.data.DbContext import DbContext
+from backend.data.DbContext import DbContext, get_db
+from backend.data.fraud_findings import rule_id
 import json
 
 router = APIRouter()
 
 @router.get("/api/charge-point-stats")
-async def get_charge_point_stats(
+def get_charge_point_stats(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    search: str = Query(None)
+    search: str = Query(None),
+    db: DbContext = Depends(get_db)
 ):
     try:
-        db = DbContext()
-        db.connect()
-        
+
         # Prepare filtering clause
         where_clause = ""
         params = []
@@ -24,11 +24,7 @@ async def get_charge_point_stats(
             params.append(f"%{search.lower()}%")
 
         # Totaal aantal unieke laadpunten
-        count_query = f"""
-            SELECT COUNT(*) FROM (
-                SELECT Charge_Point_ID, Charge_Point_Country FROM CDR {where_clause} GROUP BY Charge_Point_ID, Charge_Point_Country
-            )
-        """
+        count_query = f"SELECT COUNT(*) FROM ChargePointStats {where_clause}"
         cursor = db.connection.cursor()
         cursor.execute(count_query, params)
         total_count = cursor.fetchone()[0]
@@ -36,16 +32,10 @@ async def get_charge_point_stats(
         # Data ophalen met LIMIT/OFFSET
         offset = (page - 1) * page_size
         data_query = f"""
-            SELECT 
-                Charge_Point_ID,
-                Charge_Point_Country,
-                COUNT(*) as transaction_count,
-                SUM(Volume) as total_volume,
-                SUM(Calculated_Cost) as total_cost
-            FROM CDR 
+            SELECT Charge_Point_ID, Charge_Point_Country, transaction_count, total_volume, total_cost
+            FROM ChargePointStats
             {where_clause}
-            GROUP BY Charge_Point_ID, Charge_Point_Country
-            ORDER BY transaction_count DESC
+            ORDER BY transaction_count DESC, Charge_Point_ID
             LIMIT ? OFFSET ?
         """
         params.extend([page_size, offset])
@@ -53,7 +43,6 @@ async def get_charge_point_stats(
         columns = [description[0] for description in cursor.description]
         results = [dict(zip(columns, row)) for row in cursor.fetchall()]
         
-        db.close()
         return Response(
             content=json.dumps({
                 "results": results,
@@ -70,28 +59,18 @@ async def get_charge_point_stats(
         )
         
     except Exception as e:
-        if db.connection:
-            db.close()
         raise HTTPException(status_code=500, detail=f"Error fetching charge point statistics: {str(e)}")
 
 
 
 @router.get("/api/charge-point-stats-all")
-async def get_all_charge_point_stats():
+def get_all_charge_point_stats(db: DbContext = Depends(get_db)):
     try:
-        db = DbContext()
-        db.connect()
-        
+
         query = """
-            SELECT 
-                Charge_Point_ID,
-                Charge_Point_Country,
-                COUNT(*) as transaction_count,
-                SUM(Volume) as total_volume,
-                SUM(Calculated_Cost) as total_cost
-            FROM CDR 
-            GROUP BY Charge_Point_ID, Charge_Point_Country
-            ORDER BY transaction_count DESC
+            SELECT Charge_Point_ID, Charge_Point_Country, transaction_count, total_volume, total_cost
+            FROM ChargePointStats
+            ORDER BY transaction_count DESC, Charge_Point_ID
         """
         
         cursor = db.connection.cursor()
@@ -99,7 +78,6 @@ async def get_all_charge_point_stats():
         columns = [description[0] for description in cursor.description]
         results = [dict(zip(columns, row)) for row in cursor.fetchall()]
         
-        db.close()
         return Response(
             content=json.dumps(results),
             media_type="application/json",
@@ -111,30 +89,31 @@ async def get_all_charge_point_stats():
         )
         
     except Exception as e:
-        if db.connection:
-            db.close()
         raise HTTPException(status_code=500, detail=f"Error fetching charge point statistics: {str(e)}")
 
 
 @router.get("/api/charge-details/reason/{reason_key}")
-async def get_charge_details_by_reason(reason_key: str):
-    db = DbContext()
-    db.connect()
+def get_charge_details_by_reason(reason_key: str, db: DbContext = Depends(get_db)):
+    try:
+        rule = rule_id(reason_key)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     cursor = db.connection.cursor()
-    query = f"""
+    # The rule's findings come from a range scan of idx_fraudfinding_rule
+    query = """
         SELECT f.*, c.Start_datetime, c.End_datetime, c.Duration, c.Volume, c.Charge_Point_Address, c.Charge_Point_ZIP, c.Charge_Point_City, c.Charge_Point_Country, c.Charge_Point_ID, c.Calculated_Cost
-        FROM FraudCase f
+        FROM FraudFinding ff
+        JOIN FraudCase f ON f.CDR_ID = ff.CDR_ID
         JOIN CDR c ON f.CDR_ID = c.CDR_ID
-        WHERE {reason_key} IS NOT NULL AND {reason_key} != ''
+        WHERE ff.Rule_ID = ?
     """
-    cursor.execute(query)
+    cursor.execute(query, (rule,))
     columns = [desc[0] for desc in cursor.description]
     results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-    db.close()
     return results
 
 @router.get("/api/charge-point-details/{ChargeID}")
-async def get_user_details(ChargeID: str):
+def get_user_details(ChargeID: str):
     try:
         db = DbContext()
         rows = db.get_cdrs_by_charge_point_id(ChargeID)
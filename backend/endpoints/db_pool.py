@@ -0,0 +1,9 @@
+from fastapi import APIRouter
+from backend.data.DbPool import pool_stats
+
+router = APIRouter()
+
+@router.get("/api/db-pool-stats")
+def get_db_pool_stats():
+    """Connection pool size, wait times and hold times per database file."""
+    return pool_stats()
@@ -1,45 +1,115 @@
 from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from itertools import chain
 from tempfile import NamedTemporaryFile
-from typing import Optional
+from typing import Iterator, Optional
+import logging
 import os
+import time
 from backend.data.DbContext import DbContext
+from backend.data.cdr_writer import csv_chunks, write_xlsx
 
 
 router = APIRouter()
 
+export_logger = logging.getLogger("export_logger")
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Bytes per chunk when streaming a finished .xlsx file
+FILE_CHUNK_SIZE = 1024 * 1024
+
+
+def _timed(chunks: Iterator[bytes], started: float, label: str) -> Iterator[bytes]:
+    """Pass chunks through, logging the time to the first byte and the total time and size."""
+    sent = 0
+    for chunk in chunks:
+        if not sent:
+            export_logger.info(f"{label}: first byte after {(time.perf_counter() - started) * 1000:.0f} ms")
+        sent += len(chunk)
+        yield chunk
+    export_logger.info(f"{label}: {sent} bytes in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+def _remove_file(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _file_chunks(path: str) -> Iterator[bytes]:
+    """Read a temporary file in chunks and delete it afterwards, also when the client disconnects."""
+    try:
+        with open(path, "rb") as handle:
+            while chunk := handle.read(FILE_CHUNK_SIZE):
+                yield chunk
+    finally:
+        _remove_file(path)
+
+
 @router.get("/api/export")
-async def export_excel(
+def export_excel(
     format: str = "xlsx",
     columns: Optional[str] = Query(None),
     start_date: Optional[str] = Query(None),
-    end_date: Optional[str] = Query(None)
+    end_date: Optional[str] = Query(None),
+    compress: bool = Query(False, alias="gzip", description="gzip the CSV stream (Content-Encoding: gzip)")
 ):
+    """
+    Stream the filtered CDR table as CSV or XLSX.
+
+    CSV rows go out page by page as they are read from the cursor. XLSX is
+    a zip archive that cannot be streamed while it is built, so it is
+    written with a write-only workbook to a temporary file, which is
+    streamed and then deleted. Either way only one page of rows is held in
+    memory. The Server-Timing header carries the time until the first page
+    was ready, which is also logged with the time to the first byte.
+    """
     if format not in ["xlsx", "csv"]:
         raise HTTPException(status_code=400, detail="Invalid format. Use 'xlsx' or 'csv'.")
 
+    started = time.perf_counter()
+    db = DbContext()
     try:
-        suffix = ".xlsx" if format == "xlsx" else ".csv"
-        with NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            output_path = tmp.name
-
-        db = DbContext()
-        success, record_count = db.export_cdr_to_file(output_path, columns, start_date, end_date)
-
-        if not success:
-            os.remove(output_path)
-            if record_count == 0:
-                raise HTTPException(status_code=404, detail="No data found for selected period.")
-            else:
-                raise HTTPException(status_code=500, detail="Failed to export database.")
-
-        return FileResponse(
-            path=output_path,
-            filename=f"cdr_export{suffix}",
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            if format == "xlsx" else "text/csv"
+        header, pages = db.iter_cdr_export(columns, start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Export error: {str(e)}")
+
+    first_page = next(pages, None)
+    if first_page is None:
+        raise HTTPException(status_code=404, detail="No data found for selected period.")
+    pages = chain([first_page], pages)
+
+    headers = {"Server-Timing": f"firstpage;dur={(time.perf_counter() - started) * 1000:.1f}"}
+    label = f"Export {format}"
+
+    if format == "csv":
+        headers["Content-Disposition"] = 'attachment; filename="cdr_export.csv"'
+        if compress:
+            headers["Content-Encoding"] = "gzip"
+        return StreamingResponse(
+            _timed(csv_chunks(header, pages, compress=compress), started, label),
+            media_type="text/csv",
+            headers=headers,
         )
 
+    with NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
+        output_path = tmp.name
+    try:
+        record_count = write_xlsx(output_path, header, pages)
     except Exception as e:
+        _remove_file(output_path)
         raise HTTPException(status_code=500, detail=f"Export error: {str(e)}")
 
+    export_logger.info(f"{label}: wrote {record_count} records")
+    headers["Content-Disposition"] = 'attachment; filename="cdr_export.xlsx"'
+    return StreamingResponse(
+        _timed(_file_chunks(output_path), started, label),
+        media_type=XLSX_MEDIA_TYPE,
+        headers={**headers, "Content-Length": str(os.path.getsize(output_path))},
+        background=BackgroundTask(_remove_file, output_path),
+    )
@@ -1,39 +1,60 @@
 from fastapi import APIRouter, HTTPException, BackgroundTasks, File, UploadFile, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 import sys
 from pathlib import Path
 import time
 import logging
 import os
-from typing import Tuple, Optional
+import shutil
+from typing import Callable, Tuple, Optional
 from backend.data.DbContext import DbContext
+from backend.data.cdr_reader import SUPPORTED_EXTENSIONS
 from backend.data.GetData import GetAll
+from backend.import_jobs.import_job_manager import ImportJobManager
+import tempfile
 
-def import_excel_to_db(file_path: str) -> Tuple[bool, str, Optional[int]]:
+def import_excel_to_db(
+    file_path: str, progress: Optional[Callable[[str, int], None]] = None
+) -> Tuple[bool, str, Optional[int]]:
     try:
         if not os.path.exists(file_path):
             return False, f"File not found at: {file_path}", None
 
-        if not file_path.lower().endswith(('.xlsx', '.xls')):
-            return False, "Invalid file format. Please provide an Excel file (.xlsx or .xls)", None
+        if not file_path.lower().endswith(SUPPORTED_EXTENSIONS):
+            return False, "Invalid file format. Please provide an Excel (.xlsx or .xls) or CSV file", None
 
         # Initialize database
         db = DbContext()
         db.initialize_database()  # Ensure the table is created
 
         # Import the Excel file
-        records_imported, error_msg = db.import_excel_to_database(file_path)
+        records_imported, error_msg = db.import_excel_to_database(file_path, progress=progress)
 
-        if records_imported > 0:
+        if records_imported > 0 and not error_msg:
             return True, f"Successfully imported {records_imported} records", records_imported
+        elif error_msg:
+            return False, f"Error importing file: {error_msg}", None
         else:
-            return False, f"No records were imported. {error_msg}", None
+            return False, "No records were imported.", None
 
     except Exception as e:
         return False, f"Error importing file: {str(e)}", None
 
 
+def _store_upload(upload, filename: str) -> Tuple[str, str]:
+    """Copy an uploaded file into a fresh temp directory; returns (directory, file path)."""
+    upload_dir = tempfile.mkdtemp(prefix="cdr_import_")
+    file_path = os.path.join(upload_dir, os.path.basename(filename))
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(upload, buffer)
+    return upload_dir, file_path
+
+
+import_job_manager = ImportJobManager(DbContext().db_name, import_excel_to_db)
+
+
 router = APIRouter()
 
 # Configure logging
@@ -45,44 +66,54 @@ async def import_excel(background_tasks: BackgroundTasks, file: UploadFile = Fil
     start_time = time.time()
     try:
         logger.info(f"Starting file import for: {file.filename}")
-        
-        # Create a temporary file to store the uploaded content
-        temp_file_path = f"temp_{file.filename}"
-        with open(temp_file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        
-        # Import the file using the existing function
-        success, message, records_imported = import_excel_to_db(temp_file_path)
-        
-        # Clean up the temporary file
-        os.remove(temp_file_path)
-        
-        processing_time = time.time() - start_time
-        logger.info(f"File import completed in {processing_time:.2f} seconds. Imported {records_imported} records.")
-        
-        if success and records_imported:            
-            return {
-                "success": True,
-                "message": f"{message} in {processing_time:.2f} seconds. Geocoding process started in background.",
-                "count": records_imported,
-                "processingTime": processing_time
-            }
-        else:
+
+        if not file.filename or not file.filename.lower().endswith(SUPPORTED_EXTENSIONS):
             return {
                 "success": False,
-                "message": message,
+                "message": "Invalid file format. Please provide an Excel (.xlsx or .xls) or CSV file",
                 "count": 0,
-                "processingTime": processing_time
+                "processingTime": time.time() - start_time
             }
-            
+
+        # Store the upload off the event loop, the import itself runs as a background job
+        upload_dir, file_path = await run_in_threadpool(_store_upload, file.file, file.filename)
+        job_id = import_job_manager.submit(file_path, cleanup_dir=upload_dir)
+
+        processing_time = time.time() - start_time
+        logger.info(f"Queued import job {job_id} for {file.filename} in {processing_time:.2f} seconds.")
+        return {
+            "success": True,
+            "message": f"Import of {file.filename} queued",
+            "count": 0,
+            "processingTime": processing_time,
+            "jobId": job_id,
+            "phase": "queued"
+        }
+
     except Exception as e:
-        return False, f"Error importing file: {str(e)}", None
+        return {
+            "success": False,
+            "message": f"Error importing file: {str(e)}",
+            "count": 0,
+            "processingTime": time.time() - start_time
+        }
 
 
+@router.get("/api/import/jobs")
+def get_import_jobs(limit: int = Query(20, ge=1, le=200)):
+    return import_job_manager.list_jobs(limit)
+
+
+@router.get("/api/import/jobs/{job_id}")
+def get_import_job(job_id: str):
+    job = import_job_manager.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
 
 @router.get("/import-log")
-async def get_import_logs():
+def get_import_logs():
     parse_import = GetAll()
     parsed_lines = []
 
@@ -102,33 +133,31 @@ async def get_import_logs():
 
 
 @router.get("/api/fraud-cases-for-import")
-async def get_fraud_cases_for_import(filename: str = Query(...)):
+def get_fraud_cases_for_import(filename: str = Query(...)):
     """
     Given a filename, return fraud cases for all CDRs imported from that file (using import_filename column), including city, address, and country.
     """
-    db = DbContext()
-    db.connect()
-    cursor = db.connection.cursor()
-    cursor.execute("""
-        SELECT CDR_ID FROM CDR WHERE import_filename = ?
-    """, (filename,))
-    cdr_ids = [row[0] for row in cursor.fetchall()]
-    fraud_cases = []
-    if cdr_ids:
-        batch_size = 900  # safely below SQLite's 999 limit
-        for i in range(0, len(cdr_ids), batch_size):
-            batch = cdr_ids[i:i+batch_size]
-            format_strings = ','.join(['?'] * len(batch))
-            cursor.execute(f"""
-                SELECT f.*, c.Charge_Point_City, c.Charge_Point_Address, c.Charge_Point_Country
-                FROM FraudCase f
-                JOIN CDR c ON f.CDR_ID = c.CDR_ID
-                WHERE f.CDR_ID IN ({format_strings})
-            """, batch)
-            fraud_cases.extend(cursor.fetchall())
-        columns = [desc[0] for desc in cursor.description]
-        result = [dict(zip(columns, row)) for row in fraud_cases]
-    else:
-        result = []
-    db.close()
+    with DbContext() as db:
+        cursor = db.connection.cursor()
+        cursor.execute("""
+            SELECT CDR_ID FROM CDR WHERE import_filename = ?
+        """, (filename,))
+        cdr_ids = [row[0] for row in cursor.fetchall()]
+        fraud_cases = []
+        if cdr_ids:
+            batch_size = 900  # safely below SQLite's 999 limit
+            for i in range(0, len(cdr_ids), batch_size):
+                batch = cdr_ids[i:i+batch_size]
+                format_strings = ','.join(['?'] * len(batch))
+                cursor.execute(f"""
+                    SELECT f.*, c.Charge_Point_City, c.Charge_Point_Address, c.Charge_Point_Country
+                    FROM FraudCase f
+                    JOIN CDR c ON f.CDR_ID = c.CDR_ID
+                    WHERE f.CDR_ID IN ({format_strings})
+                """, batch)
+                fraud_cases.extend(cursor.fetchall())
+            columns = [desc[0] for desc in cursor.description]
+            result = [dict(zip(columns, row)) for row in fraud_cases]
+        else:
+            result = []
     return result
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import JSONResponse, Response
-from backend.data.DbContext import DbContext
+from backend.data.DbContext import DbContext, get_db
+from backend.data.fraud_findings import RULE_IDS
+from backend.data.migrations import REASON_FIELDS
 import json
 from backend.data.DbUserContext import DbUserContext
 from backend.sessions.session_manager import SessionManager
@@ -17,32 +19,14 @@ session_manager.create_sessions_table()
 
 
 @router.get("/api/fraud-reasons%")
-async def get_fraud_reasons(reason: str):
-    db = DbContext()
-    db.connect()
+def get_fraud_reasons(reason: str, db: DbContext = Depends(get_db)):
     cursor = db.connection.cursor()
-    cursor.execute("SELECT * FROM FraudCase")
-    columns = [desc[0] for desc in cursor.description]
-    fraud_cases = [dict(zip(columns, row)) for row in cursor.fetchall()]
-    # Calculate total fraud cases
-    total_cases = len(fraud_cases)
-    
-    # Initialize counters for each reason
-    reason_counts = {
-        'Reason1': 0,
-        'Reason2': 0,
-        'Reason3': 0,
-        'Reason4': 0,
-        'Reason5': 0,
-        'Reason6': 0,
-        'Reason7': 0
-    }
-    
-    # Count occurrences of each reason (non-null)
-    for case in fraud_cases:
-        for reason in reason_counts.keys():
-            if case[reason] is not None and case[reason] != '':
-                reason_counts[reason] += 1
+    # Total flagged CDRs from the CDR_ID primary key, per-rule counts from idx_fraudfinding_rule
+    cursor.execute("SELECT COUNT(DISTINCT CDR_ID) FROM FraudFinding")
+    total_cases = cursor.fetchone()[0]
+    cursor.execute("SELECT Rule_ID, COUNT(*) FROM FraudFinding GROUP BY Rule_ID")
+    counts = dict(cursor.fetchall())
+    reason_counts = {field: counts.get(rule, 0) for rule, field in zip(RULE_IDS, REASON_FIELDS)}
     
     # Calculate percentages
     reason_percentages = {}
@@ -68,7 +52,7 @@ async def get_fraud_reasons(reason: str):
     )
 
 @router.post("/api/fraud-decision")
-async def add_fraud_decision(
+def add_fraud_decision(
     cdr_id: str,
     status: str,
     reason: str,
@@ -84,18 +68,16 @@ async def add_fraud_decision(
         raise HTTPException(status_code=400, detail="Invalid status. Must be 'approve', 'deny', or 'maybe'")
     
     # Fetch user_name from user.db
-    db_user = DbUserContext()
-    db_user.connect()
-    user = db_user.get_user_by_id(user_id)
+    with DbUserContext() as db_user:
+        user = db_user.get_user_by_id(user_id)
     user_name = user["User_Name"] if user else "Unknown"
-    db_user.close()
 
     decision_manager.add_decision(cdr_id, user_id, user_name, status, reason)
     return {"success": True}
 
 
 @router.get("/api/fraud-decision/{cdr_id}")
-async def get_fraud_decisions(cdr_id: str):
+def get_fraud_decisions(cdr_id: str):
     decisions = decision_manager.get_decisions_for_cdr(cdr_id)
     # Optionally, format the result for frontend
     return [
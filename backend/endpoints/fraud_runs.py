@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Query
+from backend.data.DbContext import DbContext
+from backend.data.DbPool import get_pool
+from backend.fraude_detectie.fraud_runs import list_runs
+
+router = APIRouter()
+
+@router.get("/api/fraud-runs")
+def get_fraud_runs(limit: int = Query(20, ge=1, le=500)):
+    """Recent fraud detection runs, newest first, with wall time, rows, findings and statements per rule."""
+    with get_pool(DbContext().db_name).connection() as conn:
+        return list_runs(conn.cursor(), limit)
@@ -1,7 +1,14 @@
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
 from backend.data.DbContext import DbContext
+from backend.data.charge_points import FOUND
 from backend.fraud_locations.Fraude_Locaties import FraudLocationManager
+from backend.fraud_locations.geocode_cache import get_geocode_cache, prewarm
+from backend.fraud_locations.geocode_pipeline import latest_progress
+from backend.fraud_locations.map_view import CLUSTER_MAX_ZOOM, BoundingBox
 import json
+import time
 from fastapi.responses import Response
 import logging
 
@@ -9,19 +16,24 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 @router.get("/api/fraud-locations")
-async def get_fraud_locations():
+def get_fraud_locations(bbox: Optional[str] = None, zoom: int = Query(CLUSTER_MAX_ZOOM, ge=0, le=22)):
+    """
+    All fraud locations, or with bbox=west,south,east,north only those in
+    view, clustered on the server below CLUSTER_MAX_ZOOM.
+    """
+    view = None
+    if bbox is not None:
+        try:
+            view = BoundingBox.parse(bbox)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     try:
         db = DbContext()
         fraud_location_manager = FraudLocationManager(db.db_name)
-        
-        # First try to update the fraud locations
-        try:
-            fraud_location_manager.update_fraud_locations()
-        except Exception as e:
-            logger.error(f"Error updating fraud locations: {str(e)}")
-            # Continue anyway to try to get existing locations
-        
-        # Then get the locations
+        if view is not None:
+            return fraud_location_manager.get_fraud_locations_in_view(view, zoom)
+
+        # FraudLocations is kept up to date by imports, geocoding and detection
         locations = fraud_location_manager.get_all_fraud_locations()
         
         if not locations:
@@ -48,45 +60,81 @@ async def get_fraud_locations():
         )
 
 
+@router.get("/api/fraud-locations/{location_id}")
+def get_fraud_location(location_id: str):
+    """One fraud location with its latest fraud CDR and reason histogram, for a map popup."""
+    location = FraudLocationManager(DbContext().db_name).get_fraud_location(location_id)
+    if location is None:
+        raise HTTPException(status_code=404, detail="Fraud location not found")
+    return location
+
+
 @router.post("/api/geocode-cdr/{cdr_id}")
-async def geocode_cdr_location(cdr_id: str):
-    db = DbContext()
-    db.connect()
-    cursor = db.connection.cursor()
-    cursor.execute("SELECT Charge_Point_Address, Charge_Point_ZIP, Charge_Point_City, Charge_Point_Country FROM CDR WHERE CDR_ID = ?", (cdr_id,))
-    row = cursor.fetchone()
+def geocode_cdr_location(cdr_id: str):
+    with DbContext() as db:
+        cursor = db.connection.cursor()
+        cursor.execute("SELECT Charge_Point_ID, Charge_Point_Address, Charge_Point_ZIP, Charge_Point_City, Charge_Point_Country FROM CDR WHERE CDR_ID = ?", (cdr_id,))
+        row = cursor.fetchone()
     if not row:
-        db.close()
         raise HTTPException(status_code=404, detail="CDR not found")
-    address, zip_code, city, country = row
+    charge_point_id, address, zip_code, city, country = row
 
     # Use your geocoding logic here (reuse from FraudLocationManager or similar)
+    # Without a pooled connection: a geocoder call can take seconds
     geocoder = FraudLocationManager(db.db_name)
     print(f"Geocoding CDR_ID={cdr_id}: address='{address}', zip='{zip_code}', city='{city}', country='{country}'")
     coords = geocoder.geocode_address(address, zip_code, city, country)
-    if coords:
-        cursor.execute("UPDATE CDR SET Latitude = ?, Longitude = ? WHERE CDR_ID = ?", (coords['latitude'], coords['longitude'], cdr_id))
-        db.connection.commit()
-        
-        # Update fraud locations after saving coordinates
-        try:
-            geocoder.update_fraud_locations()
-        except Exception as e:
-            logger.error(f"Error updating fraud locations after geocoding: {str(e)}")
-            # Continue anyway since coordinates were saved successfully
-        
-        db.close()
-        return {"latitude": coords['latitude'], "longitude": coords['longitude']}
-    else:
-        db.close()
+    if not coords:
         raise HTTPException(status_code=404, detail="Could not geocode address")
 
+    with DbContext() as db:
+        cursor = db.connection.cursor()
+        cursor.execute(
+            "UPDATE ChargePoint SET Latitude = ?, Longitude = ?, Geocode_Status = ?, Geocoded_at = ? WHERE Charge_Point_ID = ?",
+            (coords['latitude'], coords['longitude'], FOUND, time.time(), charge_point_id),
+        )
+        cursor.execute("INSERT OR IGNORE INTO FraudLocationDirty (Charge_Point_ID) VALUES (?)", (charge_point_id,))
+        db.connection.commit()
+
+    # Update fraud locations after saving coordinates
+    try:
+        geocoder.update_fraud_locations()
+    except Exception as e:
+        logger.error(f"Error updating fraud locations after geocoding: {str(e)}")
+        # Continue anyway since coordinates were saved successfully
+
+    return {"latitude": coords['latitude'], "longitude": coords['longitude']}
+
 
 @router.post("/api/geocode-batch")
-async def geocode_batch(count: int = 20):
+def geocode_batch(count: int = 20, workers: int = 4):
     try:
-        manager = FraudLocationManager("backend/project-d.db")
-        updated = manager.update_charge_point_coordinates_batch(count)
-        return {"message": f"Geocoded {updated} new locations."}
+        manager = FraudLocationManager(DbContext().db_name)
+        updated = manager.update_charge_point_coordinates_batch(count, max_workers=max(1, workers))
+        return {"message": f"Geocoded {updated} new locations.", "progress": latest_progress(manager.db_path).to_dict()}
     except Exception as e:
         return {"message": f"Error: {str(e)}"}
+
+
+@router.get("/api/geocode-status")
+def get_geocode_status():
+    """Progress and throughput of the running or last geocoding run."""
+    progress = latest_progress(DbContext().db_name)
+    if progress is None:
+        return {"status": "idle"}
+    return progress.to_dict()
+
+
+@router.get("/api/geocode-cache/stats")
+def get_geocode_cache_stats():
+    return get_geocode_cache(DbContext().db_name).stats()
+
+
+@router.post("/api/geocode-cache/prewarm")
+def prewarm_geocode_cache(limit: int = 0):
+    """Seed the cache from CDRs with coordinates and geocode up to `limit` unknown addresses."""
+    try:
+        manager = FraudLocationManager(DbContext().db_name)
+        return prewarm(manager, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error pre-warming geocode cache: {str(e)}")
@@ -5,14 +5,14 @@ router = APIRouter()
 
 # Endpoit die Authentication_ID, ClusterCount (aantal unieke CDR_IDs in het cluster), TotalVolume, TotalCost haalt
 @router.get('/api/overlapping-stats')
-async def get_overlapping_stats():
+def get_overlapping_stats():
     db = DbContext()
     result = db.get_overlapping_stats()
     return result
 
 # Dit haalt alle overlappende sessies voor een gegeven Authentication_ID op.
 @router.get("/api/overlapping-sessions/{auth_id}")
-async def get_overlapping_sessions_by_auth_id(auth_id: str):
+def get_overlapping_sessions_by_auth_id(auth_id: str):
     try:
         db = DbContext()
         rows = db.get_overlapping_sessions_by_auth_id(auth_id)
@@ -22,7 +22,7 @@ async def get_overlapping_sessions_by_auth_id(auth_id: str):
 
 # Endpoit dat de details ophaalt van overlappende CDR’s voor een specifieke CDR_ID.
 @router.get("/api/overlapping-details/{cdr_id}")
-async def get_overlapping_details_for_cdr(cdr_id: str):
+def get_overlapping_details_for_cdr(cdr_id: str):
     try:
         db = DbContext()
         sessions = db.get_all_overlapping_for_cdr(cdr_id)
@@ -1,19 +1,21 @@
 from backend.data.GetData import GetAll
-from fastapi import APIRouter, HTTPException, Query
-from backend.data.DbContext import DbContext
+from fastapi import APIRouter, Depends, HTTPException, Query
+from backend.data.DbContext import DbContext, get_db
+from backend.data.data_table import DataTableFilters, fetch_page
+from typing import Optional
 import json
 from fastapi.responses import Response
 
 router = APIRouter()
 
 @router.get("/tabel/all")
-async def get_all_records():
+def get_all_records():
     getAllInstance = GetAll()
     data = getAllInstance.fetch_data()
     return data
 
 @router.get("/tabel/{cdrID}")
-async def get_one_record(cdrID: str):
+def get_one_record(cdrID: str):
     getOneInstance = GetAll()
     data = getOneInstance.fetch_one_data(cdrID)
     return data
@@ -21,77 +23,47 @@ async def get_one_record(cdrID: str):
 
 
 @router.get("/api/data-table")
-async def get_data_table(
-    page: int = Query(1, ge=1),
+def get_data_table(
     page_size: int = Query(20, ge=1, le=100),
-    sort_by: str = Query(None),
-    sort_dir: str = Query(None),
-    search: str = Query(None)
+    cursor: Optional[str] = Query(None, description="nextCursor of the previous page"),
+    page: Optional[int] = Query(
+        None, ge=1, deprecated=True,
+        description="1-based page number, for older clients; ignored when cursor is given",
+    ),
+    sort_by: str = Query("start_datetime"),
+    sort_dir: str = Query("desc"),
+    search: Optional[str] = Query(None),
+    authentication_id: Optional[str] = Query(None),
+    charge_point_id: Optional[str] = Query(None),
+    reason: Optional[str] = Query(None),
+    start_date: Optional[str] = Query(None),
+    end_date: Optional[str] = Query(None),
+    db: DbContext = Depends(get_db)
 ):
+    filters = DataTableFilters(
+        search=search,
+        authentication_id=authentication_id,
+        charge_point_id=charge_point_id,
+        reason=reason,
+        start_date=start_date,
+        end_date=end_date,
+    )
     try:
-        db = DbContext()
-        db.connect()
-
-        offset = (page - 1) * page_size
-        cursor = db.connection.cursor()
-
-        # Prepare filtering clause
-        where_clause = ""
-        params = []
-
-        if search:
-            where_clause = "WHERE LOWER(Authentication_ID) LIKE ?"
-            params.append(f"%{search.lower()}%")
-
-        # Total count with search
-        total_query = f"SELECT COUNT(*) FROM CDR {where_clause}"
-        cursor.execute(total_query, params)
-        total = cursor.fetchone()[0]
-
-        # Validate sorting
-        valid_sort_columns = {'volume': 'Volume', 'calculated_cost': 'Calculated_Cost'}
-        valid_sort_dirs = {'asc', 'desc'}
-        order_clause = "ORDER BY Start_datetime DESC"
-        if sort_by in valid_sort_columns and sort_dir in valid_sort_dirs:
-            order_clause = f"ORDER BY {valid_sort_columns[sort_by]} {sort_dir.upper()}"
-
-        # Data query with search
-        data_query = f"""
-            SELECT 
-                CDR.CDR_ID as id,
-                CDR.Authentication_ID as authentication_id,
-                CDR.Duration as duration,
-                CDR.Volume as volume,
-                CDR.Charge_Point_ID as charge_point_id,
-                CDR.Calculated_Cost as calculated_cost
-            FROM CDR
-            INNER JOIN FraudCase ON CDR.CDR_ID = FraudCase.CDR_ID
-            ORDER BY CDR.Start_datetime DESC
-        """
-        params.extend([page_size, offset])
-        cursor.execute(data_query, params)
-
-        columns = [description[0] for description in cursor.description]
-        results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-
-        db.close()
-        return {
-            "results": results,
-            "total": total
-        }
-
+        return fetch_page(
+            db.connection.cursor(), db.db_name, filters,
+            sort_by=sort_by, sort_dir=sort_dir, page_size=page_size, after=cursor,
+            offset=(page - 1) * page_size if page and not cursor else 0,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        if db.connection:
-            db.close()
         raise HTTPException(status_code=500, detail=f"Error fetching data table: {str(e)}")
 
 
 
 @router.get("/api/data-table-all")
-async def get_all_data_table():
+def get_all_data_table(db: DbContext = Depends(get_db)):
     try:
-        db = DbContext()
-        db.connect()
         cursor = db.connection.cursor()
 
         query = """
@@ -111,7 +83,6 @@ async def get_all_data_table():
         columns = [description[0] for description in cursor.description]
         results = [dict(zip(columns, row)) for row in cursor.fetchall()]
 
-        db.close()
         return Response(
             content=json.dumps(results),
             media_type="application/json",
@@ -123,6 +94,4 @@ async def get_all_data_table():
         )
 
     except Exception as e:
-        if db.connection:
-            db.close()
         raise HTTPException(status_code=500, detail=f"Error fetching data table: {str(e)}")
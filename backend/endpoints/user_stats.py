@@ -4,7 +4,7 @@ from backend.data.DbContext import DbContext
 router = APIRouter()
 
 @router.get("/api/user-stats")
-async def get_user_stats():
+def get_user_stats():
     try:
         db = DbContext()
         stats = db.get_user_stats()
@@ -14,7 +14,7 @@ async def get_user_stats():
 
 
 @router.get("/api/user-details/{auth_id}")
-async def get_user_details(auth_id: str):
+def get_user_details(auth_id: str):
     try:
         db = DbContext()
         rows = db.get_cdrs_by_authentication_id(auth_id)
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException
 from backend.data.DbContext import DbContext
+from backend.data.aggregates import reason_count_column
 router = APIRouter()
     
 
@@ -17,74 +18,49 @@ def get_all_charge_point_ids_with_specific_fraud(reason: str):
     try:
         data = find_unique_charge_point_ids_with_specific_fraud(reason)
         return data
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 def find_unique_charge_point_ids_with_fraud():
-    db = DbContext()
-    db.connect()
-    cursor = db.connection.cursor()
+    with DbContext() as db:
+        cursor = db.connection.cursor()
 
-    query = """
-        SELECT 
-            Charge_Point_ID,
-            Charge_Point_Country,
-            COUNT(*) AS transaction_count,
-            SUM(Volume) AS total_volume,
-            SUM(Calculated_Cost) AS total_cost
-        FROM CDR
-        WHERE 
-            Charge_Point_ID IN (
-                SELECT DISTINCT Charge_Point_ID
-                FROM CDR
-                WHERE CDR_ID IN (SELECT CDR_ID FROM FraudCase)
-            )
-            OR Charge_Point_ID IS NULL
-        GROUP BY Charge_Point_ID, Charge_Point_Country
-        ORDER BY Charge_Point_ID
-    """
+        # Every country row of a charge point that has fraud in any of them
+        query = """
+            SELECT Charge_Point_ID, Charge_Point_Country, transaction_count, total_volume, total_cost
+            FROM ChargePointStats
+            WHERE Charge_Point_ID IN (SELECT Charge_Point_ID FROM ChargePointStats WHERE fraud_count > 0)
+                OR Charge_Point_ID IS NULL
+            ORDER BY Charge_Point_ID
+        """
 
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    columns = [desc[0] for desc in cursor.description]
-    result = [dict(zip(columns, row)) for row in rows]
-
-    db.close()
+        cursor.execute(query)
+        rows = cursor.fetchall()
+        columns = [desc[0] for desc in cursor.description]
+        result = [dict(zip(columns, row)) for row in rows]
     return result
 
 def find_unique_charge_point_ids_with_specific_fraud(reason):
-    db = DbContext()
-    db.connect()
-    cursor = db.connection.cursor()
+    # Unknown reasons fail before a connection is borrowed
+    count_column = reason_count_column(reason)
+    with DbContext() as db:
+        cursor = db.connection.cursor()
 
-    query = f"""
-        SELECT 
-            Charge_Point_ID,
-            Charge_Point_Country,
-            COUNT(*) AS transaction_count,
-            SUM(Volume) AS total_volume,
-            SUM(Calculated_Cost) AS total_cost
-        FROM CDR
-        WHERE 
-            Charge_Point_ID IN (
-                SELECT DISTINCT Charge_Point_ID
-                FROM CDR
-                WHERE CDR_ID IN (
-                    SELECT CDR_ID 
-                    FROM FraudCase 
-                    WHERE {reason} IS NOT NULL
+        query = f"""
+            SELECT Charge_Point_ID, Charge_Point_Country, transaction_count, total_volume, total_cost
+            FROM ChargePointStats
+            WHERE Charge_Point_ID IN (
+                    SELECT Charge_Point_ID FROM ChargePointStats WHERE {count_column} > 0
                 )
-            )
-            OR Charge_Point_ID IS NULL
-        GROUP BY Charge_Point_ID, Charge_Point_Country
-        ORDER BY Charge_Point_ID
-    """
-
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    columns = [desc[0] for desc in cursor.description]
-    result = [dict(zip(columns, row)) for row in rows]
+                OR Charge_Point_ID IS NULL
+            ORDER BY Charge_Point_ID
+        """
 
-    db.close()
+        cursor.execute(query)
+        rows = cursor.fetchall()
+        columns = [desc[0] for desc in cursor.description]
+        result = [dict(zip(columns, row)) for row in rows]
     return result
@@ -1,21 +1,47 @@
+import os
 import sqlite3
 from typing import List, Dict, Optional
 import pandas as pd
 from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderServiceError
-import time
 import logging
 from fastapi import HTTPException
 import re
+from backend.data.charge_points import create_charge_point_table
+from backend.fraud_locations.geocode_cache import get_geocode_cache, normalize_address_key
+from backend.fraud_locations.geocode_pipeline import GeocodePipeline, GeocodeProgress, resolve_query
+from backend.fraud_locations.geocoders import (
+    DEFAULT_GAZETTEER_PATH,
+    GazetteerProvider,
+    GeocodeQuery,
+    GeocoderProvider,
+    NominatimProvider,
+)
+from backend.fraud_locations.location_refresh import (
+    create_fraud_location_tables,
+    mark_all_dirty,
+    refresh_fraud_locations,
+)
+from backend.fraud_locations.map_view import BoundingBox, fraud_location_popup, fraud_locations_in_view
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class FraudLocationManager:
-    def __init__(self, db_path: str):
+    def __init__(
+        self,
+        db_path: str,
+        providers: Optional[List[GeocoderProvider]] = None,
+        use_nominatim: bool = True,
+    ):
         self.db_path = db_path
-        self.geolocator = Nominatim(user_agent="fraud_detection_system")
+        # Providers are tried in order before Nominatim, which is the online
+        # fallback; without use_nominatim geocoding stays offline
+        self.geolocator = Nominatim(user_agent="fraud_detection_system") if use_nominatim else None
+        if providers is None:
+            providers = [GazetteerProvider(DEFAULT_GAZETTEER_PATH)] if os.path.exists(DEFAULT_GAZETTEER_PATH) else []
+        self.providers = providers
+        self.geocode_cache = get_geocode_cache(db_path)
         self.initialize_tables()
 
     def initialize_tables(self):
@@ -24,30 +50,11 @@ class FraudLocationManager:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 
-                # Add coordinate columns to CDR table if they don't exist
-                try:
-                    cursor.execute("ALTER TABLE CDR ADD COLUMN Latitude REAL")
-                    cursor.execute("ALTER TABLE CDR ADD COLUMN Longitude REAL")
-                except sqlite3.OperationalError:
-                    # Columns might already exist
-                    pass
+                # Coordinates live on the charge point, not on every CDR
+                create_charge_point_table(cursor)
 
-                # Create FraudLocations table
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS FraudLocations (
-                        Location_ID TEXT PRIMARY KEY,
-                        Charge_Point_ID TEXT NOT NULL,
-                        Address TEXT,
-                        ZIP TEXT,
-                        City TEXT,
-                        Country TEXT,
-                        Latitude REAL NOT NULL,
-                        Longitude REAL NOT NULL,
-                        Fraud_Count INTEGER DEFAULT 1,
-                        Last_Detected_Date TEXT,
-                        FOREIGN KEY (Charge_Point_ID) REFERENCES CDR(Charge_Point_ID)
-                    )
-                """)
+                # FraudLocations and the dirty list it is refreshed from
+                create_fraud_location_tables(cursor)
                 conn.commit()
                 logger.info("Tables initialized successfully")
         except Exception as e:
@@ -138,6 +145,18 @@ class FraudLocationManager:
         address = address.strip(' ,')
         return address
 
+    def geocoder_providers(self) -> List[GeocoderProvider]:
+        """The configured providers followed by Nominatim, when enabled."""
+        providers = list(self.providers)
+        if self.geolocator is not None:
+            providers.append(NominatimProvider(self.geolocator))
+        return providers
+
+    def address_key(self, address: str, zip_code: str, city: str, country: str) -> str:
+        """GeocodeCache key of an address: the geocoder query, normalized."""
+        address = self.clean_address(address, zip_code, city)
+        return normalize_address_key(self.format_address(address, zip_code, city, country))
+
     def geocode_address(self, address: str, zip_code: str, city: str, country: str) -> Optional[Dict[str, float]]:
         """Convert address to coordinates using geocoding."""
         try:
@@ -145,232 +164,108 @@ class FraudLocationManager:
             address = self.clean_address(address, zip_code, city)
             # Format the address based on country
             full_address = self.format_address(address, zip_code, city, country)
-            
+
+            # Addresses seen before, found or not, need no geocoder call
+            cache_key = normalize_address_key(full_address)
+            hit, coords = self.geocode_cache.get(cache_key)
+            if hit:
+                return coords
+
             print(f"Attempting to geocode: {full_address}")
-            
-            # Add a small delay to respect rate limits
-            time.sleep(1)
-            
-            location = self.geolocator.geocode(full_address)
-            if location:
+
+            query = GeocodeQuery(address, zip_code, city, country, full_address)
+            coords, failed = resolve_query(self.geocoder_providers(), query)
+            if coords:
                 print(f"Successfully geocoded: {full_address}")
-                return {
-                    "latitude": location.latitude,
-                    "longitude": location.longitude
-                }
             else:
                 print(f"No results found for: {full_address}")
-                return None
-                
-        except GeocoderTimedOut:
-            print(f"Geocoding timed out for: {full_address}")
-            time.sleep(2)  # Wait longer before retrying
-            return self.geocode_address(address, zip_code, city, country)
-        except GeocoderServiceError as e:
-            print(f"Geocoding service error: {str(e)}")
-            time.sleep(5)  # Wait even longer for service errors
-            return None
+            # A provider error is not a definite miss, so it is not cached
+            if coords or not failed:
+                self.geocode_cache.put(cache_key, coords)
+            return coords
+
         except Exception as e:
             print(f"Unexpected geocoding error: {str(e)}")
             return None
 
-    def update_charge_point_coordinates(self):
-        """Update coordinates for all charge points in CDR table."""
+    def _charge_points_without_coordinates(self, limit: Optional[int] = None) -> List[tuple]:
+        query = """
+            SELECT Charge_Point_ID, Address, ZIP, City, Country
+            FROM ChargePoint
+            WHERE (Latitude IS NULL OR Longitude IS NULL)
+            AND Address IS NOT NULL
+            AND ZIP IS NOT NULL
+            AND City IS NOT NULL
+            AND Country IS NOT NULL
+        """
         with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Get unique charge points without coordinates
-            cursor.execute("""
-                SELECT DISTINCT 
-                    Charge_Point_ID,
-                    Charge_Point_Address,
-                    Charge_Point_ZIP,
-                    Charge_Point_City,
-                    Charge_Point_Country
-                FROM CDR
-                WHERE (Latitude IS NULL OR Longitude IS NULL)
-                AND Charge_Point_Address IS NOT NULL
-                AND Charge_Point_ZIP IS NOT NULL
-                AND Charge_Point_City IS NOT NULL
-                AND Charge_Point_Country IS NOT NULL
-            """)
-            
-            charge_points = cursor.fetchall()
-            total_points = len(charge_points)
-            print(f"Found {total_points} charge points to process")
-            
-            for i, cp in enumerate(charge_points, 1):
-                charge_point_id, address, zip_code, city, country = cp
-                print(f"\nProcessing charge point {i}/{total_points}: {charge_point_id}")
-                print(f"Address: {address}")
-                print(f"ZIP: {zip_code}")
-                print(f"City: {city}")
-                print(f"Country: {country}")
-                
-                # Get coordinates
-                coords = self.geocode_address(address, zip_code, city, country)
-                
-                if coords:
-                    # Update all records for this charge point
-                    cursor.execute("""
-                        UPDATE CDR
-                        SET Latitude = ?,
-                            Longitude = ?
-                        WHERE Charge_Point_ID = ?
-                    """, (coords['latitude'], coords['longitude'], charge_point_id))
-                    print(f"Updated coordinates for {charge_point_id}: {coords['latitude']}, {coords['longitude']}")
-                else:
-                    print(f"Could not geocode address for {charge_point_id}")
-                
-                # Commit every 10 records to avoid losing progress
-                if i % 10 == 0:
-                    conn.commit()
-                    print(f"Committed {i} records")
-            
-            conn.commit()
-            print("Finished updating charge point coordinates")
+            if limit is None:
+                return conn.execute(query).fetchall()
+            return conn.execute(query + " LIMIT ?", (limit,)).fetchall()
 
-    def update_charge_point_coordinates_batch(self, count: int):
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT DISTINCT 
-                    Charge_Point_ID,
-                    Charge_Point_Address,
-                    Charge_Point_ZIP,
-                    Charge_Point_City,
-                    Charge_Point_Country
-                FROM CDR
-                WHERE (Latitude IS NULL OR Longitude IS NULL)
-                AND Charge_Point_Address IS NOT NULL
-                AND Charge_Point_ZIP IS NOT NULL
-                AND Charge_Point_City IS NOT NULL
-                AND Charge_Point_Country IS NOT NULL
-                LIMIT ?
-            """, (count,))
-            charge_points = cursor.fetchall()
-            updated = 0
-            for cp in charge_points:
-                charge_point_id, address, zip_code, city, country = cp
-                coords = self.geocode_address(address, zip_code, city, country)
-                if coords:
-                    cursor.execute("""
-                        UPDATE CDR
-                        SET Latitude = ?, Longitude = ?
-                        WHERE Charge_Point_ID = ?
-                    """, (coords['latitude'], coords['longitude'], charge_point_id))
-                    updated += 1
-            conn.commit()
-            return updated
+    def update_charge_point_coordinates(self, **pipeline_options) -> GeocodeProgress:
+        """Update coordinates for all charge points in CDR table."""
+        charge_points = self._charge_points_without_coordinates()
+        print(f"Found {len(charge_points)} charge points to process")
+        progress = GeocodePipeline(self, **pipeline_options).run(charge_points)
+        print(f"Finished updating charge point coordinates: {progress.to_dict()}")
+        return progress
+
+    def update_charge_point_coordinates_batch(self, count: int, **pipeline_options) -> int:
+        charge_points = self._charge_points_without_coordinates(count)
+        return GeocodePipeline(self, **pipeline_options).run(charge_points).found
 
-    def update_fraud_locations(self):
-        """Update fraud locations based on FraudCase and CDR tables."""
+    def update_fraud_locations(self, full: bool = False) -> dict:
+        """
+        Bring FraudLocations up to date for the charge points queued as dirty.
+
+        With full=True every charge point is queued first, which rebuilds
+        the whole table.
+        """
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
-                
-                # First, clear existing fraud locations to avoid duplicates
-                cursor.execute("DELETE FROM FraudLocations")
-                logger.info("Cleared existing fraud locations")
-                
-                # Get all fraud cases with their charge point details
-                cursor.execute("""
-                    SELECT 
-                        c.Charge_Point_ID,
-                        c.Charge_Point_Address,
-                        c.Charge_Point_ZIP,
-                        c.Charge_Point_City,
-                        c.Charge_Point_Country,
-                        c.Latitude,
-                        c.Longitude,
-                        COUNT(f.CDR_ID) as fraud_count,
-                        MAX(c.Start_datetime) as last_detected
-                    FROM FraudCase f
-                    JOIN CDR c ON f.CDR_ID = c.CDR_ID
-                    WHERE c.Latitude IS NOT NULL 
-                    AND c.Longitude IS NOT NULL
-                    GROUP BY c.Charge_Point_ID
-                """)
-                
-                fraud_cases = cursor.fetchall()
-                total_cases = len(fraud_cases)
-                logger.info(f"Found {total_cases} fraud locations to process")
-                
-                if total_cases == 0:
-                    logger.warning("No fraud cases found in the database")
-                    return
-                
-                for i, case in enumerate(fraud_cases, 1):
-                    try:
-                        charge_point_id, address, zip_code, city, country, lat, lng, fraud_count, last_detected = case
-                        logger.info(f"Processing fraud location {i}/{total_cases}: {charge_point_id}")
-                        
-                        # Insert new record
-                        location_id = f"LOC_{charge_point_id}"
-                        cursor.execute("""
-                            INSERT INTO FraudLocations (
-                                Location_ID, Charge_Point_ID, Address, ZIP, City, Country,
-                                Latitude, Longitude, Fraud_Count, Last_Detected_Date
-                            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """, (
-                            location_id, charge_point_id, address, zip_code, city, country,
-                            lat, lng, fraud_count, last_detected
-                        ))
-                        logger.info(f"Added fraud location for {charge_point_id} with {fraud_count} fraud cases")
-                        
-                        # Commit every 10 records
-                        if i % 10 == 0:
-                            conn.commit()
-                            logger.info(f"Committed {i} records")
-                    except Exception as e:
-                        logger.error(f"Error processing case {i}: {str(e)}")
-                        continue
-                
+                if full:
+                    mark_all_dirty(cursor)
+                summary = refresh_fraud_locations(cursor)
                 conn.commit()
-                logger.info("Finished updating fraud locations")
+                return summary
         except Exception as e:
             logger.error(f"Error updating fraud locations: {str(e)}")
             raise
 
+    def get_fraud_locations_in_view(self, bbox: BoundingBox, zoom: int) -> Dict:
+        """Fraud locations inside a map view, clustered below CLUSTER_MAX_ZOOM."""
+        with sqlite3.connect(self.db_path) as conn:
+            return fraud_locations_in_view(conn.cursor(), bbox, zoom)
+
+    def get_fraud_location(self, location_id: str) -> Optional[Dict]:
+        """One fraud location for a map popup, by Location_ID."""
+        with sqlite3.connect(self.db_path) as conn:
+            return fraud_location_popup(conn.cursor(), location_id)
+
     def get_all_fraud_locations(self) -> List[Dict]:
         """Retrieve all fraud locations for map display."""
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
+                # Latest fraud CDR and reasons are precomputed on refresh
                 cursor.execute("""
-                    SELECT 
-                        fl.Location_ID,
-                        fl.Charge_Point_ID,
-                        fl.Latitude,
-                        fl.Longitude,
-                        fl.Address,
-                        fl.ZIP,
-                        fl.City,
-                        fl.Country,
-                        fl.Fraud_Count,
-                        fl.Last_Detected_Date,
-                        (
-                            SELECT f.CDR_ID
-                            FROM FraudCase f
-                            JOIN CDR c2 ON f.CDR_ID = c2.CDR_ID
-                            WHERE c2.Charge_Point_ID = fl.Charge_Point_ID
-                            ORDER BY c2.Start_datetime DESC
-                            LIMIT 1
-                        ) as CDR_ID,
-                        TRIM(
-                            COALESCE(fg.Reason1 || '; ', '') ||
-                            COALESCE(fg.Reason2 || '; ', '') ||
-                            COALESCE(fg.Reason3 || '; ', '') ||
-                            COALESCE(fg.Reason4 || '; ', '') ||
-                            COALESCE(fg.Reason5 || '; ', '') ||
-                            COALESCE(fg.Reason6 || '; ', '') ||
-                            COALESCE(fg.Reason7, '')
-                        ) as reasons
-                    FROM FraudLocations fl
-                    LEFT JOIN CDR c ON fl.Charge_Point_ID = c.Charge_Point_ID
-                    LEFT JOIN FraudCase fg ON fg.CDR_ID = c.CDR_ID
-                    GROUP BY fl.Location_ID
-                    ORDER BY fl.Fraud_Count DESC
+                    SELECT
+                        Location_ID,
+                        Charge_Point_ID,
+                        Latitude,
+                        Longitude,
+                        Address,
+                        ZIP,
+                        City,
+                        Country,
+                        Fraud_Count,
+                        Last_Detected_Date,
+                        Latest_CDR_ID AS CDR_ID,
+                        COALESCE(Reasons, '') AS reasons
+                    FROM FraudLocations
+                    ORDER BY Fraud_Count DESC
                 """)
                 
                 columns = [description[0] for description in cursor.description]
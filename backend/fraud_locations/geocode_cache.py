@@ -0,0 +1,233 @@
+import argparse
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Failed lookups are not retried for a week
+NEGATIVE_TTL_SECONDS = 7 * 24 * 3600
+
+_caches: Dict[str, "GeocodeCache"] = {}
+_caches_lock = threading.Lock()
+
+
+def normalize_address_key(full_address: str) -> str:
+    """Cache key for a formatted geocoder query: lower case, single spaces, no stray commas."""
+    key = full_address.lower()
+    key = re.sub(r"\s*,\s*", ", ", key)
+    key = re.sub(r"(, )+", ", ", key)
+    key = re.sub(r"\s{2,}", " ", key)
+    return key.strip(" ,")
+
+
+class GeocodeCache:
+    """
+    Geocoder results in the GeocodeCache table, keyed on the normalized query.
+
+    Found addresses are kept for good. Addresses the geocoder had no result
+    for are cached as well, so they are not looked up again until
+    negative_ttl has passed. Hits and misses are counted per process and
+    the hits also per address.
+    """
+
+    def __init__(self, db_path: str, negative_ttl: float = NEGATIVE_TTL_SECONDS):
+        self.db_path = db_path
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        # Cheap once the table exists; also keeps ':memory:' databases working
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS GeocodeCache (
+                Address_Key TEXT PRIMARY KEY,
+                Latitude REAL,
+                Longitude REAL,
+                Found INTEGER NOT NULL,
+                Hits INTEGER NOT NULL DEFAULT 0,
+                Created_at REAL NOT NULL,
+                Updated_at REAL NOT NULL
+            )
+        """)
+        return conn
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str) -> Tuple[bool, Optional[Dict[str, float]]]:
+        """(hit, coords) for a key; coords is None for a cached failed lookup."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT Latitude, Longitude, Found, Updated_at FROM GeocodeCache WHERE Address_Key = ?",
+                (key,),
+            ).fetchone()
+            if row is None or (not row[2] and time.time() - row[3] > self.negative_ttl):
+                self._count(hit=False)
+                return False, None
+            conn.execute("UPDATE GeocodeCache SET Hits = Hits + 1 WHERE Address_Key = ?", (key,))
+        self._count(hit=True)
+        if not row[2]:
+            return True, None
+        return True, {"latitude": row[0], "longitude": row[1]}
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Optional[Dict[str, float]]]:
+        """The cached keys among `keys` with their coords, looked up over one connection."""
+        now = time.time()
+        found = {}
+        keys = list(keys)
+        with self._connect() as conn:
+            for key in keys:
+                row = conn.execute(
+                    "SELECT Latitude, Longitude, Found, Updated_at FROM GeocodeCache WHERE Address_Key = ?",
+                    (key,),
+                ).fetchone()
+                if row is None or (not row[2] and now - row[3] > self.negative_ttl):
+                    continue
+                found[key] = {"latitude": row[0], "longitude": row[1]} if row[2] else None
+            conn.executemany("UPDATE GeocodeCache SET Hits = Hits + 1 WHERE Address_Key = ?", [(k,) for k in found])
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def fresh_keys(self, keys: Iterable[str]) -> set:
+        """The keys that have a usable entry, without counting them as lookups."""
+        now = time.time()
+        fresh = set()
+        with self._connect() as conn:
+            for key in keys:
+                row = conn.execute(
+                    "SELECT Found, Updated_at FROM GeocodeCache WHERE Address_Key = ?", (key,)
+                ).fetchone()
+                if row and (row[0] or now - row[1] <= self.negative_ttl):
+                    fresh.add(key)
+        return fresh
+
+    def put(self, key: str, coords: Optional[Dict[str, float]]):
+        self.put_many([(key, coords)])
+
+    def put_many(self, results: Iterable[Tuple[str, Optional[Dict[str, float]]]]):
+        """Store (key, coords) pairs in one transaction; coords None records a failed lookup."""
+        now = time.time()
+        rows = [
+            (key, coords["latitude"] if coords else None, coords["longitude"] if coords else None,
+             1 if coords else 0, now, now)
+            for key, coords in results
+        ]
+        if not rows:
+            return
+        with self._connect() as conn:
+            conn.executemany("""
+                INSERT INTO GeocodeCache (Address_Key, Latitude, Longitude, Found, Created_at, Updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(Address_Key) DO UPDATE SET
+                    Latitude = excluded.Latitude,
+                    Longitude = excluded.Longitude,
+                    Found = excluded.Found,
+                    Updated_at = excluded.Updated_at
+            """, rows)
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            entries, found, stored_hits = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(Found), 0), COALESCE(SUM(Hits), 0) FROM GeocodeCache"
+            ).fetchone()
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "entries": entries,
+            "found": found,
+            "notFound": entries - found,
+            "hits": hits,
+            "misses": misses,
+            "hitRate": round(hits / lookups, 4) if lookups else 0.0,
+            "storedHits": stored_hits,
+        }
+
+
+def get_geocode_cache(db_path: str) -> GeocodeCache:
+    """The process-wide cache of a database, so the counters outlive single managers."""
+    key = db_path if db_path == ":memory:" else os.path.abspath(db_path)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = GeocodeCache(db_path)
+        return _caches[key]
+
+
+def prewarm(manager, limit: Optional[int] = None) -> dict:
+    """
+    Fill the cache of a FraudLocationManager for every charge point address.
+
+    Addresses whose charge points already have coordinates are stored without a
+    geocoder call; the remaining unknown ones are geocoded, at most `limit`.
+    """
+    cache = manager.geocode_cache
+    with sqlite3.connect(manager.db_path) as conn:
+        rows = conn.execute("""
+            SELECT Address, ZIP, City, Country, MAX(Latitude), MAX(Longitude)
+            FROM ChargePoint
+            WHERE Address IS NOT NULL
+            AND ZIP IS NOT NULL
+            AND City IS NOT NULL
+            AND Country IS NOT NULL
+            GROUP BY Address, ZIP, City, Country
+        """).fetchall()
+
+    known, unknown = {}, {}
+    for address, zip_code, city, country, latitude, longitude in rows:
+        key = manager.address_key(address, zip_code, city, country)
+        if latitude is not None and longitude is not None:
+            known[key] = {"latitude": latitude, "longitude": longitude}
+        else:
+            unknown.setdefault(key, (address, zip_code, city, country))
+    cache.put_many(known.items())
+
+    fresh = cache.fresh_keys(unknown)
+    geocoded = 0
+    for key, fields in unknown.items():
+        if limit is not None and geocoded >= limit:
+            break
+        if key in fresh:
+            continue
+        # Stores the result, found or not
+        manager.geocode_address(*fields)
+        geocoded += 1
+
+    summary = {
+        "addresses": len(known) + len(unknown),
+        "seeded": len(known),
+        "cached": len(fresh),
+        "geocoded": geocoded,
+    }
+    logger.info(f"Geocode cache pre-warmed: {summary}")
+    return summary
+
+
+def main():
+    from backend.fraud_locations.Fraude_Locaties import FraudLocationManager
+
+    default_db = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "project-d.db")
+    parser = argparse.ArgumentParser(description="Pre-warm the geocode cache from the ChargePoint table.")
+    parser.add_argument("--db", default=default_db)
+    parser.add_argument("--limit", type=int, default=None, help="geocode at most this many unknown addresses")
+    args = parser.parse_args()
+
+    manager = FraudLocationManager(args.db)
+    print(prewarm(manager, args.limit))
+    print(manager.geocode_cache.stats())
+
+
+if __name__ == "__main__":
+    main()
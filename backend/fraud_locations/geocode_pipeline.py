@@ -0,0 +1,316 @@
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from geopy.exc import GeocoderServiceError
+
+from backend.data.charge_points import FAILED, FOUND, NOT_FOUND
+from backend.fraud_locations.geocoders import GeocodeQuery, GeocoderProvider
+from backend.fraud_locations.location_refresh import refresh_fraud_locations
+
+logger = logging.getLogger(__name__)
+
+# (Charge_Point_ID, address, ZIP, city, country)
+ChargePointAddress = Tuple[str, str, str, str, str]
+
+# Errors worth another try; GeocoderTimedOut is one of them
+TRANSIENT_ERRORS = (GeocoderServiceError, TimeoutError, ConnectionError)
+
+
+class TokenBucket:
+    """Blocking token bucket: `rate` tokens per second, at most `capacity` saved up."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_seconds = (1 - self._tokens) / self.rate
+            time.sleep(wait_seconds)
+
+
+_limiters: Dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def rate_limiter(provider: GeocoderProvider) -> Optional[TokenBucket]:
+    """The process-wide bucket of a provider, shared by every caller; None when it is not limited."""
+    if not provider.min_interval:
+        return None
+    with _limiters_lock:
+        if provider.name not in _limiters:
+            _limiters[provider.name] = TokenBucket(1.0 / provider.min_interval)
+        return _limiters[provider.name]
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter: a random delay up to min(cap, base * 2^attempt)."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def geocode_with_retries(
+    provider: GeocoderProvider,
+    query: GeocodeQuery,
+    max_retries: int = 3,
+    backoff_base: float = 1.0,
+    backoff_cap: float = 30.0,
+    on_retry=None,
+) -> Optional[Dict[str, float]]:
+    """
+    One provider lookup under its rate limit, retrying transient errors.
+
+    Gives up with the last error after max_retries retries; errors that are
+    not transient are raised straight away.
+    """
+    limiter = rate_limiter(provider)
+    attempt = 0
+    while True:
+        if limiter:
+            limiter.acquire()
+        try:
+            return provider.geocode(query)
+        except TRANSIENT_ERRORS as e:
+            if attempt >= max_retries:
+                raise
+            delay = backoff_delay(attempt, backoff_base, backoff_cap)
+            logger.warning(f"{provider.name} failed for {query.full_address!r} ({e}), retrying in {delay:.1f}s")
+            if on_retry:
+                on_retry()
+            time.sleep(delay)
+            attempt += 1
+
+
+def resolve_query(
+    providers: Sequence[GeocoderProvider],
+    query: GeocodeQuery,
+    max_retries: int = 3,
+    backoff_base: float = 1.0,
+    backoff_cap: float = 30.0,
+    progress: Optional["GeocodeProgress"] = None,
+) -> Tuple[Optional[Dict[str, float]], bool]:
+    """
+    Try the providers in order until one has coordinates.
+
+    Returns (coords, failed); failed means a provider gave up with an error,
+    so a None result is not a definite miss and must not be cached.
+    """
+    failed = False
+    for provider in providers:
+        if progress:
+            progress.add(geocoder_calls=1)
+        try:
+            coords = geocode_with_retries(
+                provider, query, max_retries, backoff_base, backoff_cap,
+                on_retry=(lambda: progress.add(retries=1)) if progress else None,
+            )
+        except Exception as e:
+            logger.error(f"{provider.name} gave up on {query.full_address!r}: {e}")
+            failed = True
+            continue
+        if coords:
+            return coords, False
+    return None, failed
+
+
+@dataclass
+class GeocodeProgress:
+    total: int = 0
+    done: int = 0
+    found: int = 0
+    not_found: int = 0
+    failed: int = 0
+    cached: int = 0
+    geocoder_calls: int = 0
+    retries: int = 0
+    written: int = 0
+    started: float = field(default_factory=time.monotonic)
+    finished: Optional[float] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            elapsed = (self.finished or time.monotonic()) - self.started
+            return {
+                "status": "done" if self.finished else "running",
+                "total": self.total,
+                "done": self.done,
+                "found": self.found,
+                "notFound": self.not_found,
+                "failed": self.failed,
+                "cached": self.cached,
+                "geocoderCalls": self.geocoder_calls,
+                "retries": self.retries,
+                "written": self.written,
+                "elapsedSeconds": round(elapsed, 3),
+                "perSecond": round(self.done / elapsed, 1) if elapsed > 0 else 0.0,
+            }
+
+
+# Progress of the most recent pipeline run per database, for the status endpoint
+_latest_progress: Dict[str, GeocodeProgress] = {}
+
+
+def _progress_key(db_path: str) -> str:
+    return db_path if db_path == ":memory:" else os.path.abspath(db_path)
+
+
+def latest_progress(db_path: str) -> Optional[GeocodeProgress]:
+    """Progress of the running or last finished pipeline on a database, if any."""
+    return _latest_progress.get(_progress_key(db_path))
+
+
+class GeocodePipeline:
+    """
+    Geocodes charge points concurrently and writes their coordinates back in batches.
+
+    Cached addresses are resolved up front without a worker. Each remaining
+    distinct address goes to a bounded thread pool that tries the providers
+    in order, each under its shared token bucket and with capped exponential
+    backoff on transient errors. Results are written to ChargePoint and the
+    GeocodeCache in one transaction per batch, and the FraudLocations rows
+    of the charge points that got coordinates are refreshed at the end.
+    """
+
+    def __init__(
+        self,
+        manager,
+        providers: Optional[Sequence[GeocoderProvider]] = None,
+        max_workers: int = 4,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        backoff_cap: float = 30.0,
+        batch_size: int = 500,
+    ):
+        self.manager = manager
+        self.providers = list(providers) if providers is not None else manager.geocoder_providers()
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.batch_size = batch_size
+        self.progress = GeocodeProgress()
+
+    def _resolve(self, query: GeocodeQuery) -> Tuple[Optional[Dict[str, float]], bool]:
+        return resolve_query(
+            self.providers, query, self.max_retries, self.backoff_base, self.backoff_cap, progress=self.progress
+        )
+
+    def _write(self, conn: sqlite3.Connection, results: List[Tuple[str, str, Optional[dict], bool, bool]]):
+        """Store one batch of (charge point, cache key, coords, failed, cached) in a single transaction."""
+        now = time.time()
+        updates = [
+            (
+                coords["latitude"] if coords else None,
+                coords["longitude"] if coords else None,
+                FOUND if coords else FAILED if failed else NOT_FOUND,
+                now,
+                charge_point_id,
+            )
+            for charge_point_id, _, coords, failed, _ in results
+        ]
+        with conn:
+            conn.executemany("""
+                UPDATE ChargePoint
+                SET Latitude = ?, Longitude = ?, Geocode_Status = ?, Geocoded_at = ?
+                WHERE Charge_Point_ID = ?
+            """, updates)
+            # Their FraudLocations rows are refreshed at the end of the run
+            conn.executemany(
+                "INSERT OR IGNORE INTO FraudLocationDirty (Charge_Point_ID) VALUES (?)",
+                [(charge_point_id,) for charge_point_id, _, coords, _, _ in results if coords],
+            )
+        self.manager.geocode_cache.put_many(
+            {key: coords for _, key, coords, failed, cached in results if not (failed or cached)}.items()
+        )
+        self.progress.add(written=sum(1 for _, _, coords, _, _ in results if coords))
+
+    def run(self, charge_points: Iterable[ChargePointAddress]) -> GeocodeProgress:
+        charge_points = list(charge_points)
+        progress = self.progress = GeocodeProgress(total=len(charge_points))
+        _latest_progress[_progress_key(self.manager.db_path)] = progress
+
+        # Charge points by the address they resolve to
+        by_key: Dict[str, List[str]] = {}
+        queries: Dict[str, GeocodeQuery] = {}
+        for charge_point_id, address, zip_code, city, country in charge_points:
+            try:
+                cleaned = self.manager.clean_address(address, zip_code, city)
+                full_address = self.manager.format_address(cleaned, zip_code, city, country)
+            except Exception as e:
+                logger.error(f"Cannot geocode charge point {charge_point_id}: {e}")
+                progress.add(done=1, failed=1)
+                continue
+            key = self.manager.address_key(address, zip_code, city, country)
+            by_key.setdefault(key, []).append(charge_point_id)
+            queries.setdefault(key, GeocodeQuery(cleaned, zip_code, city, country, full_address))
+
+        cached = self.manager.geocode_cache.get_many(by_key)
+        pending: List[Tuple[str, str, Optional[dict], bool, bool]] = []
+
+        def collect(key: str, coords: Optional[dict], failed: bool, from_cache: bool = False):
+            ids = by_key[key]
+            progress.add(
+                done=len(ids),
+                cached=len(ids) if from_cache else 0,
+                found=len(ids) if coords else 0,
+                not_found=len(ids) if coords is None and not failed else 0,
+                failed=len(ids) if failed else 0,
+            )
+            for charge_point_id in ids:
+                pending.append((charge_point_id, key, coords, failed, from_cache))
+
+        with sqlite3.connect(self.manager.db_path) as conn:
+            for key, coords in cached.items():
+                collect(key, coords, failed=False, from_cache=True)
+
+            to_resolve = [key for key in by_key if key not in cached]
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="geocode") as executor:
+                # At most two queries per worker in flight, so a huge backlog is not queued at once
+                keys = iter(to_resolve)
+                running = {}
+                while True:
+                    while len(running) < self.max_workers * 2:
+                        key = next(keys, None)
+                        if key is None:
+                            break
+                        running[executor.submit(self._resolve, queries[key])] = key
+                    if not running:
+                        break
+                    completed, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in completed:
+                        coords, failed = future.result()
+                        collect(running.pop(future), coords, failed)
+                    if len(pending) >= self.batch_size:
+                        self._write(conn, pending)
+                        pending = []
+            self._write(conn, pending)
+            pending = []
+            with conn:
+                refresh_fraud_locations(conn.cursor())
+        conn.close()
+
+        progress.finished = time.monotonic()
+        logger.info(f"Geocoding finished: {progress.to_dict()}")
+        return progress
@@ -0,0 +1,220 @@
+import csv
+import mmap
+import os
+import re
+import struct
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# ISO 3166 alpha-3 codes as they appear in the CDRs, to the alpha-2 codes
+# GeoNames and most gazetteers use
+ISO3_TO_ISO2 = {
+    'NLD': 'NL', 'GBR': 'GB', 'DEU': 'DE', 'FRA': 'FR', 'BEL': 'BE', 'LUX': 'LU',
+    'ESP': 'ES', 'PRT': 'PT', 'ITA': 'IT', 'CHE': 'CH', 'AUT': 'AT', 'DNK': 'DK',
+    'SWE': 'SE', 'NOR': 'NO', 'FIN': 'FI', 'POL': 'PL', 'CZE': 'CZ', 'SVK': 'SK',
+    'HUN': 'HU', 'ROU': 'RO', 'BGR': 'BG', 'GRC': 'GR', 'HRV': 'HR', 'SVN': 'SI',
+    'EST': 'EE', 'LVA': 'LV', 'LTU': 'LT', 'IRL': 'IE',
+}
+
+# Gazetteer used by FraudLocationManager when it exists
+DEFAULT_GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gazetteer.csv")
+
+
+@dataclass(frozen=True)
+class GeocodeQuery:
+    """One charge point address, as separate fields and as the formatted query string."""
+    address: str
+    zip_code: str
+    city: str
+    country: str
+    full_address: str
+
+
+class GeocoderProvider(ABC):
+    """
+    A source of coordinates. geocode() returns {"latitude", "longitude"} or
+    None when the provider has no result, and raises on transport errors.
+    min_interval is the pause the provider needs between calls.
+    """
+    name = "provider"
+    min_interval = 0.0
+
+    @abstractmethod
+    def geocode(self, query: GeocodeQuery) -> Optional[Dict[str, float]]:
+        ...
+
+
+class NominatimProvider(GeocoderProvider):
+    """OpenStreetMap Nominatim via geopy, limited to one request per second."""
+    name = "nominatim"
+    min_interval = 1.0
+
+    def __init__(self, geolocator):
+        self.geolocator = geolocator
+
+    def geocode(self, query: GeocodeQuery) -> Optional[Dict[str, float]]:
+        location = self.geolocator.geocode(query.full_address)
+        if not location:
+            return None
+        return {"latitude": location.latitude, "longitude": location.longitude}
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", str(text).strip().lower())
+
+
+def _zip_keys(country: str, zip_code: str) -> List[str]:
+    """Index keys for a postal code, most precise first: full code, outward part, leading digits."""
+    zip_code = _normalize(zip_code)
+    candidates = [zip_code.replace(" ", "")]
+    if " " in zip_code:
+        candidates.append(zip_code.split(" ")[0])
+    digits = re.match(r"\d+", zip_code)
+    if digits:
+        candidates.append(digits.group())
+    keys = []
+    for candidate in candidates:
+        key = f"{country}|z|{candidate}"
+        if candidate and key not in keys:
+            keys.append(key)
+    return keys
+
+
+def _city_key(country: str, city: str) -> str:
+    return f"{country}|c|{_normalize(city)}"
+
+
+class GazetteerIndex:
+    """
+    Sorted fixed-width (key, latitude, longitude) records in a memory-mapped file.
+
+    Keys are "<country>|z|<postal code>" and "<country>|c|<city>"; lookups
+    are a binary search over the mapped records, so opening the index costs
+    nothing and lookups cost O(log n) without loading the gazetteer.
+    """
+    KEY_SIZE = 64
+    RECORD = struct.Struct(f"<{KEY_SIZE}sdd")
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.count = size // self.RECORD.size
+
+    def _key_at(self, i: int) -> bytes:
+        return self._map[i * self.RECORD.size:i * self.RECORD.size + self.KEY_SIZE]
+
+    def get(self, key: str) -> Optional[Tuple[float, float]]:
+        packed = key.encode("utf-8")[:self.KEY_SIZE].ljust(self.KEY_SIZE, b"\0")
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < packed:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self._key_at(lo) == packed:
+            _, latitude, longitude = self.RECORD.unpack_from(self._map, lo * self.RECORD.size)
+            return latitude, longitude
+        return None
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    @classmethod
+    def build(cls, entries: Iterator[Tuple[str, float, float]], path: str):
+        """Write an index from (key, latitude, longitude); the first entry of a key wins."""
+        records = {}
+        for key, latitude, longitude in entries:
+            packed = key.encode("utf-8")[:cls.KEY_SIZE].ljust(cls.KEY_SIZE, b"\0")
+            records.setdefault(packed, (latitude, longitude))
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as handle:
+            for packed in sorted(records):
+                handle.write(cls.RECORD.pack(packed, *records[packed]))
+        os.replace(tmp_path, path)
+
+
+def read_gazetteer(path: str) -> Iterator[Tuple[str, str, str, float, float]]:
+    """
+    (country, postal code, place, latitude, longitude) rows of a gazetteer file.
+
+    Accepts a GeoNames postal code dump (tab separated, no header) or a CSV
+    with country, postal_code, city, latitude and longitude columns.
+    Countries may be alpha-2 or alpha-3 codes.
+    """
+    with open(path, newline="", encoding="utf-8") as handle:
+        first = handle.readline()
+        handle.seek(0)
+        if "\t" in first:
+            # GeoNames: country, postal code, place, admin names/codes..., lat, lon, accuracy
+            for row in csv.reader(handle, delimiter="\t"):
+                if len(row) >= 11 and row[9] and row[10]:
+                    yield row[0], row[1], row[2], float(row[9]), float(row[10])
+        else:
+            for row in csv.DictReader(handle):
+                try:
+                    yield (row["country"], row.get("postal_code") or "", row.get("city") or "",
+                           float(row["latitude"]), float(row["longitude"]))
+                except (KeyError, TypeError, ValueError):
+                    continue
+
+
+class GazetteerProvider(GeocoderProvider):
+    """
+    Offline geocoding of postal codes and cities from a gazetteer file.
+
+    The file is turned into a GazetteerIndex next to it (<file>.idx) the
+    first time, and again whenever the file is newer than its index. A
+    postal code match is preferred over the city; the street is ignored,
+    so results are postal-code centroids.
+    """
+    name = "gazetteer"
+
+    def __init__(self, path: str, index_path: Optional[str] = None):
+        self.path = path
+        self.index_path = index_path or f"{path}.idx"
+        self._index = None
+        self._lock = threading.Lock()
+
+    @property
+    def index(self) -> GazetteerIndex:
+        with self._lock:
+            if self._index is None:
+                if (not os.path.exists(self.index_path)
+                        or os.path.getmtime(self.index_path) < os.path.getmtime(self.path)):
+                    GazetteerIndex.build(self._entries(), self.index_path)
+                self._index = GazetteerIndex(self.index_path)
+            return self._index
+
+    def _entries(self) -> Iterator[Tuple[str, float, float]]:
+        for country, zip_code, city, latitude, longitude in read_gazetteer(self.path):
+            country = ISO3_TO_ISO2.get(country.strip().upper(), country.strip().upper())
+            if zip_code.strip():
+                yield f"{country}|z|{_normalize(zip_code).replace(' ', '')}", latitude, longitude
+            if city.strip():
+                yield _city_key(country, city), latitude, longitude
+
+    def geocode(self, query: GeocodeQuery) -> Optional[Dict[str, float]]:
+        country = str(query.country).strip().upper()
+        country = ISO3_TO_ISO2.get(country, country)
+        keys = _zip_keys(country, query.zip_code) if str(query.zip_code).strip() else []
+        if str(query.city).strip():
+            keys.append(_city_key(country, query.city))
+        index = self.index
+        for key in keys:
+            found = index.get(key)
+            if found:
+                return {"latitude": found[0], "longitude": found[1]}
+        return None
+
+    def close(self):
+        with self._lock:
+            if self._index is not None:
+                self._index.close()
+                self._index = None
@@ -0,0 +1,226 @@
+import logging
+
+from backend.data.migrations import table_columns
+
+logger = logging.getLogger(__name__)
+
+# One row per charge point with fraud cases and coordinates, for the map
+FRAUD_LOCATIONS_SCHEMA = """
+    Location_ID TEXT PRIMARY KEY,
+    Charge_Point_ID TEXT NOT NULL,
+    Address TEXT,
+    ZIP TEXT,
+    City TEXT,
+    Country TEXT,
+    Latitude REAL NOT NULL,
+    Longitude REAL NOT NULL,
+    Fraud_Count INTEGER DEFAULT 1,
+    Last_Detected_Date TEXT,
+    Latest_CDR_ID TEXT,
+    Reasons TEXT,
+    Reason_Counts TEXT,
+    FOREIGN KEY (Charge_Point_ID) REFERENCES CDR(Charge_Point_ID)
+"""
+
+# Popup columns, precomputed on refresh: the most recent fraud CDR, the
+# reasons as "reason (count); ..." most frequent first, and the same
+# histogram as a JSON object
+FRAUD_LOCATION_POPUP_COLUMNS = ("Latest_CDR_ID", "Reasons", "Reason_Counts")
+
+# Reasons are counted by their label, the text before the details the rules
+# append: "Unrealistic movement: 57.3 km in 12.0 min" counts as
+# "Unrealistic movement", "Unusual cost per kWh (ratio: 1.23)" as
+# "Unusual cost per kWh"
+REASON_LABEL = """
+    CASE
+        WHEN instr(value, ' (') > 0 AND (instr(value, ':') = 0 OR instr(value, ' (') < instr(value, ':'))
+            THEN substr(value, 1, instr(value, ' (') - 1)
+        WHEN instr(value, ':') > 0 THEN substr(value, 1, instr(value, ':') - 1)
+        ELSE value
+    END
+"""
+
+# Columns of the FraudLocationIndex R*Tree: FraudLocations.rowid and its point
+FRAUD_LOCATION_RTREE_COLUMNS = "id, Min_Lon, Max_Lon, Min_Lat, Max_Lat"
+
+FRAUD_LOCATION_INDEXES = {
+    "idx_fraudlocations_cp": "FraudLocations(Charge_Point_ID)",
+    "idx_fraudlocations_count": "FraudLocations(Fraud_Count DESC)",
+}
+
+
+def _table_exists(cursor, name: str) -> bool:
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+    return cursor.fetchone() is not None
+
+
+def create_fraud_location_tables(cursor):
+    """
+    Create FraudLocations, its FraudLocationIndex R*Tree and the
+    FraudLocationDirty work list.
+
+    FraudLocationDirty holds the charge points whose location row may be
+    stale: imports, geocoding and fraud detection add to it and
+    refresh_fraud_locations() drains it. A new FraudLocations table starts
+    with every charge point dirty, so the first refresh builds it in full.
+    """
+    created = not _table_exists(cursor, "FraudLocations")
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS FraudLocations ({FRAUD_LOCATIONS_SCHEMA})")
+    columns = table_columns(cursor, "FraudLocations")
+    for column in FRAUD_LOCATION_POPUP_COLUMNS:
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE FraudLocations ADD COLUMN {column} TEXT")
+            # Older tables get their popup columns filled by the next refresh
+            created = True
+    cursor.execute("CREATE TABLE IF NOT EXISTS FraudLocationDirty (Charge_Point_ID TEXT PRIMARY KEY)")
+    for name, target in FRAUD_LOCATION_INDEXES.items():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+    if not _table_exists(cursor, "FraudLocationIndex"):
+        cursor.execute(f"CREATE VIRTUAL TABLE FraudLocationIndex USING rtree({FRAUD_LOCATION_RTREE_COLUMNS})")
+        cursor.execute(f"""
+            INSERT INTO FraudLocationIndex ({FRAUD_LOCATION_RTREE_COLUMNS})
+            SELECT rowid, Longitude, Longitude, Latitude, Latitude FROM FraudLocations
+        """)
+    if created:
+        mark_all_dirty(cursor)
+
+
+def mark_dirty(cursor, charge_points_query: str, params: tuple = ()):
+    """Queue the charge points charge_points_query selects; a no-op before the tables exist."""
+    if not _table_exists(cursor, "FraudLocationDirty"):
+        return
+    cursor.execute(f"""
+        INSERT OR IGNORE INTO FraudLocationDirty (Charge_Point_ID)
+        SELECT Charge_Point_ID FROM ({charge_points_query}) WHERE Charge_Point_ID IS NOT NULL
+    """, params)
+
+
+def mark_cdrs_dirty(cursor, cdr_ids_query: str, params: tuple = ()):
+    """Queue the charge points of the CDRs cdr_ids_query selects."""
+    mark_dirty(
+        cursor,
+        f"SELECT DISTINCT Charge_Point_ID FROM CDR WHERE CDR_ID IN ({cdr_ids_query})",
+        params,
+    )
+
+
+def mark_all_dirty(cursor):
+    """Queue every charge point, for a full rebuild."""
+    source = "ChargePoint" if _table_exists(cursor, "ChargePoint") else "CDR"
+    mark_dirty(cursor, f"SELECT Charge_Point_ID FROM {source} UNION SELECT Charge_Point_ID FROM FraudLocations")
+
+
+def refresh_fraud_locations(cursor) -> dict:
+    """
+    Recompute the FraudLocations rows of the queued charge points.
+
+    Rows are upserted for queued charge points that have coordinates and
+    fraud cases, and deleted for the others; untouched rows stay as they
+    are. Returns the number of charge points processed, upserted and removed.
+    """
+    summary = {"processed": 0, "upserted": 0, "removed": 0}
+    if not all(_table_exists(cursor, table) for table in ("FraudLocationDirty", "ChargePoint", "FraudFinding")):
+        return summary
+
+    cursor.execute("DROP TABLE IF EXISTS temp.FraudLocationBatch")
+    cursor.execute("CREATE TEMP TABLE FraudLocationBatch (Charge_Point_ID TEXT PRIMARY KEY)")
+    cursor.execute("INSERT INTO temp.FraudLocationBatch SELECT Charge_Point_ID FROM FraudLocationDirty")
+    summary["processed"] = cursor.rowcount
+    if not summary["processed"]:
+        return summary
+
+    # Reason histogram per charge point, one row per (charge point, label)
+    # ordered so group_concat lists the most frequent reason first
+    cursor.execute("DROP TABLE IF EXISTS temp.FraudLocationReasons")
+    cursor.execute(f"""
+        CREATE TEMP TABLE FraudLocationReasons AS
+        SELECT
+            Charge_Point_ID,
+            group_concat(Reason || ' (' || Cases || ')', '; ') AS Reasons,
+            json_group_object(Reason, Cases) AS Reason_Counts
+        FROM (
+            SELECT Charge_Point_ID, {REASON_LABEL} AS Reason, COUNT(*) AS Cases
+            FROM (
+                SELECT c.Charge_Point_ID, f.Reason AS value
+                FROM temp.FraudLocationBatch b
+                JOIN CDR c ON c.Charge_Point_ID = b.Charge_Point_ID
+                JOIN FraudFinding f ON f.CDR_ID = c.CDR_ID
+            )
+            GROUP BY Charge_Point_ID, Reason
+            ORDER BY Charge_Point_ID, Cases DESC, Reason
+        )
+        GROUP BY Charge_Point_ID
+    """)
+
+    cursor.execute("DROP TABLE IF EXISTS temp.FraudLocationRows")
+    # c.CDR_ID is a bare column next to a single MAX(), so SQLite takes it
+    # from the row with the latest Start_datetime
+    cursor.execute("""
+        CREATE TEMP TABLE FraudLocationRows AS
+        SELECT l.*, r.Reasons, r.Reason_Counts
+        FROM (
+            SELECT
+                'LOC_' || cp.Charge_Point_ID AS Location_ID,
+                cp.Charge_Point_ID,
+                cp.Address,
+                cp.ZIP,
+                cp.City,
+                cp.Country,
+                cp.Latitude,
+                cp.Longitude,
+                COUNT(*) AS Fraud_Count,
+                MAX(c.Start_datetime) AS Last_Detected_Date,
+                c.CDR_ID AS Latest_CDR_ID
+            FROM temp.FraudLocationBatch b
+            JOIN ChargePoint cp ON cp.Charge_Point_ID = b.Charge_Point_ID
+            JOIN CDR c ON c.Charge_Point_ID = b.Charge_Point_ID
+            WHERE EXISTS (SELECT 1 FROM FraudFinding f WHERE f.CDR_ID = c.CDR_ID)
+            AND cp.Latitude IS NOT NULL
+            AND cp.Longitude IS NOT NULL
+            GROUP BY cp.Charge_Point_ID
+        ) l
+        LEFT JOIN temp.FraudLocationReasons r ON r.Charge_Point_ID = l.Charge_Point_ID
+    """)
+
+    # The R*Tree entries of the batch are dropped here and written back below
+    in_batch = "SELECT rowid FROM FraudLocations WHERE Charge_Point_ID IN (SELECT Charge_Point_ID FROM temp.FraudLocationBatch)"
+    cursor.execute(f"DELETE FROM FraudLocationIndex WHERE id IN ({in_batch})")
+    cursor.execute("""
+        DELETE FROM FraudLocations
+        WHERE Charge_Point_ID IN (SELECT Charge_Point_ID FROM temp.FraudLocationBatch)
+        AND Location_ID NOT IN (SELECT Location_ID FROM temp.FraudLocationRows)
+    """)
+    summary["removed"] = cursor.rowcount
+    cursor.execute("""
+        INSERT INTO FraudLocations (
+            Location_ID, Charge_Point_ID, Address, ZIP, City, Country,
+            Latitude, Longitude, Fraud_Count, Last_Detected_Date,
+            Latest_CDR_ID, Reasons, Reason_Counts
+        )
+        SELECT * FROM temp.FraudLocationRows WHERE true
+        ON CONFLICT(Location_ID) DO UPDATE SET
+            Charge_Point_ID = excluded.Charge_Point_ID,
+            Address = excluded.Address,
+            ZIP = excluded.ZIP,
+            City = excluded.City,
+            Country = excluded.Country,
+            Latitude = excluded.Latitude,
+            Longitude = excluded.Longitude,
+            Fraud_Count = excluded.Fraud_Count,
+            Last_Detected_Date = excluded.Last_Detected_Date,
+            Latest_CDR_ID = excluded.Latest_CDR_ID,
+            Reasons = excluded.Reasons,
+            Reason_Counts = excluded.Reason_Counts
+    """)
+    summary["upserted"] = cursor.rowcount
+    cursor.execute(f"""
+        INSERT INTO FraudLocationIndex ({FRAUD_LOCATION_RTREE_COLUMNS})
+        SELECT rowid, Longitude, Longitude, Latitude, Latitude FROM FraudLocations
+        WHERE Charge_Point_ID IN (SELECT Charge_Point_ID FROM temp.FraudLocationBatch)
+    """)
+    cursor.execute("DELETE FROM FraudLocationDirty WHERE Charge_Point_ID IN (SELECT Charge_Point_ID FROM temp.FraudLocationBatch)")
+    cursor.execute("DROP TABLE temp.FraudLocationRows")
+    cursor.execute("DROP TABLE temp.FraudLocationReasons")
+    cursor.execute("DROP TABLE temp.FraudLocationBatch")
+    logger.info(f"Fraud locations refreshed: {summary}")
+    return summary
@@ -0,0 +1,133 @@
+import json
+from dataclasses import dataclass
+from typing import List, Optional
+
+# At this zoom level and above every fraud location is returned on its own
+CLUSTER_MAX_ZOOM = 13
+# Locations closer together than about this many screen pixels form one cluster
+CLUSTER_RADIUS_PX = 64
+TILE_SIZE_PX = 256
+# Most individual locations returned for one view, highest fraud counts first
+MAX_POINTS = 5000
+
+LOCATION_COLUMNS = (
+    "Location_ID", "Charge_Point_ID", "Latitude", "Longitude", "Address", "ZIP",
+    "City", "Country", "Fraud_Count", "Last_Detected_Date",
+)
+# What a map popup shows on top of LOCATION_COLUMNS, precomputed on refresh
+POPUP_COLUMNS = LOCATION_COLUMNS + ("Latest_CDR_ID", "Reasons", "Reason_Counts")
+
+# R*Tree candidates, then the exact test: the R*Tree stores 32-bit floats
+_IN_VIEW = """
+    FROM FraudLocationIndex i
+    JOIN FraudLocations fl ON fl.rowid = i.id
+    WHERE i.Min_Lon <= :east AND i.Max_Lon >= :west
+    AND i.Min_Lat <= :north AND i.Max_Lat >= :south
+    AND fl.Longitude BETWEEN :west AND :east
+    AND fl.Latitude BETWEEN :south AND :north
+"""
+
+
+@dataclass(frozen=True)
+class BoundingBox:
+    west: float
+    south: float
+    east: float
+    north: float
+
+    @classmethod
+    def parse(cls, text: str) -> "BoundingBox":
+        """Parse "west,south,east,north" in degrees; raises ValueError when it is not a valid box."""
+        try:
+            west, south, east, north = (float(part) for part in text.split(","))
+        except ValueError:
+            raise ValueError("bbox must be west,south,east,north")
+        # Maps report longitudes past +/-180 when panned around the world
+        west, east = max(west, -180.0), min(east, 180.0)
+        if not (-90 <= south <= north <= 90) or west > east:
+            raise ValueError("bbox must be west,south,east,north with west <= east and south <= north")
+        return cls(west, south, east, north)
+
+    def params(self) -> dict:
+        return {"west": self.west, "south": self.south, "east": self.east, "north": self.north}
+
+
+def cluster_cell_degrees(zoom: int) -> float:
+    """Width in degrees of the clustering grid cells at a zoom level."""
+    return 360.0 / (TILE_SIZE_PX * 2 ** zoom) * CLUSTER_RADIUS_PX
+
+
+def _locations(cursor, where: str, params, limit: int) -> List[dict]:
+    columns = ", ".join(f"fl.{column}" for column in LOCATION_COLUMNS)
+    cursor.execute(f"SELECT {columns} {where} ORDER BY fl.Fraud_Count DESC, fl.Location_ID LIMIT {int(limit)}", params)
+    return [dict(zip(LOCATION_COLUMNS, row)) for row in cursor.fetchall()]
+
+
+def fraud_locations_in_view(cursor, bbox: BoundingBox, zoom: int, max_points: int = MAX_POINTS) -> dict:
+    """
+    The fraud locations inside bbox as the map shows them at a zoom level.
+
+    Below CLUSTER_MAX_ZOOM locations are grouped per grid cell of about
+    CLUSTER_RADIUS_PX; a cell holding one location is returned as a point,
+    the others as clusters with their count, total fraud count, centroid and
+    bounds. From CLUSTER_MAX_ZOOM on only points are returned, at most
+    max_points of them.
+    """
+    params = bbox.params()
+    result = {"zoom": zoom, "clustered": zoom < CLUSTER_MAX_ZOOM, "points": [], "clusters": [], "truncated": False}
+
+    if zoom >= CLUSTER_MAX_ZOOM:
+        points = _locations(cursor, _IN_VIEW, params, max_points + 1)
+        result["truncated"] = len(points) > max_points
+        result["points"] = points[:max_points]
+        return result
+
+    params["cell"] = cluster_cell_degrees(zoom)
+    cursor.execute(f"""
+        SELECT
+            COUNT(*),
+            SUM(fl.Fraud_Count),
+            AVG(fl.Latitude),
+            AVG(fl.Longitude),
+            MIN(fl.Longitude),
+            MIN(fl.Latitude),
+            MAX(fl.Longitude),
+            MAX(fl.Latitude),
+            MIN(fl.rowid)
+        {_IN_VIEW}
+        GROUP BY CAST((fl.Longitude + 180) / :cell AS INTEGER), CAST((fl.Latitude + 90) / :cell AS INTEGER)
+    """, params)
+    single_rowids = []
+    for count, fraud_count, latitude, longitude, west, south, east, north, rowid in cursor.fetchall():
+        if count == 1:
+            single_rowids.append(rowid)
+            continue
+        result["clusters"].append({
+            "latitude": latitude,
+            "longitude": longitude,
+            "count": count,
+            "fraudCount": fraud_count,
+            "bbox": [west, south, east, north],
+        })
+    result["clusters"].sort(key=lambda cluster: -cluster["count"])
+
+    if single_rowids:
+        cursor.execute("DROP TABLE IF EXISTS temp.MapViewRows")
+        cursor.execute("CREATE TEMP TABLE MapViewRows (id INTEGER PRIMARY KEY)")
+        cursor.executemany("INSERT INTO temp.MapViewRows VALUES (?)", [(rowid,) for rowid in single_rowids])
+        result["points"] = _locations(
+            cursor, "FROM temp.MapViewRows v JOIN FraudLocations fl ON fl.rowid = v.id", (), len(single_rowids)
+        )
+        cursor.execute("DROP TABLE temp.MapViewRows")
+    return result
+
+
+def fraud_location_popup(cursor, location_id: str) -> Optional[dict]:
+    """One fraud location with its latest fraud CDR and reason histogram, or None."""
+    cursor.execute(f"SELECT {', '.join(POPUP_COLUMNS)} FROM FraudLocations WHERE Location_ID = ?", (location_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    location = dict(zip(POPUP_COLUMNS, row))
+    location["Reason_Counts"] = json.loads(location["Reason_Counts"] or "{}")
+    return location
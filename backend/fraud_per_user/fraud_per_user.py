@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException
 from backend.data.DbContext import DbContext
+from backend.data.aggregates import reason_count_column
 router = APIRouter()
     
 
@@ -17,74 +18,46 @@ def get_all_authentication_ids_with_specific_fraud(reason: str):
     try:
         data = find_unique_authentication_ids_with_specific_fraud(reason)
         return data
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 def find_unique_authentication_ids_with_fraud():
-    db = DbContext()
-    db.connect()
-    cursor = db.connection.cursor()
-
-    query = """
-        SELECT 
-            Authentication_ID,
-            COUNT(*) AS TransactionCount,
-            SUM(Volume) AS TotalVolume,
-            SUM(Calculated_Cost) AS TotalCost
-        FROM CDR
-        WHERE 
-            Authentication_ID IN (
-                SELECT DISTINCT Authentication_ID
-                FROM CDR
-                WHERE CDR_ID IN (SELECT CDR_ID FROM FraudCase)
-            )
-            OR Authentication_ID IS NULL
-        GROUP BY Authentication_ID
-        ORDER BY Authentication_ID
-    """
-
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    columns = [desc[0] for desc in cursor.description]
-    result = [dict(zip(columns, row)) for row in rows]
-
-    db.close()
+    with DbContext() as db:
+        cursor = db.connection.cursor()
+
+        query = """
+            SELECT Authentication_ID, TransactionCount, TotalVolume, TotalCost
+            FROM UserStats
+            WHERE FraudCount > 0 OR Authentication_ID IS NULL
+            ORDER BY Authentication_ID
+        """
+
+        cursor.execute(query)
+        rows = cursor.fetchall()
+        columns = [desc[0] for desc in cursor.description]
+        result = [dict(zip(columns, row)) for row in rows]
     return result
 
 def find_unique_authentication_ids_with_specific_fraud(reason):
-    db = DbContext()
-    db.connect()
-    cursor = db.connection.cursor()
-
-    query = f"""
-        SELECT 
-            Authentication_ID,
-            COUNT(*) AS TransactionCount,
-            SUM(Volume) AS TotalVolume,
-            SUM(Calculated_Cost) AS TotalCost
-        FROM CDR
-        WHERE 
-            Authentication_ID IN (
-                SELECT DISTINCT Authentication_ID
-                FROM CDR
-                WHERE CDR_ID IN (
-                    SELECT CDR_ID 
-                    FROM FraudCase 
-                    WHERE {reason} IS NOT NULL
-                )
-            )
-            OR Authentication_ID IS NULL
-        GROUP BY Authentication_ID
-        ORDER BY Authentication_ID
-    """
-
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    columns = [desc[0] for desc in cursor.description]
-    result = [dict(zip(columns, row)) for row in rows]
-
-    db.close()
+    # Unknown reasons fail before a connection is borrowed
+    count_column = reason_count_column(reason)
+    with DbContext() as db:
+        cursor = db.connection.cursor()
+
+        query = f"""
+            SELECT Authentication_ID, TransactionCount, TotalVolume, TotalCost
+            FROM UserStats
+            WHERE {count_column} > 0 OR Authentication_ID IS NULL
+            ORDER BY Authentication_ID
+        """
+
+        cursor.execute(query)
+        rows = cursor.fetchall()
+        columns = [desc[0] for desc in cursor.description]
+        result = [dict(zip(columns, row)) for row in rows]
     return result
 
 
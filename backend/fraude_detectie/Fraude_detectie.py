@@ -1,13 +1,72 @@
 import sqlite3
 import os
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+import numpy as np
 import pandas as pd
-from typing import Optional
-import math
+from typing import Dict, Iterable, List, Optional, Set
+from backend.fraude_detectie.columnar import haversine_km
+from backend.fraude_detectie.fraud_runs import COMPLETED, FAILED, RuleStats, finish_run, start_run
+from backend.data.aggregates import rebuild_aggregates, refresh_aggregates, create_aggregate_tables, stage_aggregate_keys
+from backend.data.cdr_features import ensure_cdr_features, refresh_cdr_features
+from backend.data.fraud_findings import RULE_SEVERITY, create_fraud_finding_tables, drop_fraud_findings, rule_id
+from backend.data.migrations import ensure_cdr_time_columns
+from backend.fraud_locations.location_refresh import mark_all_dirty, mark_cdrs_dirty, refresh_fraud_locations
+from backend.overlapping.overlap_engine import find_overlapping_pairs, overlap_counts
+
+# Restricts a query on CDR to the rows of an incremental run (see _prepare_scope)
+IN_SCOPE = "CDR_ID IN (SELECT CDR_ID FROM temp.DetectScope)"
+
+# Rules whose findings detect_repeated_behavior counts per user
+REPEATABLE_RULES = (1, 2, 3, 4)
+
+# The detection rules in the order they run
+RULES = (
+    "detect_high_volume_short_duration",
+    "detect_high_cost_low_volume",
+    "detect_rapid_consecutive_sessions",
+    "detect_overlapping_sessions",
+    "detect_repeated_behavior",
+    "detect_data_integrity_violation",
+    "detect_impossible_travel",
+)
+
+# Rules that only read CDR. A parallel run evaluates them in worker
+# processes; the others run after them on the write connection:
+# detect_repeated_behavior counts their findings, detect_data_integrity_violation
+# updates CDR and detect_impossible_travel reads the IDs it cleaned.
+PARALLEL_RULES = RULES[:4]
+
+
+def _collect_rule_findings(detector_class, db_path: str, thresholds: dict, name: str):
+    """Worker process side of FraudDetector._run_parallel_rules."""
+    detector = detector_class(db_path, thresholds=thresholds)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        # One read transaction, so the rule sees a single snapshot throughout
+        conn.execute("BEGIN")
+        findings = detector._collect_rule(name, conn)
+        return findings, detector.rule_stats[name]
+    finally:
+        conn.close()
+
 
 class FraudDetector:
-    def __init__(self, db_path):
+    def __init__(self, db_path, thresholds: Optional[dict] = None):
         self.db_path = db_path
-        self.thresholds = self.load_thresholds()
+        # Given thresholds are used as they are, without touching ThresholdSettings
+        self.thresholds = dict(thresholds) if thresholds is not None else self.load_thresholds()
+        # Stamped on the findings a detect_fraud() run adds or changes
+        self.run_id = None
+        # Wall time, rows read, findings and statements per rule of the last
+        # detect_fraud() run, as recorded in FraudRunRule
+        self.rule_stats: Dict[str, RuleStats] = {}
+        self._active_stats: Optional[RuleStats] = None
+        # Set while a rule's findings are collected instead of written
+        self._collecting = threading.local()
 
     def load_thresholds(self):
         conn = sqlite3.connect(self.db_path)
@@ -55,210 +114,301 @@ class FraudDetector:
         return thresholds
 
     def _create_fraud_table(self, cursor):
-        """Creates the FraudCase table if it doesn't exist."""
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS FraudCase (
-            CDR_ID TEXT NOT NULL,
-            Reason1 TEXT,
-            Reason2 TEXT,
-            Reason3 TEXT,
-            Reason4 TEXT,
-            Reason5 TEXT,
-            Reason6 TEXT,
-            Reason7 TEXT,
-            FOREIGN KEY (CDR_ID) REFERENCES CDR(CDR_ID)
-        )
-        """)
-
-    def _safe_float(self, value: Optional[str]) -> Optional[float]:
-        if value is None:
-            return None
+        """Creates FraudFinding and the FraudCase view over it if they don't exist."""
+        create_fraud_finding_tables(cursor)
+        create_aggregate_tables(cursor)
+
+    @property
+    def rule_timings(self) -> Dict[str, float]:
+        """Wall time in seconds per rule of the last detect_fraud() run."""
+        return {name: stats.elapsed_seconds for name, stats in self.rule_stats.items()}
+
+    def _rows_read(self, count: int):
+        """Credit rows fetched from the database to the rule that is running."""
+        if self._active_stats is not None:
+            self._active_stats.rows_read += count
+
+    @contextmanager
+    def _measure(self, stats: RuleStats, conn: sqlite3.Connection):
+        """Add the wall time and statements executed on conn inside the block to stats."""
+        statements = 0
+
+        def count(_):
+            nonlocal statements
+            statements += 1
+
+        conn.set_trace_callback(count)
+        started = time.perf_counter()
         try:
-            return float(str(value).replace(",", "."))
-        except (ValueError, TypeError):
-            return None
+            yield
+        finally:
+            stats.elapsed_seconds += time.perf_counter() - started
+            stats.statements += statements
+            conn.set_trace_callback(None)
 
     def _update_fraud_table(
         self, cursor, reason: str, ids: list, reason_field: str = "Reason1"
     ):
-        if not ids:
+        self._bulk_update_fraud_table(
+            cursor, [(cdr_id, reason_field, reason) for cdr_id in ids]
+        )
+
+    def _bulk_update_fraud_table(self, cursor, findings: Iterable[tuple]):
+        """
+        Write (CDR_ID, reason_field, reason[, evidence]) findings to FraudFinding in bulk.
+
+        reason_field names the rule as its FraudCase column ("Reason3" is
+        rule 3). The findings are staged in a temp table and applied with a
+        single INSERT ... ON CONFLICT DO UPDATE; when a CDR gets several
+        findings for the same rule, the last one wins.
+        """
+        findings = list(findings)
+        if self._active_stats is not None:
+            self._active_stats.findings += len(findings)
+        collected = getattr(self._collecting, "findings", None)
+        if collected is not None:
+            # A rule running in a worker process; merged by _run_parallel_rules
+            collected.extend(findings)
+            return
+        if not findings:
             return
 
-        placeholders = ",".join(["?"] * len(ids))
+        rules = {field: rule_id(field) for field in {finding[1] for finding in findings}}
+
+        cursor.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS FraudFindingStage (
+            Seq INTEGER PRIMARY KEY,
+            CDR_ID TEXT NOT NULL,
+            Rule_ID INTEGER NOT NULL,
+            Severity INTEGER NOT NULL,
+            Evidence REAL,
+            Reason TEXT NOT NULL
+        )
+        """)
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS FraudCaseTouched (CDR_ID TEXT PRIMARY KEY)")
+        cursor.execute("DELETE FROM temp.FraudFindingStage")
+        cursor.executemany(
+            "INSERT INTO temp.FraudFindingStage (CDR_ID, Rule_ID, Severity, Evidence, Reason) VALUES (?, ?, ?, ?, ?)",
+            (
+                (
+                    finding[0],
+                    rules[finding[1]],
+                    RULE_SEVERITY[rules[finding[1]]],
+                    float(finding[3]) if len(finding) > 3 and finding[3] is not None else None,
+                    finding[2],
+                )
+                for finding in findings
+            ),
+        )
+        # Remembered for the aggregate refresh at the end of the run: the
+        # CDRs that get a new finding or a changed one
+        cursor.execute("""
+        INSERT OR IGNORE INTO temp.FraudCaseTouched
+        SELECT s.CDR_ID FROM temp.FraudFindingStage s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM FraudFinding f
+            WHERE f.CDR_ID = s.CDR_ID AND f.Rule_ID = s.Rule_ID
+              AND (f.Reason, f.Evidence) IS (s.Reason, s.Evidence)
+        )
+        """)
         cursor.execute(
-            f"""
-            SELECT CDR_ID FROM FraudCase 
-            WHERE CDR_ID IN ({placeholders}) AND {reason_field} = ?
-            """,
-            ids + [reason],
+            """
+        INSERT INTO FraudFinding (CDR_ID, Rule_ID, Severity, Evidence, Reason, Run_ID)
+        SELECT CDR_ID, Rule_ID, Severity, Evidence, Reason, ? FROM temp.FraudFindingStage
+        WHERE true
+        ORDER BY Seq
+        ON CONFLICT(CDR_ID, Rule_ID) DO UPDATE SET
+            Severity = excluded.Severity,
+            Evidence = excluded.Evidence,
+            Reason = excluded.Reason,
+            Run_ID = excluded.Run_ID
+        WHERE (Reason, Evidence) IS NOT (excluded.Reason, excluded.Evidence)
+        """,
+            (self.run_id,),
         )
-        existing_ids_with_same_reason = {row[0] for row in cursor.fetchall()}
+        cursor.execute("DELETE FROM temp.FraudFindingStage")
+
+    def _prepare_scope(self, cursor, import_filename: str) -> Set[str]:
+        """
+        Temp tables describing an incremental run over the CDRs of one import.
+
+        DetectScope holds the imported CDR_IDs, DetectKeys their
+        (Authentication_ID, Charge_Point_ID) pairs and DetectAuth the time span
+        of the imported sessions per Authentication_ID. Returns the CDR_IDs.
+        """
+        for statement in (
+            "CREATE TEMP TABLE IF NOT EXISTS DetectScope (CDR_ID TEXT PRIMARY KEY)",
+            "CREATE TEMP TABLE IF NOT EXISTS DetectKeys (Authentication_ID TEXT, Charge_Point_ID TEXT)",
+            """CREATE TEMP TABLE IF NOT EXISTS DetectAuth (
+                Authentication_ID TEXT PRIMARY KEY, Min_start INTEGER, Max_end INTEGER)""",
+        ):
+            cursor.execute(statement)
+        for table in ("DetectScope", "DetectKeys", "DetectAuth"):
+            cursor.execute(f"DELETE FROM temp.{table}")
 
         cursor.execute(
-            f"""
-            SELECT CDR_ID FROM FraudCase 
-            WHERE CDR_ID IN ({placeholders})
-            """,
-            ids,
+            "INSERT OR IGNORE INTO temp.DetectScope SELECT CDR_ID FROM CDR WHERE import_filename = ?",
+            (import_filename,),
         )
-        all_existing_ids = {row[0] for row in cursor.fetchall()}
-
-        update_ids = all_existing_ids - existing_ids_with_same_reason
-        if update_ids:
-            update_sql = f"""
-            UPDATE FraudCase 
-            SET {reason_field} = ?
-            WHERE CDR_ID = ?
-            """
-            cursor.executemany(update_sql, [(reason, cdr_id) for cdr_id in update_ids])
-
-        new_ids = [cdr_id for cdr_id in ids if cdr_id not in all_existing_ids]
-        if new_ids:
-            insert_sql = f"""
-            INSERT INTO FraudCase (CDR_ID, {reason_field}) 
-            VALUES (?, ?)
-            """
-            cursor.executemany(insert_sql, [(cdr_id, reason) for cdr_id in new_ids])
+        cursor.execute(f"""
+        INSERT INTO temp.DetectKeys
+        SELECT DISTINCT Authentication_ID, Charge_Point_ID FROM CDR WHERE {IN_SCOPE}
+        """)
+        cursor.execute(f"""
+        INSERT INTO temp.DetectAuth
+        SELECT Authentication_ID, MIN(Start_epoch), MAX(End_epoch)
+        FROM CDR
+        WHERE {IN_SCOPE} AND Authentication_ID IS NOT NULL
+        GROUP BY Authentication_ID
+        """)
+        cursor.execute("SELECT CDR_ID FROM temp.DetectScope")
+        return {row[0] for row in cursor.fetchall()}
 
-    def detect_high_volume_short_duration(self, cursor):
+    def detect_high_volume_short_duration(self, cursor, scope: Optional[Set[str]] = None):
         max_vol = self.thresholds["MAX_VOLUME_KWH"]
         max_dur = self.thresholds["MAX_DURATION_MINUTES"]
-        
-        cursor.execute("""
-        SELECT CDR_ID
-        FROM CDR
-        WHERE Volume IS NOT NULL AND Volume != '' AND Duration IS NOT NULL AND Duration != ''
-        """)
-        valid_records = cursor.fetchall()
-        fraud_ids = []
 
-        for row in valid_records:
-            cdr_id = row[0]
-            cursor.execute(
-                "SELECT Volume, Duration FROM CDR WHERE CDR_ID = ?",
-                (cdr_id,),
-            )
-            volume_str, duration = cursor.fetchone()
-            try:
-                volume = self._safe_float(volume_str)
-                if volume is None:
-                    continue
-                h, m, s = map(int, duration.split(":"))
-                duration_minutes = h * 60 + m + s / 60
-                if volume > max_vol and duration_minutes < max_dur:
-                    fraud_ids.append(cdr_id)
-            except (ValueError, AttributeError):
-                continue
+        # Volume and duration were parsed into CdrFeatures at import
+        cursor.execute(
+            f"""
+        SELECT CDR_ID
+        FROM CdrFeatures
+        WHERE Volume_kWh > ? AND Duration_Minutes < ?
+        {"AND " + IN_SCOPE if scope is not None else ""}
+        """,
+            (max_vol, max_dur),
+        )
+        fraud_ids = [row[0] for row in cursor.fetchall()]
+        self._rows_read(len(fraud_ids))
 
         self._update_fraud_table(cursor, "High volume in short duration", fraud_ids, "Reason1")
 
-    def detect_high_cost_low_volume(self, cursor):
+    def detect_high_cost_low_volume(self, cursor, scope: Optional[Set[str]] = None):
         min_cost = self.thresholds["MIN_COST_THRESHOLD"]
         max_vol = self.thresholds["MAX_VOLUME_KWH"]
         
-        cursor.execute("""
-        SELECT CDR_ID, Volume, Calculated_Cost
-        FROM CDR
-        WHERE Volume IS NOT NULL AND Volume != '' AND Calculated_Cost IS NOT NULL
-        """)
-        results = cursor.fetchall()
-        fraud_data = []
-
-        for row in results:
-            cdr_id, volume_str, cost = row
-            try:
-                volume = self._safe_float(volume_str)
-                if volume is None or cost is None:
-                    continue
-                if cost > min_cost and volume < max_vol:
-                    ratio = cost / volume
-                    fraud_data.append((cdr_id, ratio))
-            except (ValueError, TypeError, ZeroDivisionError):
-                continue
+        # Cost_per_kWh is NULL where there is no cost or volume to divide
+        cursor.execute(
+            f"""
+        SELECT CDR_ID, Cost_per_kWh
+        FROM CdrFeatures
+        WHERE Cost > ? AND Volume_kWh < ? AND Cost_per_kWh IS NOT NULL
+        {"AND " + IN_SCOPE if scope is not None else ""}
+        """,
+            (min_cost, max_vol),
+        )
+        fraud_data = cursor.fetchall()
+        self._rows_read(len(fraud_data))
 
-        for cdr_id, ratio in fraud_data:
-            reason = f"Unusual cost per kWh (ratio: {ratio:.2f})"
-            self._update_fraud_table(cursor, reason, [cdr_id], "Reason2")
+        self._bulk_update_fraud_table(
+            cursor,
+            [
+                (cdr_id, "Reason2", f"Unusual cost per kWh (ratio: {ratio:.2f})", ratio)
+                for cdr_id, ratio in fraud_data
+            ],
+        )
 
-    def detect_rapid_consecutive_sessions(self, cursor):
+    def detect_rapid_consecutive_sessions(self, cursor, scope: Optional[Set[str]] = None):
         min_gap = self.thresholds["MIN_TIME_GAP_MINUTES"]
-        
+
+        scope_filter = ""
+        if scope is not None:
+            # A new session changes its own predecessor and that of the session after it
+            scope_filter = """AND (CDR_ID IN (SELECT CDR_ID FROM temp.DetectScope)
+                 OR Prev_CDR_ID IN (SELECT CDR_ID FROM temp.DetectScope))"""
+
+        # The gap to the previous session of the same user and charge point is in CdrFeatures
         cursor.execute(
             f"""
-        SELECT CDR_ID
-        FROM (
-            SELECT 
-                CDR_ID,
-                LAG(End_datetime) OVER (
-                    PARTITION BY Authentication_ID, Charge_Point_ID 
-                    ORDER BY Start_datetime
-                ) AS PrevEnd,
-                Start_datetime
-            FROM CDR
-        )
-        WHERE 
-            PrevEnd IS NOT NULL
-            AND ((julianday(Start_datetime) - julianday(PrevEnd)) * 1440 < ?)
+        SELECT CDR_ID, Prev_Gap_Seconds / 60.0
+        FROM CdrFeatures
+        WHERE Prev_Gap_Seconds < ? * 60
+        {scope_filter}
         """,
             (min_gap,),
         )
-        fraud_ids = [row[0] for row in cursor.fetchall()]
-        self._update_fraud_table(
-            cursor,
-            f"Rapid consecutive sessions (<{min_gap} min)",
-            fraud_ids,
-            "Reason3",
+        rows = cursor.fetchall()
+        self._rows_read(len(rows))
+        reason = f"Rapid consecutive sessions (<{min_gap} min)"
+        # Evidence is the gap to the previous session in minutes
+        self._bulk_update_fraud_table(
+            cursor, [(cdr_id, "Reason3", reason, gap) for cdr_id, gap in rows]
         )
 
-    def detect_overlapping_sessions(self, cursor):
-        cursor.execute("""
-        WITH Overlaps AS (
-            SELECT a.CDR_ID
-            FROM CDR a
-            JOIN CDR b ON a.Authentication_ID = b.Authentication_ID AND a.CDR_ID != b.CDR_ID
-            AND (
-                datetime(a.Start_datetime) BETWEEN datetime(b.Start_datetime) AND datetime(b.End_datetime)
-                OR datetime(a.End_datetime) BETWEEN datetime(b.Start_datetime) AND datetime(b.End_datetime)
-                OR datetime(b.Start_datetime) BETWEEN datetime(a.Start_datetime) AND datetime(a.End_datetime)
-            )
-        )
-        SELECT CDR_ID FROM Overlaps GROUP BY CDR_ID
-        """)
-        fraud_ids = [row[0] for row in cursor.fetchall()]
+    def detect_overlapping_sessions(self, cursor, scope: Optional[Set[str]] = None):
+        if scope is None:
+            cursor.execute("""
+            SELECT CDR_ID, Authentication_ID, Start_epoch, End_epoch
+            FROM CDR
+            WHERE Authentication_ID IS NOT NULL
+            """)
+            sessions = cursor.fetchall()
+            self._rows_read(len(sessions))
+            # Touching sessions count as overlapping, like the former BETWEEN self-join
+            fraud_ids = sorted(overlap_counts(sessions, inclusive=True))
+        else:
+            # Only sessions of the same user within the time span of the imported ones can overlap them
+            cursor.execute("""
+            SELECT c.CDR_ID, c.Authentication_ID, c.Start_epoch, c.End_epoch
+            FROM temp.DetectAuth a
+            JOIN CDR c ON c.Authentication_ID = a.Authentication_ID
+                      AND c.Start_epoch <= a.Max_end AND c.End_epoch >= a.Min_start
+            """)
+            sessions = cursor.fetchall()
+            self._rows_read(len(sessions))
+            fraud_ids = sorted({
+                cdr_id
+                for pair in find_overlapping_pairs(sessions, inclusive=True)
+                if pair[0] in scope or pair[1] in scope
+                for cdr_id in pair
+            })
         self._update_fraud_table(cursor, "Overlapping sessions", fraud_ids, "Reason4")
 
-    def detect_repeated_behavior(self, cursor):
+    def detect_repeated_behavior(self, cursor, scope: Optional[Set[str]] = None):
         threshold = self.thresholds["THRESHOLD"]
-        
+
+        source = "FraudFinding f JOIN CDR c ON c.CDR_ID = f.CDR_ID"
+        if scope is not None:
+            # Counts only change for the users that appear in the import
+            source = """(SELECT DISTINCT Authentication_ID FROM temp.DetectKeys) a
+                JOIN CDR c ON c.Authentication_ID IS a.Authentication_ID
+                JOIN FraudFinding f ON f.CDR_ID = c.CDR_ID"""
+
         cursor.execute(
-            """
-        WITH AllReasons AS (
-            SELECT CDR_ID, Reason1 AS Reason FROM FraudCase WHERE Reason1 IS NOT NULL
-            UNION ALL SELECT CDR_ID, Reason2 FROM FraudCase WHERE Reason2 IS NOT NULL
-            UNION ALL SELECT CDR_ID, Reason3 FROM FraudCase WHERE Reason3 IS NOT NULL
-            UNION ALL SELECT CDR_ID, Reason4 FROM FraudCase WHERE Reason4 IS NOT NULL
-        )
+            f"""
         SELECT 
             c.Authentication_ID,
-            ar.Reason,
+            f.Reason,
             COUNT(*) AS count,
-            GROUP_CONCAT(ar.CDR_ID) AS cdr_ids
-        FROM AllReasons ar
-        JOIN CDR c ON ar.CDR_ID = c.CDR_ID
-        GROUP BY c.Authentication_ID, ar.Reason
+            GROUP_CONCAT(f.CDR_ID) AS cdr_ids
+        FROM {source}
+        WHERE f.Rule_ID IN ({", ".join(map(str, REPEATABLE_RULES))})
+        GROUP BY c.Authentication_ID, f.Reason
         HAVING count >= ?
         """,
             (threshold,),
         )
-        for auth_id, reason, count, cdr_ids_str in cursor.fetchall():
-            cdr_ids = cdr_ids_str.split(",")
+        groups = cursor.fetchall()
+        self._rows_read(len(groups))
+        findings = []
+        for auth_id, reason, count, cdr_ids_str in groups:
             recurring_reason = f"Repeated behavior ({count}x): {reason}"
-            self._update_fraud_table(cursor, recurring_reason, cdr_ids, "Reason5")
+            findings.extend(
+                (cdr_id, "Reason5", recurring_reason, count) for cdr_id in cdr_ids_str.split(",")
+            )
+        self._bulk_update_fraud_table(cursor, findings)
 
-    def detect_data_integrity_violation(self, cursor):
+    def detect_data_integrity_violation(self, cursor, scope: Optional[Set[str]] = None):
         fraud_ids = []
-        cursor.execute("SELECT CDR_ID, Authentication_ID, Charge_Point_ID FROM CDR")
-        for cdr_id, auth_id, charge_point_id in cursor.fetchall():
+        # Users whose sessions change IDs, under their old and new ID
+        cleaned_users = set()
+        cursor.execute(
+            "SELECT CDR_ID, Authentication_ID, Charge_Point_ID FROM CDR"
+            + (f" WHERE {IN_SCOPE}" if scope is not None else "")
+        )
+        rows = cursor.fetchall()
+        self._rows_read(len(rows))
+        for cdr_id, auth_id, charge_point_id in rows:
             issues = []
             if not cdr_id or str(cdr_id).strip() == "":
                 continue
@@ -268,93 +418,252 @@ class FraudDetector:
                 issues.append("Missing Charge_Point_ID")
             if isinstance(auth_id, str) and auth_id.strip() != auth_id:
                 cleaned = auth_id.strip()
+                # The totals under the old ID are refreshed with the changed fraud cases
+                stage_aggregate_keys(cursor, "SELECT ?", (cdr_id,))
                 cursor.execute(
                     "UPDATE CDR SET Authentication_ID = ? WHERE CDR_ID = ?",
                     (cleaned, cdr_id),
                 )
                 issues.append("Cleaned Authentication_ID")
+                cleaned_users.update((auth_id, cleaned))
             if (
                 isinstance(charge_point_id, str)
                 and charge_point_id.strip() != charge_point_id
             ):
                 cleaned = charge_point_id.strip()
+                stage_aggregate_keys(cursor, "SELECT ?", (cdr_id,))
                 cursor.execute(
                     "UPDATE CDR SET Charge_Point_ID = ? WHERE CDR_ID = ?",
                     (cleaned, cdr_id),
                 )
                 issues.append("Cleaned Charge_Point_ID")
+                cleaned_users.add(auth_id.strip() if isinstance(auth_id, str) else auth_id)
             if issues:
                 reason = "Data integrity violation: " + "; ".join(issues)
                 fraud_ids.append((cdr_id, reason))
-        for cdr_id, reason in fraud_ids:
-            self._update_fraud_table(cursor, reason, [cdr_id], "Reason6")
+        if cleaned_users:
+            # Which session precedes which changed for them
+            refresh_cdr_features(cursor, cleaned_users)
+        self._bulk_update_fraud_table(
+            cursor, [(cdr_id, "Reason6", reason) for cdr_id, reason in fraud_ids]
+        )
 
-    def detect_impossible_travel(self, cursor):
+    def _charge_point_coordinates(self, cursor) -> pd.DataFrame:
+        """Latitude/Longitude of every geocoded charge point, indexed by Charge_Point_ID."""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ChargePoint'")
+        if not cursor.fetchone():
+            return pd.DataFrame(columns=["Latitude", "Longitude"], dtype="float64")
+        return pd.read_sql_query(
+            """
+            SELECT Charge_Point_ID, Latitude, Longitude
+            FROM ChargePoint
+            WHERE Latitude IS NOT NULL AND Longitude IS NOT NULL
+            """,
+            cursor.connection,
+            index_col="Charge_Point_ID",
+        )
+
+    def detect_impossible_travel(self, cursor, scope: Optional[Set[str]] = None):
         min_distance = self.thresholds["MIN_DISTANCE_KM"]
         min_travel_time = self.thresholds["MIN_TRAVEL_TIME_MINUTES"]
-        
-        cursor.execute("""
-        SELECT CDR_ID, Authentication_ID, Start_datetime, End_datetime, Charge_Point_ID
-        FROM CDR
-        WHERE Start_datetime IS NOT NULL AND End_datetime IS NOT NULL
-        ORDER BY Authentication_ID, Start_datetime
-        """)
-        sessions = cursor.fetchall()
-        # You need to define location_dict and prev_session before using them
-        location_dict = {}
-        prev_session = {}
-        fraud_ids = []
-        for cdr_id, auth_id, start_dt, end_dt, charge_point_id in sessions:
-            if auth_id in prev_session:
-                _, prev_end_dt, prev_point = prev_session[auth_id]
-                if charge_point_id in location_dict and prev_point in location_dict:
-                    lat1, lon1 = location_dict[prev_point]
-                    lat2, lon2 = location_dict[charge_point_id]
-                    distance = self._calculate_distance_km(lat1, lon1, lat2, lon2)
-                    time_diff = (
-                        pd.to_datetime(start_dt) - pd.to_datetime(prev_end_dt)
-                    ).total_seconds() / 60
-                    if (
-                        distance >= min_distance
-                        and time_diff < min_travel_time
-                    ):
-                        reason = f"Unrealistic movement: {distance:.1f} km in {time_diff:.1f} min"
-                        fraud_ids.append((cdr_id, reason))
-            prev_session[auth_id] = (cdr_id, end_dt, charge_point_id)
-        for cdr_id, reason in fraud_ids:
-            self._update_fraud_table(cursor, reason, [cdr_id], "Reason7")
-
-    def _calculate_distance_km(self, lat1, lon1, lat2, lon2):
-        R = 6371
-        dlat = math.radians(lat2 - lat1)
-        dlon = math.radians(lon2 - lon1)
-        a = (
-            math.sin(dlat / 2) ** 2
-            + math.cos(math.radians(lat1))
-            * math.cos(math.radians(lat2))
-            * math.sin(dlon / 2) ** 2
+
+        coordinates = self._charge_point_coordinates(cursor)
+        self._rows_read(len(coordinates))
+        if coordinates.empty:
+            return
+
+        scope_filter = ""
+        if scope is not None:
+            # A pair is in scope when either of its sessions was imported
+            scope_filter = """AND (f.CDR_ID IN (SELECT CDR_ID FROM temp.DetectScope)
+                 OR f.Travel_Prev_CDR_ID IN (SELECT CDR_ID FROM temp.DetectScope))"""
+        # Only pairs quick enough to be suspect need a distance
+        sessions = pd.read_sql_query(
+            f"""
+        SELECT f.CDR_ID, f.Travel_Gap_Minutes, c.Charge_Point_ID, p.Charge_Point_ID AS Prev_Charge_Point_ID
+        FROM CdrFeatures f
+        JOIN CDR c ON c.CDR_ID = f.CDR_ID
+        JOIN CDR p ON p.CDR_ID = f.Travel_Prev_CDR_ID
+        WHERE f.Travel_Gap_Minutes < ?
+        {scope_filter}
+        """,
+            cursor.connection,
+            params=(min_travel_time,),
+        )
+        self._rows_read(len(sessions))
+        if sessions.empty:
+            return
+
+        def coordinates_of(charge_point_ids: pd.Series):
+            positions = coordinates.index.get_indexer(charge_point_ids)
+            known = positions >= 0
+            return (
+                np.where(known, coordinates["Latitude"].to_numpy()[positions], np.nan),
+                np.where(known, coordinates["Longitude"].to_numpy()[positions], np.nan),
+            )
+
+        distance = haversine_km(
+            *coordinates_of(sessions["Prev_Charge_Point_ID"]), *coordinates_of(sessions["Charge_Point_ID"])
+        )
+        gap = sessions["Travel_Gap_Minutes"].to_numpy()
+        # NaN distances compare False, so charge points without coordinates are never flagged
+        mask = distance >= min_distance
+
+        cdr_ids = sessions["CDR_ID"].to_numpy()
+        self._bulk_update_fraud_table(
+            cursor,
+            [
+                (cdr_ids[i], "Reason7", f"Unrealistic movement: {distance[i]:.1f} km in {gap[i]:.1f} min", distance[i])
+                for i in np.flatnonzero(mask)
+            ],
         )
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-        return R * c
 
-    def detect_fraud(self) -> pd.DataFrame:
+    def _collect_rule(self, name: str, conn: sqlite3.Connection) -> List[tuple]:
+        """Run one rule on conn and return its findings instead of writing them."""
+        stats = self.rule_stats[name] = RuleStats()
+        self._collecting.findings = []
+        self._active_stats = stats
+        try:
+            with self._measure(stats, conn):
+                getattr(self, name)(conn.cursor())
+            return self._collecting.findings
+        finally:
+            self._collecting.findings = None
+            self._active_stats = None
+
+    def _run_parallel_rules(self, cursor, workers: int):
+        """
+        Evaluate PARALLEL_RULES in worker processes and write their findings through cursor.
+
+        Processes rather than threads, as the rules' pandas work would
+        serialize on the GIL. Every spawned worker re-imports pandas and this
+        module first, and since the first three rules became indexed queries
+        over CdrFeatures that start-up costs more than it saves: serial runs
+        were faster from 2,000 up to 300,000 CDRs in bench_parallel_detection,
+        so only callers that measured a gain pass parallel=True.
+
+        Each worker reads through its own connection in a single read
+        transaction. The caller has committed everything the rules read and
+        holds the write lock (BEGIN IMMEDIATE) without writing until the
+        merge, so in WAL mode every worker sees the database as it was when
+        the run started, whenever its process gets to its first read. The
+        findings are merged in rule order on cursor, inside the caller's
+        write transaction.
+        """
+        # Spawned, not forked: the API server forks from a threaded process
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            futures = [
+                executor.submit(_collect_rule_findings, type(self), self.db_path, self.thresholds, name)
+                for name in PARALLEL_RULES
+            ]
+            results = [future.result() for future in futures]
+        for name, (findings, stats) in zip(PARALLEL_RULES, results):
+            # The merge counts towards the rule; its findings were counted by the worker
+            with self._measure(stats, cursor.connection):
+                self._bulk_update_fraud_table(cursor, findings)
+            self.rule_stats[name] = stats
+
+    def _run_rule(self, name: str, cursor, scope: Optional[Set[str]]):
+        stats = self.rule_stats[name] = RuleStats()
+        rule = getattr(self, name)
+        self._active_stats = stats
         try:
+            with self._measure(stats, cursor.connection):
+                # Full runs keep the plain rule(cursor) call
+                if scope is None:
+                    rule(cursor)
+                else:
+                    rule(cursor, scope)
+        finally:
+            self._active_stats = None
+
+    def detect_fraud(
+        self,
+        import_filename: Optional[str] = None,
+        parallel: bool = False,
+        max_workers: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """
+        Run all rules and update FraudCase in place.
+
+        With import_filename only the CDRs of that import are evaluated, plus
+        the sessions they can interact with (same user/charge point for the
+        consecutive, overlap and travel rules, same user for repeated
+        behavior), and only their fraud cases are returned.
+
+        With parallel=True a full run evaluates PARALLEL_RULES in up to
+        max_workers processes (default: one per CPU) before the remaining
+        rules, see _run_parallel_rules for when that pays off; with a single
+        worker it runs serially.
+        Incremental runs are scoped through temp tables only their own
+        connection can see, so they always run serially.
+
+        Every run is recorded in FraudRun, with per-rule statistics in
+        FraudRunRule (also left in rule_stats). A failed run is rolled back,
+        recorded with its error, and returns an empty DataFrame.
+        """
+        self.rule_stats = {}
+        self.run_id = None
+        workers = min(len(PARALLEL_RULES), max_workers or os.cpu_count() or 1)
+        parallel = parallel and import_filename is None and workers > 1
+        conn = None
+        try:
+            self.run_id = start_run(
+                self.db_path,
+                "full" if import_filename is None else "incremental",
+                import_filename,
+                workers if parallel else 1,
+                self.thresholds,
+            )
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
+            if parallel:
+                # The workers read while this connection writes
+                conn.execute("PRAGMA journal_mode=WAL")
             self._create_fraud_table(cursor)
-
-            self.detect_high_volume_short_duration(cursor)
-            self.detect_high_cost_low_volume(cursor)
-            self.detect_rapid_consecutive_sessions(cursor)
-            self.detect_overlapping_sessions(cursor)
-            self.detect_repeated_behavior(cursor)
-            self.detect_data_integrity_violation(cursor)
-            self.detect_impossible_travel(cursor)
+            ensure_cdr_time_columns(cursor)
+            # Imports compute the features of their CDRs; this catches rows inserted otherwise
+            ensure_cdr_features(cursor)
+            if parallel:
+                # The workers have to see the backfilled columns and features.
+                # The write lock is then held until the merge is committed:
+                # no other writer (an import job, a threshold-triggered run)
+                # can commit before every worker has taken its snapshot, so
+                # all rules read the same database state.
+                conn.commit()
+                conn.execute("BEGIN IMMEDIATE")
+
+            scope = None
+            if import_filename is not None:
+                scope = self._prepare_scope(cursor, import_filename)
+
+            remaining = RULES
+            if parallel:
+                self._run_parallel_rules(cursor, workers)
+                remaining = [name for name in RULES if name not in PARALLEL_RULES]
+            for name in remaining:
+                self._run_rule(name, cursor, scope)
+
+            # Per-user and per-charge-point totals and the map locations of the
+            # charge points. The import already counted its own CDRs, so an
+            # incremental run only refreshes those whose fraud case changed
+            if scope is None:
+                rebuild_aggregates(cursor)
+                mark_all_dirty(cursor)
+            else:
+                cursor.execute("CREATE TEMP TABLE IF NOT EXISTS FraudCaseTouched (CDR_ID TEXT PRIMARY KEY)")
+                changed = "SELECT CDR_ID FROM temp.FraudCaseTouched"
+                refresh_aggregates(cursor, changed)
+                mark_cdrs_dirty(cursor, changed)
+            refresh_fraud_locations(cursor)
 
             conn.commit()
 
             df = pd.read_sql_query(
-                """
+                f"""
                 SELECT 
                     fc.CDR_ID, 
                     fc.Reason1 AS Reason1,
@@ -374,25 +683,34 @@ class FraudDetector:
                     END AS CostPerKwh
                 FROM FraudCase AS fc
                 JOIN CDR AS c ON c.CDR_ID = fc.CDR_ID
+                {"WHERE fc." + IN_SCOPE if scope is not None else ""}
                 ORDER BY fc.CDR_ID
             """,
                 conn,
             )
+            finish_run(self.db_path, self.run_id, COMPLETED, self.rule_stats)
             return df
         except Exception as e:
             print(f"Error during fraud detection: {str(e)}")
+            if conn is not None:
+                conn.rollback()
+            if self.run_id is not None:
+                try:
+                    finish_run(self.db_path, self.run_id, FAILED, self.rule_stats, f"{type(e).__name__}: {e}")
+                except sqlite3.Error as record_error:
+                    print(f"Could not record failed fraud run {self.run_id}: {record_error}")
             return pd.DataFrame()
         finally:
-            if "conn" in locals():
+            if conn is not None:
                 conn.close()
 
     def run_fraud_detection(db_path: str):
-        """Run fraud detection and reset FraudCase table"""
+        """Run fraud detection and reset the fraud findings"""
         try:
             # Clear existing fraud cases
             conn = sqlite3.connect(db_path)
             cursor = conn.cursor()
-            cursor.execute("DROP TABLE IF EXISTS FraudCase")
+            drop_fraud_findings(cursor)
             conn.commit()
             conn.close()
             
@@ -4,6 +4,8 @@ from pydantic import BaseModel
 import sqlite3
 from fastapi import BackgroundTasks
 from backend.fraude_detectie import Fraude_detectie
+from backend.fraude_detectie.threshold_simulation import simulate_thresholds
+from backend.data.DbPool import get_pool
 import os
 
 router = APIRouter()
@@ -18,23 +20,37 @@ class FraudThresholds(BaseModel):
     minDistanceKm: float
     minTravelTimeMinutes: float
 
-def safe_close_connection(conn):
+    def settings(self) -> list:
+        """(name, value) rows of ThresholdSettings, as FraudDetector reads them."""
+        return [
+            ("MAX_VOLUME_KWH", self.maxVolumeKwh),
+            ("MAX_DURATION_MINUTES", self.maxDurationMinutes),
+            ("MIN_COST_THRESHOLD", self.minCostThreshold),
+            ("MIN_TIME_GAP_MINUTES", self.minTimeGapMinutes),
+            ("THRESHOLD", self.behaviorThreshold),
+            ("MIN_DISTANCE_KM", self.minDistanceKm),
+            ("MIN_TRAVEL_TIME_MINUTES", self.minTravelTimeMinutes),
+        ]
+
+def safe_close_connection(pool, conn):
     try:
-        if conn:
-            conn.close()
+        if pool and conn:
+            pool.release(conn)
     except (sqlite3.Error, socket.error):
         pass  # Ignore connection closing errors
 
 # Get current thresholds
 @router.get("/api/settings/fraud-thresholds")
 def get_fraud_thresholds():
+    pool = None
     conn = None
     try:
         # Get the absolute path to the database file in the backend directory
         base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
         db_path = os.path.join(base_dir, "backend", "project-d.db")
 
-        conn = sqlite3.connect(db_path)        
+        pool = get_pool(db_path)
+        conn = pool.acquire()
         cursor = conn.cursor()
 
         cursor.execute("SELECT name, value FROM ThresholdSettings")
@@ -57,18 +73,20 @@ def get_fraud_thresholds():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
-        safe_close_connection(conn)
+        safe_close_connection(pool, conn)
 
 # Update thresholds
 @router.post("/api/settings/fraud-thresholds")
 def update_fraud_thresholds(thresholds: FraudThresholds, background_tasks: BackgroundTasks):
+    pool = None
     conn = None
     try:     
         # Get the absolute path to the database file in the backend directory
         base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
         db_path = os.path.join(base_dir, "backend", "project-d.db")
 
-        conn = sqlite3.connect(db_path)
+        pool = get_pool(db_path)
+        conn = pool.acquire()
         cursor = conn.cursor()
 
         # Create table if not exists
@@ -80,15 +98,7 @@ def update_fraud_thresholds(thresholds: FraudThresholds, background_tasks: Backg
         """)
 
         # Prepare data for upsert
-        data = [
-            ("MAX_VOLUME_KWH", thresholds.maxVolumeKwh),
-            ("MAX_DURATION_MINUTES", thresholds.maxDurationMinutes),
-            ("MIN_COST_THRESHOLD", thresholds.minCostThreshold),
-            ("MIN_TIME_GAP_MINUTES", thresholds.minTimeGapMinutes),
-            ("THRESHOLD", thresholds.behaviorThreshold),
-            ("MIN_DISTANCE_KM", thresholds.minDistanceKm),
-            ("MIN_TRAVEL_TIME_MINUTES", thresholds.minTravelTimeMinutes),
-        ]
+        data = thresholds.settings()
 
         # Upsert all values
         cursor.executemany(
@@ -111,4 +121,15 @@ def update_fraud_thresholds(thresholds: FraudThresholds, background_tasks: Backg
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
-        safe_close_connection(conn)
+        safe_close_connection(pool, conn)
+
+# Flag counts per rule for candidate thresholds, without saving them or rerunning detection
+@router.post("/api/settings/fraud-thresholds/simulate")
+def simulate_fraud_thresholds(thresholds: FraudThresholds):
+    try:
+        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        db_path = os.path.join(base_dir, "backend", "project-d.db")
+
+        return simulate_thresholds(db_path, dict(thresholds.settings()))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+
+def to_float_series(values: pd.Series) -> pd.Series:
+    """Parse volumes and other numbers to floats: accepts comma decimals, unparseable values become NaN."""
+    as_text = values.astype("string").str.replace(",", ".", regex=False).str.strip()
+    return pd.to_numeric(as_text, errors="coerce").astype("float64")
+
+
+def duration_minutes_series(values: pd.Series) -> pd.Series:
+    """Parse "HH:MM:SS" durations to minutes in one pass, anything else becomes NaN."""
+    parts = values.astype("string").str.extract(
+        r"^\s*([+-]?\d+)\s*:\s*([+-]?\d+)\s*:\s*([+-]?\d+)\s*$"
+    )
+    hours = pd.to_numeric(parts[0], errors="coerce")
+    minutes = pd.to_numeric(parts[1], errors="coerce")
+    seconds = pd.to_numeric(parts[2], errors="coerce")
+    return (hours * 60 + minutes + seconds / 60).astype("float64")
+
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle distance in km between arrays of points, NaN where a coordinate is missing."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype="float64")) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def impossible_travel_mask(
+    group: np.ndarray,
+    start_epoch: np.ndarray,
+    end_epoch: np.ndarray,
+    latitude: np.ndarray,
+    longitude: np.ndarray,
+    min_distance_km: float,
+    min_travel_minutes: float,
+):
+    """
+    Flag sessions that start too far from where the previous session of the same user ended.
+
+    The arrays describe sessions sorted by group (the user) and start time.
+    Every session is compared with the one before it in its group: the
+    distance between their charge points and the minutes from the previous
+    end to this start. Returns (mask, distance_km, gap_minutes); row 0 and
+    the first session of every group have no predecessor and are never
+    flagged, nor are sessions where either charge point has no coordinates.
+    """
+    group = np.asarray(group)
+    distance = np.full(len(group), np.nan)
+    gap = np.full(len(group), np.nan)
+    if len(group) < 2:
+        return np.zeros(len(group), dtype=bool), distance, gap
+
+    has_previous = np.zeros(len(group), dtype=bool)
+    has_previous[1:] = group[1:] == group[:-1]
+    distance[1:] = haversine_km(latitude[:-1], longitude[:-1], latitude[1:], longitude[1:])
+    gap[1:] = (np.asarray(start_epoch[1:], dtype="float64") - np.asarray(end_epoch[:-1], dtype="float64")) / 60
+    # NaN distances compare False, so charge points without coordinates are never flagged
+    mask = has_previous & (distance >= min_distance_km) & (gap < min_travel_minutes)
+    return mask, distance, gap
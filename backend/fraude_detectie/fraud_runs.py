@@ -0,0 +1,124 @@
+import json
+import sqlite3
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+RUNNING, COMPLETED, FAILED = "running", "completed", "failed"
+
+# One row per detect_fraud() call. Run_ID is what FraudFinding.Run_ID
+# refers to; a run that never finished (the process died) stays "running".
+FRAUD_RUN_SCHEMA = """
+    Run_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Started_at REAL NOT NULL,
+    Finished_at REAL,
+    Elapsed_Seconds REAL,
+    Status TEXT NOT NULL,
+    Mode TEXT NOT NULL,
+    Import_Filename TEXT,
+    Workers INTEGER NOT NULL,
+    Thresholds TEXT,
+    Error TEXT
+"""
+
+# One row per rule of a run. Rows_Read counts the rows the rule fetched from
+# SQLite, so rules that filter in SQL only count their matches. Statements
+# counts statement executions on the rule's connection, where an
+# executemany counts once per row.
+FRAUD_RUN_RULE_SCHEMA = """
+    Run_ID INTEGER NOT NULL REFERENCES FraudRun(Run_ID),
+    Rule TEXT NOT NULL,
+    Elapsed_Seconds REAL NOT NULL,
+    Rows_Read INTEGER NOT NULL,
+    Findings INTEGER NOT NULL,
+    Statements INTEGER NOT NULL,
+    PRIMARY KEY (Run_ID, Rule)
+"""
+
+
+@dataclass
+class RuleStats:
+    elapsed_seconds: float = 0.0
+    rows_read: int = 0
+    findings: int = 0
+    statements: int = 0
+
+
+def create_fraud_run_tables(cursor):
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS FraudRun ({FRAUD_RUN_SCHEMA})")
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS FraudRunRule ({FRAUD_RUN_RULE_SCHEMA})")
+
+
+def start_run(db_path: str, mode: str, import_filename: Optional[str], workers: int, thresholds: dict) -> int:
+    """Record a run as started and return its Run_ID; committed on its own connection."""
+    with closing(sqlite3.connect(db_path)) as conn:
+        cursor = conn.cursor()
+        create_fraud_run_tables(cursor)
+        cursor.execute(
+            """
+            INSERT INTO FraudRun (Started_at, Status, Mode, Import_Filename, Workers, Thresholds)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (time.time(), RUNNING, mode, import_filename, workers, json.dumps(thresholds, sort_keys=True)),
+        )
+        conn.commit()
+        return cursor.lastrowid
+
+
+def finish_run(db_path: str, run_id: int, status: str, rule_stats: Dict[str, RuleStats], error: Optional[str] = None):
+    """Record the outcome and per-rule statistics of a run."""
+    with closing(sqlite3.connect(db_path)) as conn:
+        finished = time.time()
+        conn.execute(
+            """
+            UPDATE FraudRun
+            SET Finished_at = ?, Elapsed_Seconds = ? - Started_at, Status = ?, Error = ?
+            WHERE Run_ID = ?
+            """,
+            (finished, finished, status, error, run_id),
+        )
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO FraudRunRule (Run_ID, Rule, Elapsed_Seconds, Rows_Read, Findings, Statements)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (run_id, rule, stats.elapsed_seconds, stats.rows_read, stats.findings, stats.statements)
+                for rule, stats in rule_stats.items()
+            ],
+        )
+        conn.commit()
+
+
+def list_runs(cursor, limit: int = 20) -> List[dict]:
+    """The most recent runs, newest first, each with its per-rule statistics."""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'FraudRun'")
+    if cursor.fetchone() is None:
+        return []
+    cursor.execute(
+        """
+        SELECT Run_ID, Started_at, Finished_at, Elapsed_Seconds, Status, Mode, Import_Filename,
+               Workers, Thresholds, Error
+        FROM FraudRun
+        ORDER BY Run_ID DESC
+        LIMIT ?
+        """,
+        (limit,),
+    )
+    columns = [description[0] for description in cursor.description]
+    runs = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    for run in runs:
+        run["Thresholds"] = json.loads(run["Thresholds"] or "{}")
+        cursor.execute(
+            """
+            SELECT Rule, Elapsed_Seconds, Rows_Read, Findings, Statements
+            FROM FraudRunRule
+            WHERE Run_ID = ?
+            ORDER BY Elapsed_Seconds DESC
+            """,
+            (run["Run_ID"],),
+        )
+        rule_columns = [description[0] for description in cursor.description]
+        run["Rules"] = [dict(zip(rule_columns, row)) for row in cursor.fetchall()]
+    return runs
@@ -0,0 +1,285 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.data.cdr_features import CDR_FEATURE_COLUMNS, cdr_features_complete, compute_cdr_features
+from backend.data.fraud_findings import fraud_findings_exist
+from backend.data.migrations import cdr_epoch_columns
+from backend.fraude_detectie.columnar import impossible_travel_mask
+from backend.fraude_detectie.Fraude_detectie import REPEATABLE_RULES, RULES
+from backend.overlapping.overlap_engine import overlap_counts
+
+
+def _read_only(db_path: str) -> sqlite3.Connection:
+    # A simulation must not write, not even the tables a detector would create
+    return sqlite3.connect(Path(os.path.abspath(db_path)).as_uri() + "?mode=ro", uri=True)
+
+
+def _table_exists(cursor, name: str) -> bool:
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+    return cursor.fetchone() is not None
+
+
+def _travel_features(cursor, cdrs: pd.DataFrame):
+    """Distance in km and minutes from the previous session of the same user, NaN without one."""
+    distance = np.full(len(cdrs), np.nan)
+    gap = np.full(len(cdrs), np.nan)
+    if not _table_exists(cursor, "ChargePoint"):
+        return distance, gap
+    coordinates = pd.read_sql_query(
+        """
+        SELECT Charge_Point_ID, Latitude, Longitude
+        FROM ChargePoint
+        WHERE Latitude IS NOT NULL AND Longitude IS NOT NULL
+        """,
+        cursor.connection,
+        index_col="Charge_Point_ID",
+    )
+    if coordinates.empty:
+        return distance, gap
+
+    # CdrFeatures has the travel predecessors as of the current IDs, but
+    # detect_impossible_travel runs after detect_data_integrity_violation has
+    # stripped them. Sessions are ordered like CdrFeatures orders them; cdrs
+    # is in rowid order, so the stable sort breaks the last ties by rowid.
+    def stripped(values: pd.Series) -> pd.Series:
+        return values.map(lambda value: value.strip() if isinstance(value, str) else value)
+
+    sessions = pd.DataFrame({
+        "Authentication_ID": stripped(cdrs["Authentication_ID"]),
+        "Charge_Point_ID": stripped(cdrs["Charge_Point_ID"]),
+        "Start_epoch": cdrs["Start_epoch"],
+        "End_epoch": cdrs["End_epoch"],
+    })
+    sessions = sessions[
+        sessions["Authentication_ID"].notna() & sessions["Start_epoch"].notna() & sessions["End_epoch"].notna()
+    ]
+    sessions = sessions.sort_values(
+        ["Authentication_ID", "Start_epoch", "End_epoch"], kind="mergesort"
+    )
+    positions = coordinates.index.get_indexer(sessions["Charge_Point_ID"])
+    known = positions >= 0
+    latitude = np.where(known, coordinates["Latitude"].to_numpy()[positions], np.nan)
+    longitude = np.where(known, coordinates["Longitude"].to_numpy()[positions], np.nan)
+    # Limits that flag every session with a predecessor and coordinates
+    has_previous, session_distance, session_gap = impossible_travel_mask(
+        sessions["Authentication_ID"].to_numpy(),
+        sessions["Start_epoch"].to_numpy(),
+        sessions["End_epoch"].to_numpy(),
+        latitude,
+        longitude,
+        -np.inf,
+        np.inf,
+    )
+    rows = sessions.index.to_numpy()
+    distance[rows] = np.where(has_previous, session_distance, np.nan)
+    gap[rows] = np.where(has_previous, session_gap, np.nan)
+    return distance, gap
+
+
+def load_cdr_features(cursor) -> pd.DataFrame:
+    """
+    The per-CDR values the detection rules compare with their thresholds.
+
+    One row per CDR, in rowid order: the CdrFeatures columns, Travel_km and
+    Travel_minutes from the previous session of the same user, the
+    threshold-free outcomes of the overlap and data integrity rules, and
+    integer codes of the user and cost ratio that detect_repeated_behavior
+    groups by. CdrFeatures is read when it covers every CDR, and computed
+    without being stored when it doesn't.
+    """
+    cdrs = pd.read_sql_query(
+        f"""
+        SELECT CDR_ID, Authentication_ID, Charge_Point_ID, {cdr_epoch_columns(cursor)}
+        FROM CDR
+        ORDER BY rowid
+        """,
+        cursor.connection,
+    )
+    # read_sql_query can turn NULL IDs into NaN, which the rules' None checks miss
+    for column in ("Authentication_ID", "Charge_Point_ID"):
+        cdrs[column] = cdrs[column].astype(object).where(cdrs[column].notna(), None)
+
+    if cdr_features_complete(cursor):
+        stored = pd.read_sql_query(f"SELECT {', '.join(CDR_FEATURE_COLUMNS)} FROM CdrFeatures", cursor.connection)
+    else:
+        stored = compute_cdr_features(cursor)
+    stored = stored.set_index("CDR_ID").reindex(cdrs["CDR_ID"])
+    cost_per_kwh = stored["Cost_per_kWh"].astype("float64")
+
+    overlapping = overlap_counts(
+        (
+            (cdr_id, auth_id, start, end)
+            for cdr_id, auth_id, start, end in cursor.execute(
+                f"""
+                SELECT CDR_ID, Authentication_ID, {cdr_epoch_columns(cursor)}
+                FROM CDR
+                WHERE Authentication_ID IS NOT NULL
+                """
+            )
+        ),
+        inclusive=True,
+    )
+
+    def integrity_violation(cdr_id, auth_id, charge_point_id) -> bool:
+        if not cdr_id or str(cdr_id).strip() == "":
+            return False
+        return (
+            not auth_id or str(auth_id).strip() == ""
+            or not charge_point_id or str(charge_point_id).strip() == ""
+            or (isinstance(auth_id, str) and auth_id.strip() != auth_id)
+            or (isinstance(charge_point_id, str) and charge_point_id.strip() != charge_point_id)
+        )
+
+    travel_km, travel_minutes = _travel_features(cursor, cdrs)
+    # NULL is a user of its own to GROUP BY. factorize codes missing values
+    # as -1 on every supported pandas; use_na_sentinel needs pandas 1.5
+    auth_codes, auth_ids = pd.factorize(cdrs["Authentication_ID"])
+    auth_codes[auth_codes < 0] = len(auth_ids)
+    features = pd.DataFrame({
+        "Auth_code": auth_codes,
+        # A reason text: the ratio rounded as detection formats it
+        "Ratio_code": pd.factorize(cost_per_kwh.map(lambda ratio: f"{ratio:.2f}", na_action="ignore"))[0],
+        "Overlapping": cdrs["CDR_ID"].isin(overlapping.keys()),
+        "Integrity_violation": [
+            integrity_violation(*row)
+            for row in zip(cdrs["CDR_ID"], cdrs["Authentication_ID"], cdrs["Charge_Point_ID"])
+        ],
+        "Travel_km": travel_km,
+        "Travel_minutes": travel_minutes,
+    })
+    stored = stored.drop(columns=["Prev_CDR_ID", "Travel_Prev_CDR_ID", "Travel_Gap_Minutes"]).astype("float64")
+    return pd.concat([stored.reset_index(), features], axis=1)
+
+
+def _repeated_behavior_mask(features: pd.DataFrame, flagged: Dict[int, np.ndarray], threshold: int) -> np.ndarray:
+    """detect_repeated_behavior: findings per (user, reason text) of REPEATABLE_RULES, at least threshold of them."""
+    # Reason texts as integers: the cost rule's ratio codes, then one per other rule
+    ratio_codes = features["Ratio_code"].to_numpy()
+    other_reasons = int(ratio_codes.max(initial=-1)) + 1
+    rows, reasons = [], []
+    for offset, rule in enumerate(REPEATABLE_RULES):
+        rule_rows = np.flatnonzero(flagged[rule])
+        rows.append(rule_rows)
+        # Only the cost rule puts a measured value in its reason text
+        reasons.append(ratio_codes[rule_rows] if rule == 2 else np.full(len(rule_rows), other_reasons + offset))
+    rows = np.concatenate(rows)
+    keys = features["Auth_code"].to_numpy()[rows] * (other_reasons + len(REPEATABLE_RULES)) + np.concatenate(reasons)
+    _, group, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    mask = np.zeros(len(features), dtype=bool)
+    mask[rows[counts[group] >= threshold]] = True
+    return mask
+
+
+def simulate_rules(features: pd.DataFrame, thresholds: dict) -> Dict[int, np.ndarray]:
+    """Boolean mask of the CDRs each rule would flag with thresholds, by Rule_ID."""
+    max_volume = thresholds["MAX_VOLUME_KWH"]
+    # NaN compares False, so CDRs a rule would skip are never flagged
+    with np.errstate(invalid="ignore"):
+        flagged = {
+            1: ((features["Volume_kWh"] > max_volume) & (features["Duration_Minutes"] < thresholds["MAX_DURATION_MINUTES"])).to_numpy(),
+            2: (
+                (features["Cost"] > thresholds["MIN_COST_THRESHOLD"])
+                & (features["Volume_kWh"] < max_volume)
+                & features["Cost_per_kWh"].notna()
+            ).to_numpy(),
+            3: (features["Prev_Gap_Seconds"] < thresholds["MIN_TIME_GAP_MINUTES"] * 60).to_numpy(),
+            4: features["Overlapping"].to_numpy(),
+            6: features["Integrity_violation"].to_numpy(),
+            7: (
+                (features["Travel_km"] >= thresholds["MIN_DISTANCE_KM"])
+                & (features["Travel_minutes"] < thresholds["MIN_TRAVEL_TIME_MINUTES"])
+            ).to_numpy(),
+        }
+    flagged[5] = _repeated_behavior_mask(features, flagged, thresholds["THRESHOLD"])
+    return dict(sorted(flagged.items()))
+
+
+@dataclass
+class _CachedFeatures:
+    fingerprint: tuple
+    features: pd.DataFrame
+
+
+@dataclass
+class FeatureCache:
+    """load_cdr_features() per database, reused until CDR, ChargePoint or FraudRun changes."""
+    _entries: dict = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def get(self, key, fingerprint: tuple) -> Optional[pd.DataFrame]:
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry.features if entry and entry.fingerprint == fingerprint else None
+
+    def put(self, key, fingerprint: tuple, features: pd.DataFrame):
+        with self._lock:
+            self._entries[key] = _CachedFeatures(fingerprint, features)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+feature_cache = FeatureCache()
+
+
+def _fingerprint(cursor) -> tuple:
+    # A detection run can clean CDR IDs in place, geocoding fills in coordinates
+    parts = ["(SELECT MAX(rowid) FROM CDR)", "(SELECT COUNT(*) FROM CDR)"]
+    if _table_exists(cursor, "FraudRun"):
+        parts.append("(SELECT MAX(Run_ID) FROM FraudRun)")
+    if _table_exists(cursor, "ChargePoint"):
+        parts.append("(SELECT COUNT(Latitude) FROM ChargePoint)")
+    cursor.execute(f"SELECT {', '.join(parts)}")
+    return tuple(cursor.fetchone())
+
+
+def _current_counts(cursor) -> Dict[int, int]:
+    if not fraud_findings_exist(cursor):
+        return {}
+    cursor.execute("SELECT Rule_ID, COUNT(*) FROM FraudFinding GROUP BY Rule_ID")
+    return dict(cursor.fetchall())
+
+
+def simulate_thresholds(db_path: str, thresholds: dict) -> dict:
+    """
+    How many CDRs each rule would flag with thresholds, as a full detection run would.
+
+    Reads through a read-only connection and writes nothing. The per-CDR
+    features are computed once and cached until the data changes, so a
+    simulation against cached features is a handful of vectorized
+    comparisons. "current" is what FraudFinding holds now.
+    """
+    started = time.perf_counter()
+    with closing(_read_only(db_path)) as conn:
+        cursor = conn.cursor()
+        key = os.path.abspath(db_path)
+        fingerprint = _fingerprint(cursor)
+        features = feature_cache.get(key, fingerprint)
+        cached = features is not None
+        if not cached:
+            features = load_cdr_features(cursor)
+            feature_cache.put(key, fingerprint, features)
+        current = _current_counts(cursor)
+
+    flagged = simulate_rules(features, thresholds)
+    any_rule = np.logical_or.reduce(list(flagged.values()))
+    return {
+        "rules": [
+            {"rule": RULES[rule - 1], "ruleId": rule, "flagged": int(mask.sum()), "current": current.get(rule, 0)}
+            for rule, mask in flagged.items()
+        ],
+        "flaggedCdrs": int(any_rule.sum()),
+        "totalCdrs": len(features),
+        "cachedFeatures": cached,
+        "elapsedMs": round((time.perf_counter() - started) * 1000, 3),
+    }
@@ -0,0 +1,205 @@
+import logging
+import os
+import shutil
+import socket
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+
+from backend.data.DbPool import get_pool
+from backend.data.migrations import table_columns
+
+logger = logging.getLogger(__name__)
+
+# Phases a job goes through; "done" and "failed" are final
+JOB_PHASES = ("queued", "parsing", "inserting", "detecting", "done", "failed")
+
+# import_file(file_path, progress) -> (success, message, records_imported)
+ImportFunction = Callable[[str, Callable[[str, int], None]], Tuple[bool, str, Optional[int]]]
+
+# Windows: OpenProcess access right and the exit code of a running process
+_PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+_STILL_ACTIVE = 259
+
+
+def _process_alive(pid: int) -> bool:
+    """True while a process with this id runs on this host."""
+    if os.name == "nt":
+        # os.kill would terminate the process on Windows
+        import ctypes
+
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(_PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return False
+        exit_code = ctypes.c_ulong()
+        try:
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+        finally:
+            kernel32.CloseHandle(handle)
+        return exit_code.value == _STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ImportJobManager:
+    """
+    Runs file imports in the background and keeps their state in the ImportJob table.
+
+    Uploads are queued with submit() and processed by a small worker pool,
+    one at a time by default since SQLite has a single writer. Progress is
+    written to the job row after every batch, so the state survives the
+    request that started it and can be polled by id. Every job records the
+    host and process that run it, so a starting process only fails the jobs
+    of processes that are gone, not those of another live worker.
+    """
+
+    def __init__(self, db_path: str, import_file: ImportFunction, max_workers: int = 1):
+        self.db_path = db_path
+        self.import_file = import_file
+        self.host = socket.gethostname()
+        self.process_id = os.getpid()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="import-job")
+
+    def create_jobs_table(self):
+        with get_pool(self.db_path).connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS ImportJob (
+                    Job_ID TEXT PRIMARY KEY,
+                    Filename TEXT NOT NULL,
+                    Phase TEXT NOT NULL,
+                    Rows_done INTEGER NOT NULL DEFAULT 0,
+                    Records_imported INTEGER,
+                    Message TEXT,
+                    Error TEXT,
+                    Created_at REAL NOT NULL,
+                    Started_at REAL,
+                    Updated_at REAL,
+                    Finished_at REAL,
+                    Host TEXT,
+                    Process_ID INTEGER
+                )
+            """)
+            columns = table_columns(cursor, "ImportJob")
+            for column, column_type in (("Host", "TEXT"), ("Process_ID", "INTEGER")):
+                if column not in columns:
+                    cursor.execute(f"ALTER TABLE ImportJob ADD COLUMN {column} {column_type}")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_importjob_created ON ImportJob(Created_at)")
+            self._fail_orphaned_jobs(cursor)
+            conn.commit()
+
+    def _fail_orphaned_jobs(self, cursor):
+        """Unfinished jobs whose process is gone will not be picked up again: mark them failed."""
+        cursor.execute("SELECT Job_ID, Host, Process_ID FROM ImportJob WHERE Phase NOT IN ('done', 'failed')")
+        finished_at = time.time()
+        orphaned = [
+            (finished_at, job_id)
+            for job_id, host, process_id in cursor.fetchall()
+            # Jobs from before owners were recorded have no process to wait for
+            if process_id is None
+            or (host == self.host and process_id != self.process_id and not _process_alive(process_id))
+        ]
+        cursor.executemany(
+            """
+            UPDATE ImportJob
+            SET Phase = 'failed', Error = 'Interrupted by a server restart', Finished_at = ?
+            WHERE Job_ID = ?
+            """,
+            orphaned,
+        )
+
+    def submit(self, file_path: str, filename: Optional[str] = None, cleanup_dir: Optional[str] = None) -> str:
+        """Queue an import of file_path and return its job id. cleanup_dir is removed when the job ends."""
+        job_id = str(uuid.uuid4())
+        with get_pool(self.db_path).connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO ImportJob (Job_ID, Filename, Phase, Created_at, Host, Process_ID)
+                VALUES (?, ?, 'queued', ?, ?, ?)
+                """,
+                (job_id, filename or os.path.basename(file_path), time.time(), self.host, self.process_id),
+            )
+            conn.commit()
+        self._executor.submit(self._run, job_id, file_path, cleanup_dir)
+        return job_id
+
+    def _update(self, job_id: str, **values):
+        values["Updated_at"] = time.time()
+        assignments = ", ".join(f"{column} = ?" for column in values)
+        with get_pool(self.db_path).connection() as conn:
+            conn.execute(
+                f"UPDATE ImportJob SET {assignments} WHERE Job_ID = ?",
+                (*values.values(), job_id),
+            )
+            conn.commit()
+
+    def _run(self, job_id: str, file_path: str, cleanup_dir: Optional[str]):
+        self._update(job_id, Phase="parsing", Started_at=time.time())
+
+        def progress(phase: str, rows_done: int):
+            self._update(job_id, Phase=phase, Rows_done=rows_done)
+
+        try:
+            success, message, records_imported = self.import_file(file_path, progress)
+            if success:
+                self._update(job_id, Phase="done", Records_imported=records_imported,
+                             Rows_done=records_imported, Message=message, Finished_at=time.time())
+            else:
+                self._update(job_id, Phase="failed", Error=message, Finished_at=time.time())
+        except Exception as e:
+            logger.exception(f"Import job {job_id} failed")
+            self._update(job_id, Phase="failed", Error=str(e), Finished_at=time.time())
+        finally:
+            if cleanup_dir:
+                shutil.rmtree(cleanup_dir, ignore_errors=True)
+
+    def _to_dict(self, row) -> dict:
+        (job_id, filename, phase, rows_done, records_imported, message, error,
+         created_at, started_at, updated_at, finished_at) = row
+        end = finished_at or time.time()
+        elapsed = end - started_at if started_at else 0.0
+        return {
+            "jobId": job_id,
+            "filename": filename,
+            "phase": phase,
+            "status": phase if phase in ("queued", "done", "failed") else "running",
+            "rowsDone": rows_done,
+            "recordsImported": records_imported,
+            "message": message,
+            "error": error,
+            "createdAt": created_at,
+            "startedAt": started_at,
+            "finishedAt": finished_at,
+            "elapsedSeconds": round(elapsed, 3),
+            "rowsPerSecond": round(rows_done / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        with get_pool(self.db_path).connection() as conn:
+            row = conn.execute(
+                """SELECT Job_ID, Filename, Phase, Rows_done, Records_imported, Message, Error,
+                          Created_at, Started_at, Updated_at, Finished_at
+                   FROM ImportJob WHERE Job_ID = ?""",
+                (job_id,),
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list_jobs(self, limit: int = 20) -> list:
+        with get_pool(self.db_path).connection() as conn:
+            rows = conn.execute(
+                """SELECT Job_ID, Filename, Phase, Rows_done, Records_imported, Message, Error,
+                          Created_at, Started_at, Updated_at, Finished_at
+                   FROM ImportJob ORDER BY Created_at DESC LIMIT ?""",
+                (limit,),
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,72 @@
+import heapq
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, Iterator, Optional, Tuple
+
+# (CDR_ID, Authentication_ID, start epoch, end epoch)
+Session = Tuple[Hashable, Hashable, Optional[int], Optional[int]]
+
+
+def sessions_overlap(
+    a_start: int, a_end: int, b_start: int, b_end: int,
+    leeway_seconds: int = 0, inclusive: bool = False,
+) -> bool:
+    """
+    Overlap test shared by the sweep and single-CDR lookups.
+
+    inclusive=True matches the BETWEEN based fraud rule (touching sessions
+    overlap). Otherwise both sessions must overlap the other by more than
+    leeway_seconds, like the "1-second leeway" queries of the overlap pages.
+    """
+    if inclusive:
+        return b_start <= a_end - leeway_seconds and a_start <= b_end - leeway_seconds
+    return b_start < a_end - leeway_seconds and a_start < b_end - leeway_seconds
+
+
+def find_overlapping_pairs(
+    sessions: Iterable[Session], leeway_seconds: int = 0, inclusive: bool = False
+) -> Iterator[Tuple[Hashable, Hashable]]:
+    """
+    Yield every pair of overlapping sessions of the same Authentication_ID.
+
+    Sessions are grouped per Authentication_ID and swept in start order while
+    a heap keyed on end time holds the sessions that are still open, so the
+    cost is O(n log n + k) for n sessions and k overlapping pairs. Sessions
+    without an Authentication_ID or with unparseable times never overlap,
+    just like the SQL self-join they replace.
+    """
+    groups = defaultdict(list)
+    for cdr_id, auth_id, start, end in sessions:
+        if auth_id is None or start is None or end is None:
+            continue
+        groups[auth_id].append((start, end, cdr_id))
+
+    for group in groups.values():
+        if len(group) < 2:
+            continue
+        group.sort(key=lambda session: session[0])
+        active = []  # heap of (end, sequence, start, cdr_id)
+        for sequence, (start, end, cdr_id) in enumerate(group):
+            # Later sessions start at or after `start`, so these can never overlap again
+            while active and _expired(active[0][0], start, leeway_seconds, inclusive):
+                heapq.heappop(active)
+            for open_end, _, open_start, open_id in active:
+                if sessions_overlap(open_start, open_end, start, end, leeway_seconds, inclusive):
+                    yield open_id, cdr_id
+            heapq.heappush(active, (end, sequence, start, cdr_id))
+
+
+def overlap_counts(
+    sessions: Iterable[Session], leeway_seconds: int = 0, inclusive: bool = False
+) -> Dict[Hashable, int]:
+    """Number of overlapping sessions per CDR_ID, only CDRs with at least one overlap are returned."""
+    counts = defaultdict(int)
+    for first, second in find_overlapping_pairs(sessions, leeway_seconds, inclusive):
+        counts[first] += 1
+        counts[second] += 1
+    return dict(counts)
+
+
+def _expired(open_end: int, start: int, leeway_seconds: int, inclusive: bool) -> bool:
+    if inclusive:
+        return start > open_end - leeway_seconds
+    return start >= open_end - leeway_seconds
@@ -10,7 +10,7 @@ import threading
 from fastapi import HTTPException
 from backend.fraude_detectie.Settings import router as settings_router
 from backend.data_per_tijdsvlak.Tijdvlak import router as tijdvlak_router
-from backend.endpoints.filetodb.importtodb import router as import_router
+from backend.endpoints.filetodb.importtodb import router as import_router, import_job_manager
 from backend.endpoints.filetodb.dbtofile import router as export_router
 from backend.endpoints.tabel import router as tabel_router
 from backend.endpoints.fraud_reasons import router as fraud_reasons_router
@@ -20,6 +20,8 @@ from backend.endpoints.user_stats import router as user_stats_router
 from backend.endpoints.User import router as user_router
 from backend.endpoints.CDR import router as cdr_router
 from backend.endpoints.locations import router as locations_router
+from backend.endpoints.db_pool import router as db_pool_router
+from backend.endpoints.fraud_runs import router as fraud_runs_router
 from backend.fraud_per_user.fraud_per_user import router as fraud_per_user_router
 from backend.fraud_charge_point.fraud_charge_point import router as fraud_charge_points_router
 from backend.sessions.session_manager import SessionManager
@@ -56,6 +58,8 @@ app.include_router(user_router)
 app.include_router(cdr_router)
 app.include_router(locations_router)
 app.include_router(fraud_charge_points_router)
+app.include_router(db_pool_router)
+app.include_router(fraud_runs_router)
 
 def initialize_all_databases():
     """Initialize all databases and tables required by the application."""
@@ -83,16 +87,20 @@ def initialize_all_databases():
         decision_manager = FraudDecisionManager(os.path.join(base_dir, "project-d.db"))
         decision_manager.create_decision_table()
         
+        # Initialize import job table and fail the jobs a previous process left running
+        logger.info("Initializing import job table...")
+        import_job_manager.create_jobs_table()
+        
         # Initialize fraud locations table and add coordinate columns to CDR
         logger.info("Initializing fraud locations table...")
         fraud_location_manager = FraudLocationManager(os.path.join(base_dir, "project-d.db"))
         # The initialize_tables method is called in the constructor
         
-        # Initialize fraud detection tables (ThresholdSettings and FraudCase)
+        # Initialize fraud detection tables (ThresholdSettings, FraudFinding and the FraudCase view)
         logger.info("Initializing fraud detection tables...")
         fraud_detector = FraudDetector(os.path.join(base_dir, "project-d.db"))
         # The load_thresholds method creates ThresholdSettings table
-        # The _create_fraud_table method creates FraudCase table
+        # The _create_fraud_table method creates FraudFinding and the FraudCase view
         
         logger.info("All databases initialized successfully!")
         
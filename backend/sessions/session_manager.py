@@ -1,13 +1,13 @@
-import sqlite3
 import uuid
 import datetime
+from backend.data.DbPool import get_pool
 
 class SessionManager:
     def __init__(self, db_path):
         self.db_path = db_path
 
     def create_sessions_table(self):
-        with sqlite3.connect(self.db_path) as conn:
+        with get_pool(self.db_path).connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS Sessions (
@@ -21,7 +21,7 @@ class SessionManager:
 
     def create_session(self, user_id):
         session_token = str(uuid.uuid4())
-        with sqlite3.connect(self.db_path) as conn:
+        with get_pool(self.db_path).connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "INSERT INTO Sessions (session_token, user_id) VALUES (?, ?)",
@@ -31,7 +31,7 @@ class SessionManager:
         return session_token
 
     def get_user_id(self, session_token):
-        with sqlite3.connect(self.db_path) as conn:
+        with get_pool(self.db_path).connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "SELECT user_id FROM Sessions WHERE session_token = ?",
@@ -3,6 +3,7 @@ import { FaSearch, FaUserCircle, FaChevronDown, FaSignOutAlt, FaFileImport, FaHi
 import './Header.css';
 import { logout } from './login/logout';
 import ImportHistory from './pages/ImportHistory';
+import { describeImportJob, uploadImportFile, waitForImportJob } from './pages/ImportJobs.api';
 
 const Header: React.FC = () => {
   const [username, setUsername] = useState(() => localStorage.getItem('username') || 'Admin');
@@ -30,20 +31,17 @@ const Header: React.FC = () => {
 
     setIsUploading(true);
     for (const file of files) {
-      const formData = new FormData();
-      formData.append('file', file);
-
       try {
-        const response = await fetch('http://localhost:8000/api/import', {
-          method: 'POST',
-          body: formData,
-        });
-        const data = await response.json();
-        if (data.success) {
-          setStatusMessage(`✔️ ${file.name}: ${data.message}`);
-        } else {
+        const data = await uploadImportFile(file);
+        if (!data.success || !data.jobId) {
           setStatusMessage(`❌ ${file.name}: ${data.message}`);
+          continue;
         }
+        const job = await waitForImportJob(data.jobId, update => {
+          setStatusMessage(`⏳ ${file.name}: ${describeImportJob(update)}`);
+        });
+        const icon = job.status === 'done' ? '✔️' : '❌';
+        setStatusMessage(`${icon} ${file.name}: ${describeImportJob(job)}`);
       } catch (err) {
         setStatusMessage(`❌ ${file.name}: Error uploading file.`);
       }
@@ -92,7 +90,7 @@ const Header: React.FC = () => {
           title="Import Files"
           ref={fileInputRef}
           multiple
-          accept=".xlsx,.xls"
+          accept=".xlsx,.xls,.csv"
           style={{ display: 'none' }}
           onChange={handleFileChange}
         />
@@ -114,7 +112,7 @@ const Header: React.FC = () => {
       )}
       {(isUploading || statusMessage) && (
         <div className="import-toast" style={{ position: 'fixed', right: 20, top: 80, zIndex: 3000, background: '#fff', color: '#1976d2', padding: '12px 20px', borderRadius: 8, boxShadow: '0 2px 8px rgba(0,0,0,0.15)' }}>
-          {isUploading ? '⏳ Uploading...' : statusMessage}
+          {statusMessage || '⏳ Uploading...'}
         </div>
       )}
     </header>
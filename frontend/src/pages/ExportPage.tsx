@@ -44,6 +44,8 @@ const ExportPage: React.FC = () => {
       });
       if (startDate) params.append("start_date", startDate);
       if (endDate) params.append("end_date", endDate);
+      // The browser decompresses the gzip-encoded CSV stream by itself
+      if (format === "csv") params.append("gzip", "true");
 
       const response = await fetch(`http://localhost:8000/api/export?${params.toString()}`);
 
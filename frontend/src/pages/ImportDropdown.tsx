@@ -1,5 +1,6 @@
 import React, { useEffect, useRef, useState } from 'react';
 import ImportHistory from './ImportHistory';
+import { describeImportJob, uploadImportFile, waitForImportJob } from './ImportJobs.api';
 import './ImportDropdown.css';
 
 interface ImportDropdownProps {}
@@ -24,21 +25,17 @@ const ImportDropdown: React.FC<ImportDropdownProps> = () => {
 
     setIsUploading(true);
     for (const file of files) {
-      const formData = new FormData();
-      formData.append('file', file);
-
       try {
-        const response = await fetch('http://localhost:8000/api/import', {
-          method: 'POST',
-          body: formData,
-        });
-
-        const data = await response.json();
-        if (data.success) {
-          setStatusMessage(`✔️ ${file.name}: ${data.message}`);
-        } else {
+        const data = await uploadImportFile(file);
+        if (!data.success || !data.jobId) {
           setStatusMessage(`❌ ${file.name}: ${data.message}`);
+          continue;
         }
+        const job = await waitForImportJob(data.jobId, update => {
+          setStatusMessage(`⏳ ${file.name}: ${describeImportJob(update)}`);
+        });
+        const icon = job.status === 'done' ? '✔️' : '❌';
+        setStatusMessage(`${icon} ${file.name}: ${describeImportJob(job)}`);
       } catch (err) {
         setStatusMessage(`❌ ${file.name}: Error uploading file.`);
       }
@@ -84,7 +81,7 @@ const ImportDropdown: React.FC<ImportDropdownProps> = () => {
         type="file"
         ref={fileInputRef}
         multiple
-        accept=".xlsx,.xls"
+        accept=".xlsx,.xls,.csv"
         style={{ display: 'none' }}
         onChange={handleFileChange}
       />
@@ -95,7 +92,7 @@ const ImportDropdown: React.FC<ImportDropdownProps> = () => {
 
       {(isUploading || statusMessage) && (
         <div className="import-toast">
-          {isUploading ? '⏳ Uploading...' : statusMessage}
+          {statusMessage || '⏳ Uploading...'}
         </div>
       )}
     </div>
@@ -0,0 +1,70 @@
+export interface ImportJob {
+  jobId: string;
+  filename: string;
+  phase: 'queued' | 'parsing' | 'inserting' | 'detecting' | 'done' | 'failed';
+  status: 'queued' | 'running' | 'done' | 'failed';
+  rowsDone: number;
+  recordsImported: number | null;
+  message: string | null;
+  error: string | null;
+  elapsedSeconds: number;
+  rowsPerSecond: number;
+}
+
+export interface ImportUploadResponse {
+  success: boolean;
+  message: string;
+  count: number;
+  processingTime: number;
+  jobId?: string;
+}
+
+export async function uploadImportFile(file: File): Promise<ImportUploadResponse> {
+  const formData = new FormData();
+  formData.append('file', file);
+
+  const response = await fetch('http://localhost:8000/api/import', {
+    method: 'POST',
+    body: formData,
+  });
+  return response.json();
+}
+
+export async function fetchImportJob(jobId: string): Promise<ImportJob> {
+  const response = await fetch(`http://localhost:8000/api/import/jobs/${jobId}`);
+
+  if (!response.ok) {
+    throw new Error(`Failed to fetch import job: ${response.statusText}`);
+  }
+
+  return response.json();
+}
+
+// Poll an import job until it is done or failed
+export async function waitForImportJob(
+  jobId: string,
+  onUpdate?: (job: ImportJob) => void,
+  intervalMs = 1000
+): Promise<ImportJob> {
+  while (true) {
+    const job = await fetchImportJob(jobId);
+    onUpdate?.(job);
+    if (job.status === 'done' || job.status === 'failed') {
+      return job;
+    }
+    await new Promise(resolve => setTimeout(resolve, intervalMs));
+  }
+}
+
+export function describeImportJob(job: ImportJob): string {
+  if (job.status === 'done') {
+    return `${job.message} in ${job.elapsedSeconds.toFixed(1)} seconds.`;
+  }
+  if (job.status === 'failed') {
+    return job.error || 'Import failed.';
+  }
+  if (job.phase === 'queued') {
+    return 'Waiting in queue...';
+  }
+  return `${job.phase} ${job.rowsDone.toLocaleString()} rows (${Math.round(job.rowsPerSecond).toLocaleString()} rows/s)`;
+}
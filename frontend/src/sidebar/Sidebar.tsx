@@ -1,6 +1,7 @@
 import React, { useState, useRef } from 'react';
 import { Link, useLocation } from 'react-router-dom';
 import ImportHistory from '../pages/ImportHistory';
+import { describeImportJob, uploadImportFile, waitForImportJob } from '../pages/ImportJobs.api';
 import { logout } from '../login/logout';
 import './Sidebar.css';
 import { FaTachometerAlt, FaUserFriends, FaTable, FaPlug, FaChartBar, FaCog, FaSignOutAlt, FaUserPlus, FaFileExport, FaLayerGroup, FaChevronLeft, FaChevronRight } from 'react-icons/fa';
@@ -29,20 +30,17 @@ const Sidebar: React.FC<SidebarProps> = ({ collapsedProp, setCollapsed }) => {
 
     setIsUploading(true);
     for (const file of files) {
-      const formData = new FormData();
-      formData.append('file', file);
-
       try {
-        const response = await fetch('http://localhost:8000/api/import', {
-          method: 'POST',
-          body: formData,
-        });
-        const data = await response.json();
-        if (data.success) {
-          setStatusMessage(`✔️ ${file.name}: ${data.message}`);
-        } else {
+        const data = await uploadImportFile(file);
+        if (!data.success || !data.jobId) {
           setStatusMessage(`❌ ${file.name}: ${data.message}`);
+          continue;
         }
+        const job = await waitForImportJob(data.jobId, update => {
+          setStatusMessage(`⏳ ${file.name}: ${describeImportJob(update)}`);
+        });
+        const icon = job.status === 'done' ? '✔️' : '❌';
+        setStatusMessage(`${icon} ${file.name}: ${describeImportJob(job)}`);
       } catch (err) {
         setStatusMessage(`❌ ${file.name}: Error uploading file.`);
       }
@@ -96,7 +94,7 @@ const Sidebar: React.FC<SidebarProps> = ({ collapsedProp, setCollapsed }) => {
       )}
       {(isUploading || statusMessage) && (
         <div className="import-toast" style={{ position: 'fixed', left: 20, bottom: 80, zIndex: 3000, background: '#fff', color: '#1976d2', padding: '12px 20px', borderRadius: 8, boxShadow: '0 2px 8px rgba(0,0,0,0.15)' }}>
-          {isUploading ? '⏳ Uploading...' : statusMessage}
+          {statusMessage || '⏳ Uploading...'}
         </div>
       )}
     </>